@@ -0,0 +1,172 @@
+import concurrent.futures
+import json
+import os
+import re
+import sys
+import time
+import traceback
+
+from workspace import RUN_DIR_ENV
+
+# Batch driver for evaluation sweeps. Prompts are streamed from a JSONL file
+# ({"id": ..., "prompt": ...} per line), each one runs in its own process with
+# CODE2WORLDS_RUN_DIR pointing at a private run directory, and one result line
+# per prompt is appended to the results JSONL as runs finish.
+#
+# By default a prompt runs through WorldPipeline (object stream, scene stream,
+# post-process), so every run directory holds the same outputs as a single
+# world_pipeline.py run, including the scene manifest and generated_scene.gin.
+# The "obj" pipeline runs the object stream only, for object-quality sweeps.
+
+REQUESTS_PATH = "./requests.jsonl"
+RUNS_DIR = "./output/runs"
+RESULTS_PATH = os.path.join(RUNS_DIR, "results.jsonl")
+MAX_WORKERS = 2
+PIPELINES = ("world", "obj")
+DEFAULT_PIPELINE = "world"
+
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+OBJ_STREAM_DIR = os.path.join(AGENT_DIR, "obj_stream")
+
+
+def iter_requests(path):
+    """
+    Stream (request_id, prompt) pairs from a JSONL file without loading it whole.
+    Lines without a prompt are reported and skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[Batch] Skipping line {line_no}: invalid JSON ({e})")
+                continue
+            prompt = request.get("prompt")
+            if not prompt:
+                print(f"[Batch] Skipping line {line_no}: no prompt")
+                continue
+            request_id = str(request.get("id") or f"run{line_no:04d}")
+            yield re.sub(r"[^A-Za-z0-9_.-]+", "_", request_id), prompt
+
+
+def _run_world(prompt):
+    from world_pipeline import WorldPipeline
+    pipeline = WorldPipeline()
+    exit_code = pipeline.run(prompt)
+    stages = [dict(entry, stream=name) for name, result in pipeline.results.items() for entry in result["stages"]]
+    return exit_code, stages
+
+
+def _run_obj(prompt):
+    from obj_pipeline import ObjPipeline
+    pipeline = ObjPipeline()
+    return pipeline.run(prompt), pipeline.stage_log
+
+
+def run_request(request_id, prompt, run_dir, pipeline=DEFAULT_PIPELINE):
+    """
+    Run one prompt through `pipeline` ("world" or "obj") inside a worker process.
+
+    The run directory has to be set before the agents are imported because they
+    resolve their path constants at import time; the pool starts a fresh process
+    per task, so nothing is shared with the previous run. Output is redirected
+    at the file-descriptor level so Infinigen and Blender subprocess output
+    lands in the run's log instead of the shared terminal.
+    """
+    os.environ[RUN_DIR_ENV] = run_dir
+    os.makedirs(run_dir, exist_ok=True)
+    for path in (AGENT_DIR, OBJ_STREAM_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    result = {"id": request_id, "prompt": prompt, "run_dir": run_dir, "pipeline": pipeline}
+    log = open(os.path.join(run_dir, "log.txt"), "w", encoding="utf-8", buffering=1)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+    sys.stdout.reconfigure(line_buffering=True)
+    sys.stderr.reconfigure(line_buffering=True)
+
+    start = time.time()
+    result["stages"] = []
+    try:
+        exit_code, result["stages"] = (_run_world if pipeline == "world" else _run_obj)(prompt)
+        result.update(status="ok" if exit_code == 0 else "failed", exit_code=exit_code)
+    except Exception as e:
+        traceback.print_exc()
+        result.update(status="error", exit_code=1, error=f"{type(e).__name__}: {e}")
+    result["seconds"] = time.time() - start
+    return result
+
+
+def run_batch(requests_path=REQUESTS_PATH, results_path=RESULTS_PATH, runs_dir=RUNS_DIR, max_workers=MAX_WORKERS,
+              pipeline=DEFAULT_PIPELINE):
+    """
+    Returns:
+        int: Number of prompts that did not complete successfully.
+    """
+    runs_dir = os.path.abspath(runs_dir)
+    os.makedirs(runs_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+
+    failures = 0
+    requests = iter_requests(requests_path)
+    pending = {}
+    with open(results_path, "a", encoding="utf-8") as results, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=1) as pool:
+
+        def submit_next():
+            for request_id, prompt in requests:
+                run_dir = os.path.join(runs_dir, request_id)
+                future = pool.submit(run_request, request_id, prompt, run_dir, pipeline)
+                pending[future] = request_id
+                print(f"[Batch] Started {request_id}")
+                return True
+            return False
+
+        # Keep the queue shallow so a long requests file is never read up front
+        while len(pending) < max_workers * 2 and submit_next():
+            pass
+
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                request_id = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"id": request_id, "status": "error", "exit_code": 1, "error": f"{type(e).__name__}: {e}"}
+                if result["status"] != "ok":
+                    failures += 1
+                results.write(json.dumps(result, ensure_ascii=False) + "\n")
+                results.flush()
+                print(f"[Batch] {request_id}: {result['status']} ({result.get('seconds', 0):.1f}s)")
+                submit_next()
+
+    print(f"[Batch] Finished, {failures} failed. Results: {results_path}")
+    return failures
+
+
+def main():
+    requests_path = sys.argv[1] if len(sys.argv) > 1 else REQUESTS_PATH
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_WORKERS
+    pipeline = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_PIPELINE
+
+    if not os.path.exists(requests_path) or pipeline not in PIPELINES:
+        if pipeline not in PIPELINES:
+            print(f"Error: unknown pipeline {pipeline!r}, expected one of {list(PIPELINES)}")
+        else:
+            print(f"Error: {requests_path} not found")
+        print("Usage: python agent/batch.py [requests.jsonl] [max_workers] [world|obj]")
+        sys.exit(1)
+
+    failures = run_batch(requests_path, max_workers=max_workers, pipeline=pipeline)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import base64
+import math
+
+import cv2
+import numpy as np
+
+# Contact sheets for the VLM critics: sampled video frames or rendered views
+# are packed into one or a few labelled grid images instead of one image part
+# each. The cell size is the largest that keeps the estimated image tokens of
+# all sheets under a budget, and sheets are sent as JPEG or WebP at a chosen
+# quality, so both upload size and image tokens stay bounded however many
+# frames are shown.
+
+DEFAULT_TOKEN_BUDGET = 2000
+MAX_PER_SHEET = 12
+DEFAULT_FORMAT = "jpeg"
+DEFAULT_QUALITY = 85
+# Cell widths tried, largest first, until the sheets fit the budget
+CELL_WIDTHS = (768, 640, 512, 448, 384, 320, 256, 192, 128)
+GUTTER = 4
+BACKGROUND = (32, 32, 32)
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+
+def model_size(width, height):
+    """Size the model actually sees: fit in 2048x2048, then shortest side down to 768."""
+    scale = min(1.0, 2048.0 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768.0 / min(width, height))
+    return int(width * scale), int(height * scale)
+
+
+def estimate_image_tokens(width, height):
+    """
+    Image tokens of one image at high detail, using the OpenAI tiling rule
+    (model_size, then 170 tokens per 512px tile + 85). Other providers bill
+    differently, but it ranks payloads the same way.
+    """
+    width, height = model_size(width, height)
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def encode_image(image, fmt=DEFAULT_FORMAT, quality=DEFAULT_QUALITY):
+    """
+    Returns:
+        tuple: (mime type, encoded bytes) of a BGR image.
+    """
+    if fmt == "jpeg":
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    elif fmt == "webp":
+        ok, buffer = cv2.imencode(".webp", image, [cv2.IMWRITE_WEBP_QUALITY, int(quality)])
+    elif fmt == "png":
+        ok, buffer = cv2.imencode(".png", image)
+    else:
+        raise ValueError(f"Unknown image format {fmt!r}, expected one of {list(MIME_TYPES)}")
+    if not ok:
+        raise ValueError(f"Could not encode image as {fmt}")
+    return MIME_TYPES[fmt], buffer.tobytes()
+
+
+def _grid(count, cell_w, cell_h):
+    columns = max(1, min(count, math.ceil(math.sqrt(count * cell_h / cell_w))))
+    return columns, math.ceil(count / columns)
+
+
+def _label_height(cell_w):
+    return max(14, cell_w // 16)
+
+
+def _sheet_size(count, cell_w, cell_h):
+    columns, rows = _grid(count, cell_w, cell_h)
+    label_h = _label_height(cell_w)
+    return (columns * cell_w + (columns + 1) * GUTTER,
+            rows * (cell_h + label_h) + (rows + 1) * GUTTER)
+
+
+def _draw_sheet(images, labels, cell_w, cell_h):
+    width, height = _sheet_size(len(images), cell_w, cell_h)
+    columns, _ = _grid(len(images), cell_w, cell_h)
+    label_h = _label_height(cell_w)
+    sheet = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+    font_scale = label_h / 30.0
+    for i, (image, label) in enumerate(zip(images, labels)):
+        row, column = divmod(i, columns)
+        x = GUTTER + column * (cell_w + GUTTER)
+        y = GUTTER + row * (cell_h + label_h + GUTTER)
+        if label:
+            cv2.putText(sheet, label, (x + 2, y + label_h - max(3, label_h // 5)), cv2.FONT_HERSHEY_SIMPLEX,
+                        font_scale, (255, 255, 255), max(1, label_h // 14), cv2.LINE_AA)
+        # Letterbox each image into its cell
+        h, w = image.shape[:2]
+        scale = min(cell_w / w, cell_h / h)
+        resized = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        if resized.ndim == 2:
+            resized = cv2.cvtColor(resized, cv2.COLOR_GRAY2BGR)
+        top = y + label_h + (cell_h - resized.shape[0]) // 2
+        left = x + (cell_w - resized.shape[1]) // 2
+        sheet[top:top + resized.shape[0], left:left + resized.shape[1]] = resized[..., :3]
+    return sheet
+
+
+def build_contact_sheets(images, labels=None, token_budget=DEFAULT_TOKEN_BUDGET, max_per_sheet=MAX_PER_SHEET,
+                         fmt=DEFAULT_FORMAT, quality=DEFAULT_QUALITY):
+    """
+    Args:
+        images (list): BGR arrays, all shown at the same cell size.
+        labels (list): Text drawn above each cell (e.g. "t=1.25s", "Front").
+        token_budget (int): Estimated image tokens allowed for all sheets together.
+        max_per_sheet (int): Cells per sheet; more images are split over several sheets.
+        fmt (str): "jpeg", "webp" or "png".
+        quality (int): JPEG/WebP quality (0-100).
+
+    Returns:
+        list: One dict per sheet: {"image": base64 str, "mime", "width", "height",
+        "tokens", "bytes", "labels"}.
+    """
+    if not images:
+        return []
+    labels = list(labels) if labels is not None else [""] * len(images)
+    cell_aspect = max(image.shape[0] / image.shape[1] for image in images)
+    groups = [list(range(start, min(start + max_per_sheet, len(images))))
+              for start in range(0, len(images), max_per_sheet)]
+
+    # Never upscale: cells are at most as wide as the widest input
+    widest = max(image.shape[1] for image in images)
+    widths = [w for w in CELL_WIDTHS if w <= widest] or [min(CELL_WIDTHS)]
+    chosen = None
+    for cell_w in widths:
+        cell_h = max(1, int(round(cell_w * cell_aspect)))
+        tokens = sum(estimate_image_tokens(*_sheet_size(len(group), cell_w, cell_h)) for group in groups)
+        chosen = (cell_w, cell_h)
+        if tokens <= token_budget:
+            break
+
+    cell_w, cell_h = chosen
+    sheets = []
+    for group in groups:
+        sheet = _draw_sheet([images[i] for i in group], [labels[i] for i in group], cell_w, cell_h)
+        # Pixels above what the model keeps only cost upload size
+        size = model_size(sheet.shape[1], sheet.shape[0])
+        if size != (sheet.shape[1], sheet.shape[0]):
+            sheet = cv2.resize(sheet, size, interpolation=cv2.INTER_AREA)
+        mime, data = encode_image(sheet, fmt, quality)
+        sheets.append({
+            "image": base64.b64encode(data).decode("utf-8"),
+            "mime": mime,
+            "width": sheet.shape[1],
+            "height": sheet.shape[0],
+            "tokens": estimate_image_tokens(sheet.shape[1], sheet.shape[0]),
+            "bytes": len(data),
+            "labels": [labels[i] for i in group],
+        })
+    return sheets
+
+
+def image_parts(sheets):
+    """Chat-completion content parts for `sheets`, each preceded by the labels it holds."""
+    parts = []
+    for n, sheet in enumerate(sheets, 1):
+        labels = ", ".join(label for label in sheet["labels"] if label)
+        heading = f"Sheet {n}/{len(sheets)} (left to right, top to bottom)"
+        parts.append({"type": "text", "text": f"{heading}: {labels}" if labels else heading})
+        parts.append({"type": "image_url", "image_url": {"url": f"data:{sheet['mime']};base64,{sheet['image']}"}})
+    return parts
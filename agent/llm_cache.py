@@ -0,0 +1,223 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Shared on-disk cache for chat completions. Every agent goes through
+# `cached_completion` so that rerunning a prompt after a downstream failure
+# replays the upstream stages from disk instead of calling the model again.
+# Only answers the caller can use are stored (see `validate`), and a request
+# repeated within one run is a retry, so it goes to the model instead of
+# getting the same answer back. Callers that sample for diversity pass
+# fresh=True and skip the cache entirely.
+
+DEFAULT_CACHE_DIR = "./output/cache"
+DEFAULT_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "llm_cache.sqlite")
+
+# Environment overrides
+CACHE_PATH_ENV = "CODE2WORLDS_LLM_CACHE"
+BYPASS_ENV = "CODE2WORLDS_LLM_CACHE_BYPASS"
+
+MAX_AGE_SECONDS = 14 * 24 * 3600
+MAX_SIZE_BYTES = 512 * 1024 * 1024
+
+JSON_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def make_cache_key(request):
+    """
+    Content-addressed key for a completion request.
+
+    Args:
+        request (dict): The keyword arguments sent to `chat.completions.create`
+                        (model, messages, temperature, response_format, ...).
+    """
+    canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=None, max_age_seconds=MAX_AGE_SECONDS, max_size_bytes=MAX_SIZE_BYTES, bypass=None):
+        self.path = path or os.environ.get(CACHE_PATH_ENV) or DEFAULT_CACHE_PATH
+        self.max_age_seconds = max_age_seconds
+        self.max_size_bytes = max_size_bytes
+        self.bypass = _env_flag(BYPASS_ENV) if bypass is None else bypass
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        # Keys answered in this run; asking again is a retry
+        self._served = set()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            # Batch runs share one cache file across processes, so wait on locks
+            # instead of failing and let readers proceed during writes.
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions(last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        if self.bypass:
+            return None
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT content, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or (self.max_age_seconds and now - row[1] > self.max_age_seconds):
+                self.misses += 1
+                return None
+            conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def mark_served(self, key):
+        """Record `key` as answered in this run. Returns False if it already was."""
+        with self._lock:
+            if key in self._served:
+                return False
+            self._served.add(key)
+            return True
+
+    def put(self, key, content, model=None):
+        if self.bypass or content is None:
+            return
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, len(content.encode("utf-8")), now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now):
+        if self.max_age_seconds:
+            conn.execute("DELETE FROM completions WHERE created < ?", (now - self.max_age_seconds,))
+        if self.max_size_bytes:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+            if total > self.max_size_bytes:
+                # Drop least recently used entries until we are back under budget
+                rows = conn.execute("SELECT key, size FROM completions ORDER BY last_used ASC").fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_size_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM completions WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM completions")
+            conn.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "rejected": self.rejected, "bypass": self.bypass,
+                "path": self.path}
+
+    def print_stats(self):
+        if self.hits or self.misses:
+            print(f"[LLMCache] {self.hits} hits, {self.misses} misses, {self.rejected} invalid answers "
+                  f"not cached ({self.path})")
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache()
+        # One report per run instead of a line per hit
+        atexit.register(_default_cache.print_stats)
+    return _default_cache
+
+
+def is_json(content):
+    """`validate` for answers that must be JSON, optionally inside a ```json fence."""
+    json.loads(JSON_FENCE.sub("", content.strip()))
+    return True
+
+
+def _is_valid(validate, content):
+    if validate is None:
+        return True
+    try:
+        return bool(validate(content))
+    except Exception:
+        return False
+
+
+def cached_completion(client, cache=None, validate=None, fresh=False, **request):
+    """
+    Drop-in replacement for `client.chat.completions.create(...)` that returns
+    the message content, served from the on-disk cache when possible.
+
+    Args:
+        client: OpenAI client used on a cache miss.
+        cache (LLMCache): Cache instance, defaults to the process-wide cache.
+        validate (callable): content -> bool (or raises) telling whether the
+            caller can use the answer; answers failing it are neither stored
+            nor served from the cache.
+        fresh (bool): Always call the model and store nothing, for requests
+            sampled for diversity (beam-search candidates) that a replay would
+            make identical on every run.
+        **request: Keyword arguments forwarded to `chat.completions.create`.
+
+    Returns:
+        str: `response.choices[0].message.content`
+    """
+    if fresh:
+        return client.chat.completions.create(**request).choices[0].message.content
+
+    cache = cache or get_default_cache()
+    key = make_cache_key(dict(request, base_url=str(getattr(client, "base_url", None))))
+
+    # The same request twice in one run is a retry of an answer that did not work
+    if cache.mark_served(key):
+        content = cache.get(key)
+        if content is not None and _is_valid(validate, content):
+            return content
+
+    response = client.chat.completions.create(**request)
+    content = response.choices[0].message.content
+    if _is_valid(validate, content):
+        cache.put(key, content, model=request.get("model"))
+    else:
+        with cache._lock:
+            cache.rejected += 1
+    return content
@@ -0,0 +1,192 @@
+import multiprocessing
+import os
+import resource
+import runpy
+import sys
+import traceback
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stages import StageError, working_directory
+
+# Long-lived bpy process for the object refinement loop. Importing bpy and
+# infinigen is paid once per worker instead of once for obj_code.py and once
+# more for render_object.py on every iteration, and the render reads the scene
+# the script just built instead of reopening the saved .blend.
+#
+# The parent talks to the worker over a multiprocessing Pipe (spawn context, so
+# the child does not inherit a forked bpy state). Jobs are dicts:
+#   {"op": "run", "script": path, "cwd": dir}   reset to factory settings, exec script
+#   {"op": "render", "out_dir": dir, "quality": tier}   render the in-memory scene
+#   {"op": "export_mesh", "path": npz}          preview mesh for raster_preview
+# and every reply is {"ok", "result", "error", "rss_mb"}. The worker is
+# replaced after MAX_JOBS scripts or once its peak RSS passes MAX_RSS_MB, since
+# infinigen leaves datablocks and node groups behind between runs.
+
+MAX_JOBS = 20
+MAX_RSS_MB = 12000
+# Seconds a single job may take before the worker is killed
+JOB_TIMEOUT = 1800
+START_TIMEOUT = 300
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _run_job(job):
+    import bpy
+
+    if job["op"] == "run":
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+        script_path = job["script"]
+        with working_directory(job["cwd"]):
+            try:
+                runpy.run_path(script_path, run_name="__main__")
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    raise RuntimeError(f"{os.path.basename(script_path)} exited with code {e.code}")
+        return True
+    if job["op"] == "render":
+        from render_object import render_scene
+
+        return [str(path) for path in render_scene(job["out_dir"], quality=job.get("quality"))]
+    if job["op"] == "export_mesh":
+        from render_object import export_mesh
+
+        return export_mesh(job["path"])
+    raise ValueError(f"unknown job {job['op']!r}")
+
+
+def _worker_main(conn):
+    """Child process loop: one reply per job until a None job or a closed pipe."""
+    try:
+        import bpy  # noqa: F401  (the import is the cost this process amortises)
+        from render_object import render_scene  # noqa: F401
+    except Exception:
+        conn.send({"ok": False, "result": None, "error": traceback.format_exc(), "rss_mb": _peak_rss_mb()})
+        return
+    conn.send({"ok": True, "result": "ready", "error": None, "rss_mb": _peak_rss_mb()})
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        try:
+            reply = {"ok": True, "result": _run_job(job), "error": None}
+        except BaseException:
+            reply = {"ok": False, "result": None, "error": traceback.format_exc()}
+        reply["rss_mb"] = _peak_rss_mb()
+        conn.send(reply)
+    conn.close()
+
+
+class WorkerDied(StageError):
+    pass
+
+
+class BlenderWorker:
+    def __init__(self, max_jobs=MAX_JOBS, max_rss_mb=MAX_RSS_MB, job_timeout=JOB_TIMEOUT):
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.job_timeout = job_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self.jobs = 0
+        self.rss_mb = 0.0
+        self.restarts = 0
+
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        if self.alive():
+            return
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self.jobs = 0
+        reply = self._receive(START_TIMEOUT)
+        if not reply["ok"]:
+            self.close()
+            raise WorkerDied(f"Blender worker failed to start:\n{reply['error']}")
+        print(f"[Blender Worker] started pid {self._process.pid}")
+
+    def _receive(self, timeout):
+        try:
+            if not self._conn.poll(timeout):
+                self.close(kill=True)
+                raise WorkerDied(f"Blender worker timed out after {timeout}s")
+            reply = self._conn.recv()
+        except (EOFError, OSError) as e:
+            code = self._process.exitcode if self._process else None
+            self.close(kill=True)
+            raise WorkerDied(f"Blender worker exited (code {code})") from e
+        self.rss_mb = reply.get("rss_mb", self.rss_mb)
+        return reply
+
+    def _submit(self, job):
+        self.start()
+        try:
+            self._conn.send(job)
+        except (BrokenPipeError, OSError) as e:
+            self.close(kill=True)
+            raise WorkerDied("Blender worker pipe closed") from e
+        reply = self._receive(self.job_timeout)
+        if not reply["ok"]:
+            raise StageError(reply["error"].strip().splitlines()[-1] if reply["error"] else "job failed")
+        return reply["result"]
+
+    def run_script(self, script_path, cwd):
+        """
+        Reset the worker's scene and execute `script_path` from `cwd`, like
+        `cd cwd && python script_path`. The resulting scene stays loaded for render().
+        """
+        if self.alive() and (self.jobs >= self.max_jobs or self.rss_mb >= self.max_rss_mb):
+            print(f"[Blender Worker] recycling after {self.jobs} jobs, peak RSS {self.rss_mb:.0f} MB")
+            self.close()
+            self.restarts += 1
+        self.start()
+        self.jobs += 1
+        return self._submit({"op": "run", "script": os.path.abspath(script_path), "cwd": os.path.abspath(cwd)})
+
+    def render(self, out_dir, quality=None):
+        """
+        Args:
+            out_dir (str): Folder for the rendered views.
+            quality (str | dict): render_object quality tier.
+
+        Returns:
+            list: Rendered image paths (front, side) of the scene left by run_script().
+        """
+        if not self.alive():
+            raise WorkerDied("Blender worker holds no scene to render")
+        return self._submit({"op": "render", "out_dir": os.path.abspath(out_dir), "quality": quality})
+
+    def export_mesh(self, path):
+        """Write the in-memory scene's meshes to `path` (see render_object.export_mesh)."""
+        if not self.alive():
+            raise WorkerDied("Blender worker holds no scene to export")
+        return self._submit({"op": "export_mesh", "path": os.path.abspath(path)})
+
+    def close(self, kill=False):
+        if self._process is None:
+            return
+        if not kill and self._process.is_alive():
+            try:
+                self._conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self._process.join(10)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+# On-disk embedding matrices for the knowledge base. Each index is an .npy
+# matrix (one L2-normalised row per text) plus a JSON sidecar holding the
+# source hash, the record table and a hash per embedded text, so unchanged
+# rows are reused when the library is edited. The two files are replaced one
+# after the other, so the sidecar also records the size and mtime of the
+# matrix file it was written with (cheap to check on every load, unlike the
+# matrix hash, which is stored for offline checks) and a matrix from another
+# build is never paired with it.
+
+INDEX_DIR = "./output/cache/kb_index"
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sha256_matrix(matrix):
+    return hashlib.sha256(np.ascontiguousarray(matrix, dtype=np.float32).tobytes()).hexdigest()
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PersistedEmbeddingIndex:
+    def __init__(self, name, model_name, index_dir=INDEX_DIR):
+        self.model_name = model_name
+        safe_model = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.matrix_path = os.path.join(index_dir, f"{name}-{safe_model}.npy")
+        self.meta_path = os.path.join(index_dir, f"{name}-{safe_model}.json")
+        # Matrix verified against the sidecar by the last _read_meta()
+        self._matrix = None
+
+    def _read_meta(self):
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.matrix_path)):
+            return None
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if meta.get("model_name") != self.model_name:
+            return None
+        try:
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(self.matrix_path)
+        if list(matrix.shape) != meta.get("matrix_shape") or \
+                [stat.st_size, stat.st_mtime_ns] != meta.get("matrix_stat"):
+            # Sidecar and matrix come from different builds
+            return None
+        self._matrix = matrix
+        return meta
+
+    def load(self, source_hash):
+        """
+        Returns:
+            dict: The sidecar (with "records") if it was built from `source_hash`, else None.
+        """
+        meta = self._read_meta()
+        if meta is None or meta.get("source_hash") != source_hash:
+            return None
+        return meta
+
+    def embeddings(self):
+        """The matrix checked by the last load()/build(), not whatever is on disk now."""
+        if self._matrix is None:
+            self._matrix = np.load(self.matrix_path, mmap_mode="r")
+        return self._matrix
+
+    def build(self, source_hash, records, texts, encode):
+        """
+        Embed `texts` (one per record), re-using rows of the previous index whose
+        text hash is unchanged, and persist matrix and sidecar.
+
+        Args:
+            source_hash (str): Hash of the library content the records came from.
+            records (list): JSON-serialisable row metadata, aligned with `texts`.
+            texts (list[str]): Texts to embed.
+            encode (callable): list[str] -> np.ndarray of normalised embeddings.
+
+        Returns:
+            np.ndarray: The embedding matrix.
+        """
+        text_hashes = [sha256_text(t) for t in texts]
+
+        previous_rows = {}
+        meta = self._read_meta()
+        if meta is not None:
+            old_matrix = self._matrix
+            for row, h in enumerate(meta.get("text_hashes", [])):
+                if row < len(old_matrix):
+                    previous_rows[h] = row
+        else:
+            old_matrix = None
+
+        missing = [i for i, h in enumerate(text_hashes) if h not in previous_rows]
+        new_vectors = encode([texts[i] for i in missing]) if missing else None
+        if missing:
+            print(f"[KB Index] Embedding {len(missing)}/{len(texts)} changed chunks ({os.path.basename(self.matrix_path)})")
+
+        if new_vectors is not None:
+            dim = new_vectors.shape[1]
+        else:
+            dim = old_matrix.shape[1] if old_matrix is not None else 0
+        matrix = np.zeros((len(texts), dim), dtype=np.float32)
+        for i, h in enumerate(text_hashes):
+            if h in previous_rows:
+                matrix[i] = old_matrix[previous_rows[h]]
+        for j, i in enumerate(missing):
+            matrix[i] = new_vectors[j]
+        del old_matrix
+
+        # Batch workers may build the same index at once: private tmp files,
+        # and the matrix goes in before the sidecar that vouches for it
+        os.makedirs(os.path.dirname(self.matrix_path), exist_ok=True)
+        tmp_matrix = f"{self.matrix_path}.tmp{os.getpid()}.npy"
+        tmp_meta = f"{self.meta_path}.tmp{os.getpid()}"
+        np.save(tmp_matrix, matrix)
+        # os.replace keeps size and mtime, so they identify this build's file
+        stat = os.stat(tmp_matrix)
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({
+                "source_hash": source_hash,
+                "model_name": self.model_name,
+                "matrix_shape": list(matrix.shape),
+                "matrix_stat": [stat.st_size, stat.st_mtime_ns],
+                "matrix_sha256": sha256_matrix(matrix),
+                "text_hashes": text_hashes,
+                "records": records,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_meta, self.meta_path)
+        # Serve the matrix built here even if another process replaces the files
+        self._matrix = matrix
+        return matrix
+
+
+def cosine_top_k(matrix, query_vector, top_k):
+    """Top-k rows of a normalised matrix by cosine similarity to a normalised query."""
+    if len(matrix) == 0:
+        return []
+    scores = np.asarray(matrix @ np.asarray(query_vector, dtype=np.float32).reshape(-1))
+    top_k = min(top_k, len(scores))
+    order = np.argpartition(-scores, top_k - 1)[:top_k]
+    order = order[np.argsort(-scores[order])]
+    return [(int(i), float(scores[i])) for i in order]
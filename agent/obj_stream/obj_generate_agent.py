@@ -1,14 +1,28 @@
+import ast
+import json
 import re
 import os
+import sys
 from openai import OpenAI
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import cached_completion
+from workspace import run_path
+from preflight import format_issues, preflight_script
+from template_codegen import fill_template
+from template_index import TemplateIndex
+
 
 os.environ["OPENAI_API_KEY"] = ""
 os.environ["OPENAI_BASE_URL"] = ""
 
-PARAM_FILE_PATH = "./output/obj/obj_param.txt"
+PARAM_FILE_PATH = run_path("./output/obj/obj_param.txt")
 CODE_TEMPLATE_PATH = "./library/obj_nature_generate.txt"
-OUTPUT_SCRIPT_PATH = "./infinigen/obj_code.py"
+OUTPUT_SCRIPT_PATH = run_path("./infinigen/obj_code.py")
+FINAL_BLEND_PATH = run_path("./infinigen/outputs/obj/obj.blend")
+PREFLIGHT_REPORT_PATH = run_path("./output/obj/preflight.json")
+# LLM attempts after the first one when the generated script fails preflight
+PREFLIGHT_RETRIES = 2
 
 def load_file(path):
     if not os.path.exists(path):
@@ -26,6 +40,11 @@ def extract_target_info(param_content):
     
     return factory_name, params_str
 
+def extract_template_path(param_content):
+    """The generate template recorded by the parameter agent, CODE_TEMPLATE_PATH for older files."""
+    template_match = re.search(r"# Template:\s*(\S+)", param_content)
+    return template_match.group(1) if template_match else CODE_TEMPLATE_PATH
+
 def retrieve_code_context_in_memory(template_content, factory_name):
     lines = template_content.split('\n')
     header_lines = []
@@ -58,7 +77,8 @@ class CodeGenAgent:
         self.client = OpenAI()
         self.model = "gemini-3-pro-preview"
 
-    def generate_script(self, factory_name, params_str, code_context):
+    def generate_script(self, factory_name, params_str, code_context, preflight_issues=None, attempt=1,
+                        blend_path=FINAL_BLEND_PATH):
         system_prompt = f"""
         You are an expert Python Developer for Blender (Infinigen).
         Your task is to write a ROBUST, ERROR-FREE Python script by strictly following a Reference Code Context.
@@ -90,7 +110,7 @@ class CodeGenAgent:
 
         5. **Execution & Saving**:
            - Call `.create_asset()` and assign the result to `obj`.
-           - Save to `r"{FINAL_BLEND_PATH}"` using `bpy.ops.wm.save_as_mainfile(...)`.
+           - Save to `r"{blend_path}"` using `bpy.ops.wm.save_as_mainfile(...)`.
 
         6. **Final Review (Self-Correction)**:
            - Verify: Did I include `sys.path.append`?
@@ -101,6 +121,14 @@ class CodeGenAgent:
         Return ONLY the valid Python code. No markdown blocks, no explanations.
         """
 
+        preflight_context = ""
+        if preflight_issues:
+            preflight_context = f"""
+        ### 3. Static Check Failures (retry {attempt - 1}):
+        Your previous script was rejected before execution. Fix every issue:
+        {format_issues(preflight_issues)}
+        """
+
         user_prompt = f"""
         Target Factory: {factory_name}
         
@@ -109,22 +137,24 @@ class CodeGenAgent:
 
         ### 2. Parameters to Apply (The Data):
         {params_str}
-
+        {preflight_context}
         Generate the production-ready script now.
         """
 
         print(f" [CodeGen] Assembling script for {factory_name}...")
 
         try:
-            response = self.client.chat.completions.create(
+            content = cached_completion(
+                self.client,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                temperature=0.1
+                temperature=0.1,
+                validate=lambda content: ast.parse(self._clean_output(content))
             )
-            return self._clean_output(response.choices[0].message.content)
+            return self._clean_output(content)
         except Exception as e:
             return f"# Error generating code: {e}"
 
@@ -138,13 +168,56 @@ class CodeGenAgent:
         return content.strip()
 
 
-def main():
+def parse_params(params_str):
+    """
+    Returns:
+        dict: The params dict, or None if it is not a plain literal.
+    """
+    try:
+        params = ast.literal_eval(params_str)
+    except (ValueError, SyntaxError):
+        return None
+    return params if isinstance(params, dict) else None
+
+
+def load_template(template_path, templates=None):
+    """TemplateIndex for `template_path`, from the `templates` cache when present."""
+    templates = {} if templates is None else templates
+    if template_path not in templates:
+        if not os.path.exists(template_path):
+            print(f"Error: File not found: {template_path}")
+            return None
+        templates[template_path] = TemplateIndex(template_path)
+    return templates[template_path]
+
+
+def save_preflight_report(factory_name, source, issues, report_path=PREFLIGHT_REPORT_PATH):
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"factory": factory_name, "source": source, "passed": not issues, "issues": issues}, f, indent=2)
 
-    param_content = load_file(PARAM_FILE_PATH)
-    if not param_content: return
 
-    template_content = load_file(CODE_TEMPLATE_PATH)
-    if not template_content: return
+def run_code_generation(agent=None, templates=None, param_path=PARAM_FILE_PATH, script_path=OUTPUT_SCRIPT_PATH,
+                        blend_path=FINAL_BLEND_PATH, report_path=PREFLIGHT_REPORT_PATH):
+    """
+    Agent 3: Turn obj_param.txt into an executable Infinigen script at OUTPUT_SCRIPT_PATH.
+
+    Args:
+        agent (CodeGenAgent): Reused across calls by the pipeline runner.
+        templates (dict): Template path -> TemplateIndex cache shared across calls;
+            templates missing from it are indexed and added.
+        param_path, script_path, blend_path, report_path (str): Overrides for
+            beam-search candidates, which each get their own parameters, script,
+            .blend and preflight report.
+
+    Returns:
+        bool: Whether a script was generated and saved.
+    """
+    param_content = load_file(param_path)
+    if not param_content: return False
+
+    template = load_template(extract_template_path(param_content), templates)
+    if template is None: return False
 
     factory_name, params_str = extract_target_info(param_content)
     
@@ -153,16 +226,66 @@ def main():
         elif "BowlFactory" in param_content: factory_name = "BowlFactory"
         else:
             print("Error: Could not identify target factory.")
-            return
+            return False
 
-    code_context = retrieve_code_context_in_memory(template_content, factory_name)
+    # Only the example closest to the requested params is used, both for the
+    # template patch and as the LLM's reference
+    params = parse_params(params_str)
+    if template.has(factory_name):
+        code_context = template.example(factory_name, params)
+    else:
+        code_context = retrieve_code_context_in_memory(template.text(), factory_name)
     print(code_context)
 
-    agent = CodeGenAgent()
-    final_script = agent.generate_script(factory_name, params_str, code_context)
+    # Static checks against the template, so a broken script goes back to code
+    # generation instead of failing after Blender has started
+    checks = dict(
+        imports=template.imports(),
+        classes=template.factory_classes(factory_name),
+        blend_path=blend_path,
+        needs_sys_path=template.needs_sys_path(),
+    )
 
-    with open(OUTPUT_SCRIPT_PATH, "w", encoding="utf-8") as f:
+    final_script, issues, source = None, [], "template"
+    if params is None:
+        print(" [TemplateCodeGen] params are not a literal dict")
+    elif template.has(factory_name):
+        final_script = fill_template(factory_name, params, code_context, blend_path)
+    if final_script is not None:
+        issues = preflight_script(final_script, factory_name, **checks)
+        if issues:
+            print(f" [Preflight] Patched {factory_name} example rejected:\n{format_issues(issues)}")
+        else:
+            print(f" [TemplateCodeGen] Patched the {factory_name} example")
+
+    if final_script is None or issues:
+        source = "llm"
+        agent = agent or CodeGenAgent()
+        previous_issues = None
+        for attempt in range(1, PREFLIGHT_RETRIES + 2):
+            final_script = agent.generate_script(factory_name, params_str, code_context, previous_issues, attempt,
+                                                 blend_path)
+            issues = preflight_script(final_script, factory_name, **checks)
+            if not issues:
+                break
+            print(f" [Preflight] Attempt {attempt} rejected:\n{format_issues(issues)}")
+            previous_issues = issues
+
+    save_preflight_report(factory_name, source, issues, report_path)
+    if issues:
+        print(f"Error: generated script failed preflight, see {report_path}")
+        return False
+
+    with open(script_path, "w", encoding="utf-8") as f:
         f.write(final_script)
+    return True
+
+
+def main():
+    import sys
+
+    if not run_code_generation():
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,61 +1,287 @@
+import ast
 import json
 import os
 import re
+import sys
 import numpy as np
 from typing import List, Tuple
-from sentence_transformers import SentenceTransformer, util
 from openai import OpenAI
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import cached_completion
+from workspace import run_path
+from embedding_index import PersistedEmbeddingIndex, cosine_top_k, sha256_file, sha256_text
+from param_schema import SEED_KEYS, validate_params
+
 os.environ["OPENAI_API_KEY"] = ""
 os.environ["OPENAI_BASE_URL"] = ""
 
-INPUT_JSON_PATH = "./output/obj/obj_select.json"
-KNOWLEDGE_FILE_PATH = "./library/obj_nature.txt"
-OUTPUT_RESULT_PATH = "./output/obj/obj_param.txt"
-FEEDBACK_FILE_PATH = "./output/obj/reflection_feedback.json"
+INPUT_JSON_PATH = run_path("./output/obj/obj_select.json")
+# Every factory library retrieval can draw from, with the generate template whose
+# examples the code generator should follow for its factories.
+KNOWLEDGE_SOURCES = [
+    {"path": "./library/obj_nature.txt", "domain": "nature", "template": "./library/obj_nature_generate.txt"},
+    {"path": "./library/obj_indoor.txt", "domain": "indoor", "template": "./library/obj_indoor_generate.txt"},
+]
+KNOWLEDGE_INDEX_NAME = "obj_library"
+ENTRY_INDEX_NAME = "obj_library_entries"
+
+# Parameter-level retrieval: the agent sees the PARAM_TOP_K parameter entries
+# closest to the prompt, the factory's core parameters, the keys it already set
+# and the closest example block instead of the whole factory chunk.
+PARAM_TOP_K = 8
+CORE_SECTION_MARKERS = ("core",)
+CORE_FALLBACK_COUNT = 4
+PARAM_NAME = re.compile(r"^-\s+([A-Za-z_]\w*)")
+EXAMPLE_HEADING = re.compile(r"^Example \d+")
+PARAM_KEY = re.compile(r"['\"](\w+)['\"]\s*:")
+# Lexical ranking, used while the embedding model is not loaded
+WORD = re.compile(r"[a-z0-9]+")
+MIN_WORD_LENGTH = 3
+
+# Chunk headers: nature docs start a factory with its bare name ("LeafFactory"),
+# indoor docs with "CupFactory High-Precision API Parameters (Semantic-Driven)".
+NATURE_HEADER = re.compile(r"^([A-Z][A-Za-z]*(?:Factory|Trees))$")
+INDOOR_HEADER = re.compile(r"^([A-Z]\w*Factory) High-Precision API Parameters")
+OUTPUT_RESULT_PATH = run_path("./output/obj/obj_param.txt")
+FEEDBACK_FILE_PATH = run_path("./output/obj/reflection_feedback.json")
+
+# Beam search: seed of the first padded candidate when the agent returns fewer
+# distinct parameter sets than requested
+CANDIDATE_SEED_BASE = 1000
 
 
 class SemanticKnowledgeBase:
-    def __init__(self, file_path, model_name='all-MiniLM-L6-v2'):
-        self.file_path = file_path
-        self.embedder = SentenceTransformer(model_name)
+    def __init__(self, sources=KNOWLEDGE_SOURCES, model_name='all-MiniLM-L6-v2'):
+        self.sources = sources
+        self.model_name = model_name
+        self._embedder = None
+        self._index = None
+        self._library_hash = None
+        self._records = []
         self.chunks, self.factory_names, self.clean_names, self.embeddings = [], [], [], None
+        self.name_lookup = {}
+        self._entry_index = None
+        self._entries = []
+        self._entry_embeddings = None
         self._build_index()
 
+    @property
+    def embedder(self):
+        # Loading sentence-transformers pulls in torch, so defer it until a query
+        # actually needs semantic search.
+        if self._embedder is None:
+            from sentence_transformers import SentenceTransformer
+            self._embedder = SentenceTransformer(self.model_name)
+        return self._embedder
+
     def _build_index(self):
-        if not os.path.exists(self.file_path):
-            print(f" Error: Knowledge file {self.file_path} not found.")
+        sources = []
+        for source in self.sources:
+            if os.path.exists(source["path"]):
+                sources.append(source)
+            else:
+                print(f" Error: Knowledge file {source['path']} not found.")
+        if not sources:
             return
 
-        with open(self.file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        main_factories = [
-            'LeafFactory',
-            'CactusFactory',
-            'CloudFactory',
-            'CrustaceanFactory',
-            'MonocotFactory',
-            'BoulderFactory',
-            'BlenderRockFactory',
-            'TreeFactory',
-            'BranchFactory',
-            'FlowerFactory',
-            'MushroomFactory',
-            'FruitFactory',
-            'CoralFactory',
-            'MolluskFactory',
-            'SeaweedFactory',
-            'UrchinFactory',
-            'GrassTuftFactory',
-            'DandelionFactory',
-            'FernFactory',
-            'FishFactory',
-            'JellyfishFactory',
-            'PalmTreeFactory',
-            'ChoppedTrees',  
-        ]
-        
+        # One index over all libraries. The chunk table and embedding matrix are
+        # persisted next to each other and memory-mapped on later runs; only chunks
+        # whose text changed are re-encoded.
+        combined = [f"{s['path']}|{s['domain']}|{s['template']}|{sha256_file(s['path'])}" for s in sources]
+        self._library_hash = sha256_text("\n".join(combined))
+        self._index = PersistedEmbeddingIndex(KNOWLEDGE_INDEX_NAME, self.model_name)
+
+        meta = self._index.load(self._library_hash)
+        if meta is not None:
+            records = meta["records"]
+            self.embeddings = self._index.embeddings()
+        else:
+            records = []
+            for source in sources:
+                with open(source["path"], 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+                for record in self._parse_chunks(lines):
+                    record.update(domain=source["domain"], template=source["template"])
+                    records.append(record)
+
+        self._records = records
+        self.chunks = [r["chunk"] for r in records]
+        self.factory_names = [r["factory_name"] for r in records]
+        self.clean_names = [r["clean_name"] for r in records]
+
+        for idx, (factory_name, clean_name) in enumerate(zip(self.factory_names, self.clean_names)):
+            clean_lower = clean_name.lower().strip()
+            aliases = {
+                factory_name.lower(),
+                factory_name.replace("Factory", "").lower(),
+                clean_lower,
+                clean_lower.replace(" ", ""),
+                clean_lower.replace(" ", "_"),
+            }
+            for alias in aliases:
+                self.name_lookup.setdefault(alias, idx)
+
+        self._entry_index = PersistedEmbeddingIndex(ENTRY_INDEX_NAME, self.model_name)
+        meta = self._entry_index.load(self._library_hash)
+        if meta is not None:
+            self._entries = meta["records"]
+            self._entry_embeddings = self._entry_index.embeddings()
+        else:
+            self._entries = [entry for record in records for entry in self._parse_entries(record)]
+
+    def source_of(self, factory_name):
+        """
+        Returns:
+            dict: The record of `factory_name` (domain, template, ...), or None.
+        """
+        idx = self.name_lookup.get(factory_name.lower())
+        return self._records[idx] if idx is not None else None
+
+    def _ensure_embeddings(self):
+        if self.embeddings is None and self._records:
+            texts_to_embed = [f"{r['clean_name']}. {r['clean_name']}. {r['chunk']}" for r in self._records]
+            self.embeddings = self._index.build(self._library_hash, self._records, texts_to_embed, self._encode)
+        return self.embeddings
+
+    def _ensure_entry_embeddings(self):
+        if self._entry_embeddings is None and self._entries:
+            texts_to_embed = [f"{e['clean_name']}. {e['section']}. {e['text']}" for e in self._entries]
+            self._entry_embeddings = self._entry_index.build(self._library_hash, self._entries, texts_to_embed, self._encode)
+        return self._entry_embeddings
+
+    def _parse_entries(self, record):
+        """
+        Split a factory chunk into retrievable entries: one per `- name: ...`
+        parameter line (with its indented continuation), one per note section and
+        one per example block. Section headings are the first line of a paragraph.
+        """
+        base = {"factory_name": record["factory_name"], "clean_name": record["clean_name"]}
+        entries = []
+        section, kind, current = "", "param", None
+        new_paragraph = True
+        for order, line in enumerate(record["chunk"].split("\n")[1:]):
+            line = line.rstrip()
+            if not line.strip():
+                new_paragraph = True
+                continue
+            starts_entry = line.startswith("-")
+            if new_paragraph and not starts_entry and not line[0].isspace():
+                new_paragraph = False
+                if line.startswith("API Source"):
+                    entries.append(dict(base, kind="header", name="", section="", order=order, text=line))
+                    section, kind, current = "", "param", None
+                    continue
+                lowered = line.lower()
+                current = None
+                if lowered.startswith("example"):
+                    section, kind = line, "example"
+                    if EXAMPLE_HEADING.match(line):
+                        # "Example 1: ..." headings open their own block
+                        current = dict(base, kind="example", name="", section="", order=order, text=line)
+                        entries.append(current)
+                elif lowered.startswith(("note", "usage note")):
+                    section, kind = line, "note"
+                else:
+                    section, kind = line, "param"
+                continue
+            new_paragraph = False
+
+            if kind == "example":
+                if starts_entry or current is None:
+                    current = dict(base, kind="example", name="", section=section, order=order, text=line)
+                    entries.append(current)
+                else:
+                    current["text"] += "\n" + line
+            elif kind == "param" and starts_entry:
+                match = PARAM_NAME.match(line)
+                current = dict(base, kind="param", name=match.group(1) if match else "", section=section, order=order, text=line)
+                entries.append(current)
+            elif current is not None and line[0].isspace():
+                current["text"] += "\n" + line
+            elif current is not None and current["kind"] == "note":
+                current["text"] += "\n" + line
+            else:
+                current = dict(base, kind="note", name="", section=section, order=order, text=line)
+                entries.append(current)
+        return entries
+
+    def compact_doc(self, factory_name, query, top_k=PARAM_TOP_K, previous_keys=()):
+        """
+        Build a reduced API doc for `factory_name`: the header, the core
+        parameters, any parameter in `previous_keys`, the `top_k` parameter or note
+        entries closest to `query`, and the single closest example block.
+
+        Returns:
+            str: The reduced doc, or None when the factory has no entries.
+        """
+        rows = [i for i, e in enumerate(self._entries) if e["factory_name"] == factory_name]
+        if not rows:
+            return None
+        entries = [self._entries[i] for i in rows]
+
+        params = [i for i, e in zip(rows, entries) if e["kind"] in ("param", "note")]
+        examples = [i for i, e in zip(rows, entries) if e["kind"] == "example"]
+
+        selected = {i for i, e in zip(rows, entries) if e["kind"] == "header"}
+        core = [i for i in params if self._entries[i]["kind"] == "param"
+                and self._entries[i]["section"].lower().startswith(CORE_SECTION_MARKERS)]
+        if not core:
+            core = [i for i in params if self._entries[i]["kind"] == "param"][:CORE_FALLBACK_COUNT]
+        selected.update(core)
+        previous_keys = set(previous_keys)
+        selected.update(i for i in params if self._entries[i]["name"] in previous_keys)
+
+        best_example = None
+        # Semantic ranking only when the embedder is already loaded (a fuzzy
+        # search() needed it); an exact-name match must not pull in torch
+        matrix = self._ensure_entry_embeddings() if self._embedder is not None else None
+        if matrix is not None and (params or examples):
+            query_embedding = self._encode([query])[0]
+            if params:
+                for hit, _ in cosine_top_k(matrix[params], query_embedding, top_k):
+                    selected.add(params[hit])
+            if examples:
+                hits = cosine_top_k(matrix[examples], query_embedding, 1)
+                best_example = examples[hits[0][0]] if hits else None
+        else:
+            selected.update(self._lexical_top_k(params, query, top_k))
+            if examples:
+                best_example = (self._lexical_top_k(examples, query, 1) or examples[:1])[0]
+
+        lines = [self._entries[rows[0]]["factory_name"]]
+        section = None
+        for i in sorted(selected, key=lambda i: self._entries[i]["order"]):
+            entry = self._entries[i]
+            if entry["section"] != section:
+                section = entry["section"]
+                if section:
+                    lines.append("")
+                    lines.append(section)
+            lines.append(entry["text"])
+        if best_example is not None:
+            example = self._entries[best_example]
+            lines.append("")
+            lines.append(example["section"] or "Example")
+            lines.append(example["text"])
+        return "\n".join(lines)
+
+    def _lexical_top_k(self, rows, query, top_k):
+        """Entries of `rows` sharing the most words with `query` (ties keep document order)."""
+        words = {w for w in WORD.findall(query.lower()) if len(w) >= MIN_WORD_LENGTH}
+        scored = []
+        for i in rows:
+            entry = self._entries[i]
+            text = f"{entry['name'].replace('_', ' ')} {entry['section']} {entry['text']}".lower()
+            score = len(words & set(WORD.findall(text)))
+            if score:
+                scored.append((-score, entry["order"], i))
+        return [i for _, _, i in sorted(scored)[:top_k]]
+
+    def _encode(self, texts):
+        return self.embedder.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+    def _parse_chunks(self, lines):
         valid_chunks, raw_names, clean_names = [], [], []
         current_factory = None
         current_chunk_lines = []
@@ -63,14 +289,9 @@ class SemanticKnowledgeBase:
         for line in lines:
             stripped_line = line.strip()
             
-            is_main_factory = False
-            factory_name = None
-            
-            for main_factory in main_factories:
-                if stripped_line == main_factory:
-                    is_main_factory = True
-                    factory_name = main_factory
-                    break
+            header = NATURE_HEADER.match(stripped_line) or INDOOR_HEADER.match(stripped_line)
+            is_main_factory = header is not None
+            factory_name = header.group(1) if header else None
             
             if is_main_factory and current_factory is not None:
                 chunk_text = ''.join(current_chunk_lines).strip()
@@ -98,38 +319,25 @@ class SemanticKnowledgeBase:
                 clean_names.append(semantic_name)
         
 
-        texts_to_embed = [f"{clean}. {clean}. {chunk}" for clean, chunk in zip(clean_names, valid_chunks)]
-        self.embeddings = self.embedder.encode(texts_to_embed, convert_to_tensor=True)
-        self.chunks = valid_chunks
-        self.factory_names = raw_names
-        self.clean_names = clean_names
+        return [
+            {"factory_name": raw, "clean_name": clean, "chunk": chunk}
+            for raw, clean, chunk in zip(raw_names, clean_names, valid_chunks)
+        ]
 
     def search(self, query: str, top_k=1):
-        if self.embeddings is None: return []
-        
-        query_lower = query.lower().strip()
-        exact_matches = []
-        
-        for idx, (factory_name, clean_name) in enumerate(zip(self.factory_names, self.clean_names)):
-            core_name = factory_name.replace("Factory", "").lower()
-            clean_name_lower = clean_name.lower().strip()
-            
-            if query_lower == core_name or query_lower == clean_name_lower:
-                exact_matches.append((idx, factory_name, clean_name))
+        if not self.chunks: return []
         
-        if exact_matches:
-            results = []
-            for idx, factory_name, clean_name in exact_matches[:top_k]:
-                results.append((factory_name, clean_name, self.chunks[idx], 1.0))  
-            return results
+        idx = self.name_lookup.get(query.lower().strip())
+        if idx is not None:
+            return [(self.factory_names[idx], self.clean_names[idx], self.chunks[idx], 1.0)]
         
-        query_embedding = self.embedder.encode(query, convert_to_tensor=True)
-        hits = util.semantic_search(query_embedding, self.embeddings, top_k=top_k)
+        if self._ensure_embeddings() is None: return []
+        query_embedding = self._encode([query])[0]
+        hits = cosine_top_k(self.embeddings, query_embedding, top_k)
         
         results = []
-        for hit in hits[0]: 
-            idx = hit['corpus_id']
-            results.append((self.factory_names[idx], self.clean_names[idx], self.chunks[idx], hit['score']))
+        for idx, score in hits: 
+            results.append((self.factory_names[idx], self.clean_names[idx], self.chunks[idx], score))
         return results
 
 class ParamGenAgent:
@@ -137,8 +345,7 @@ class ParamGenAgent:
         self.client = OpenAI()
         self.model = "gpt-4o" 
 
-    def generate(self, factory_name, doc_content, key_obj, scene_prompt, previous_params=None, feedback=None):
-
+    def _build_prompts(self, factory_name, doc_content, key_obj, scene_prompt, previous_params=None, feedback=None):
         # Build refinement context if feedback exists
         refinement_context = ""
         if previous_params and feedback:
@@ -196,20 +403,69 @@ You are in **REFINEMENT MODE**. This is NOT the first generation attempt.
         
         {"Generate REFINED parameters based on the feedback above." if refinement_context else "Generate the parameter dictionary for " + factory_name + " now. Ensure the output is NOT empty."}
         """
+        return system_prompt, user_prompt
 
+    def generate(self, factory_name, doc_content, key_obj, scene_prompt, previous_params=None, feedback=None):
+        system_prompt, user_prompt = self._build_prompts(factory_name, doc_content, key_obj, scene_prompt,
+                                                         previous_params, feedback)
         try:
-            response = self.client.chat.completions.create(
+            content = cached_completion(
+                self.client,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                temperature=0.3 
+                temperature=0.3,
+                validate=lambda content: isinstance(ast.literal_eval(self._clean_output(content)), dict)
             )
-            return self._clean_output(response.choices[0].message.content)
+            return self._clean_output(content)
         except Exception as e:
             return f"Error: {e}"
 
+    def generate_candidates(self, factory_name, doc_content, key_obj, scene_prompt, n,
+                            previous_params=None, feedback=None):
+        """
+        Propose `n` distinct parameter dictionaries in one call, for beam search.
+
+        Returns:
+            list: Params dict strings (possibly fewer than `n`, empty on failure).
+        """
+        system_prompt, user_prompt = self._build_prompts(factory_name, doc_content, key_obj, scene_prompt,
+                                                         previous_params, feedback)
+        system_prompt += f"""
+        ### CANDIDATES (OVERRIDES THE OUTPUT FORMAT ABOVE):
+        Return a Python list of exactly {n} parameter dictionaries, each a complete and valid answer.
+        Make them visibly different from each other: vary the parameters that most change the silhouette,
+        proportions or colour, while every candidate still matches the Scene Prompt{" and the feedback" if previous_params and feedback else ""}.
+           - Example: [{{'depth': 0.3, 'scale': 0.2}}, {{'depth': 0.5, 'scale': 0.25}}]
+           - Do NOT wrap in markdown code blocks.
+        """
+        user_prompt += f"""
+        Return {n} different candidate dictionaries as a Python list.
+        """
+
+        try:
+            content = cached_completion(
+                self.client,
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.7,
+                fresh=True
+            )
+            candidates = ast.literal_eval(self._clean_output(content))
+        except Exception as e:
+            print(f"[ParamGen] Candidate generation failed: {e}")
+            return []
+        if isinstance(candidates, dict):
+            candidates = [candidates]
+        if not isinstance(candidates, (list, tuple)):
+            return []
+        return [repr(c) for c in candidates[:n] if isinstance(c, dict)]
+
     def _clean_output(self, content):
         content = content.strip()
         if content.startswith("```"):
@@ -240,6 +496,10 @@ def load_previous_params(path):
         return match.group(1)
     return None
 
+def previous_param_keys(previous_params):
+    """Parameter names set in a previous params dict string."""
+    return PARAM_KEY.findall(previous_params) if previous_params else []
+
 def load_feedback(path):
     """Load feedback from reflection_feedback.json"""
     if not os.path.exists(path):
@@ -257,54 +517,178 @@ def load_feedback(path):
     
     return None
 
-def main():
-    import sys
-    
+def prepare_generation(user_prompt, kb=None):
+    """
+    Retrieve the factory documentation for the selected key object, along with
+    the previous parameters and critic feedback when refining.
+
+    Returns:
+        dict: key_obj, factory_name, domain, template, doc_content, previous_params
+        and feedback, or None if there is nothing to generate for.
+    """
     json_data = load_input_json(INPUT_JSON_PATH)
-    
+    if json_data is None:
+        print(f"Error: {INPUT_JSON_PATH} not found. Please run Agent 1 (Object Selection) first.")
+        return None
+
     key_obj = json_data.get("key_obj", "object")
 
-    if len(sys.argv) > 1:
-        user_prompt = sys.argv[1]
-    else:
-        user_prompt = ""
-    
     if user_prompt:
         print(f"User Prompt: {user_prompt}")
 
-
-
-    kb = SemanticKnowledgeBase(KNOWLEDGE_FILE_PATH)
+    kb = kb or SemanticKnowledgeBase()
     results = kb.search(key_obj, top_k=1)
     
     if not results:
         print("No matching factory found.")
-        return
+        return None
 
     factory_name, clean_name, doc_content, score = results[0]
-    print(f"Matched: '{clean_name}' ({factory_name}) | Score: {score:.4f}")
-    print(doc_content)
+    source = kb.source_of(factory_name) or {}
+    domain = source.get("domain", "nature")
+    template = source.get("template", KNOWLEDGE_SOURCES[0]["template"])
+    print(f"Matched: '{clean_name}' ({factory_name}, {domain}) | Score: {score:.4f}")
     
     # Check for previous parameters and feedback
     previous_params = load_previous_params(OUTPUT_RESULT_PATH)
     feedback = load_feedback(FEEDBACK_FILE_PATH)
+
+    query = f"{key_obj}. {user_prompt}"
+    if previous_params and feedback:
+        query += f" {feedback}"
+    compact = kb.compact_doc(factory_name, query, previous_keys=previous_param_keys(previous_params))
+    if compact:
+        print(f"Doc context: {len(compact)}/{len(doc_content)} chars")
+        doc_content = compact
+    print(doc_content)
     
     if previous_params and feedback:
         print("REFINEMENT MODE ACTIVATED")
         print(f"Previous Parameters Found:\n{previous_params}")
         print(f"\nFeedback:\n{feedback}")
-    
-    agent = ParamGenAgent()
-    params_str = agent.generate(factory_name, doc_content, key_obj, user_prompt, previous_params, feedback)
+
+    return {
+        "key_obj": key_obj,
+        "factory_name": factory_name,
+        "domain": domain,
+        "template": template,
+        "doc_content": doc_content,
+        "previous_params": previous_params,
+        "feedback": feedback,
+    }
+
+def write_params(path, user_prompt, context, params_str):
+    """Validate `params_str` against the factory schema and write it as an obj_param.txt file."""
+    factory_name = context["factory_name"]
+
+    # Catch misspelled keys and out-of-range values here instead of after a
+    # Blender run and a render
+    params_str, issues = validate_params(factory_name, params_str)
+    validation_lines = "".join(f"# Validation: {issue}\n" for issue in issues)
+    for issue in issues:
+        print(f"[Param Schema] {issue}")
     
     output_content = f"""# Result for: "{user_prompt}"
-# Key Object: {key_obj}
+# Key Object: {context["key_obj"]}
 # Factory: {factory_name}
-
+# Domain: {context["domain"]}
+# Template: {context["template"]}
+{validation_lines}
 params = {params_str}
 """
-    with open(OUTPUT_RESULT_PATH, "w", encoding="utf-8") as f:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
         f.write(output_content)
+    return path
+
+def run_param_generation(user_prompt, kb=None, agent=None):
+    """
+    Agent 2: Retrieve the factory documentation for the selected key object
+    and write the generated parameter dictionary to OUTPUT_RESULT_PATH.
+
+    Args:
+        user_prompt (str): Original scene instruction.
+        kb (SemanticKnowledgeBase): Reused across calls by the pipeline runner.
+        agent (ParamGenAgent): Reused across calls by the pipeline runner.
+
+    Returns:
+        bool: Whether parameters were generated and saved.
+    """
+    context = prepare_generation(user_prompt, kb)
+    if context is None:
+        return False
+
+    agent = agent or ParamGenAgent()
+    params_str = agent.generate(context["factory_name"], context["doc_content"], context["key_obj"], user_prompt,
+                                context["previous_params"], context["feedback"])
+    write_params(OUTPUT_RESULT_PATH, user_prompt, context, params_str)
+    return True
+
+def pad_candidates(candidates, n, seed_base=CANDIDATE_SEED_BASE):
+    """
+    Drop duplicate parameter sets and fill up to `n` with copies of the first
+    one under different factory seeds.
+
+    Returns:
+        list: `n` params dict strings (empty if `candidates` is).
+    """
+    unique, seen = [], set()
+    for params_str in candidates:
+        try:
+            key = json.dumps(ast.literal_eval(params_str), sort_keys=True, default=str)
+        except (ValueError, SyntaxError):
+            key = params_str
+        if key not in seen:
+            seen.add(key)
+            unique.append(params_str)
+    if not unique:
+        return []
+    try:
+        base = ast.literal_eval(unique[0])
+    except (ValueError, SyntaxError):
+        base = None
+    if not isinstance(base, dict):
+        # Nothing to vary a seed on; repeat the first candidate
+        return (unique + unique[:1] * n)[:n]
+    base = {k: v for k, v in base.items() if k not in SEED_KEYS}
+    seed = seed_base
+    while len(unique) < n:
+        unique.append(repr(dict(base, factory_seed=seed)))
+        seed += 1
+    return unique[:n]
+
+def run_param_candidates(user_prompt, paths, kb=None, agent=None):
+    """
+    Beam-search variant of Agent 2: write one distinct parameter set per path in
+    `paths`, all refined from the same previous parameters and feedback.
+
+    Returns:
+        list: The written paths, or an empty list on failure.
+    """
+    context = prepare_generation(user_prompt, kb)
+    if context is None:
+        return []
+
+    agent = agent or ParamGenAgent()
+    args = (context["factory_name"], context["doc_content"], context["key_obj"], user_prompt)
+    candidates = agent.generate_candidates(*args, len(paths), context["previous_params"], context["feedback"])
+    if not candidates:
+        print("[ParamGen] No candidate list returned, using seed variants of a single parameter set")
+        candidates = [agent.generate(*args, context["previous_params"], context["feedback"])]
+    candidates = pad_candidates(candidates, len(paths))
+    print(f"[ParamGen] {len(candidates)} candidates")
+    return [write_params(path, user_prompt, context, params_str) for path, params_str in zip(paths, candidates)]
+
+def main():
+    import sys
+
+    if len(sys.argv) > 1:
+        user_prompt = sys.argv[1]
+    else:
+        user_prompt = ""
+
+    if not run_param_generation(user_prompt):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,391 @@
+import concurrent.futures
+import os
+import queue
+import runpy
+import shutil
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from obj_select_agent import ObjSelectAgent
+from obj_params_agent import (
+    OUTPUT_RESULT_PATH,
+    ParamGenAgent,
+    SemanticKnowledgeBase,
+    run_param_candidates,
+    run_param_generation,
+)
+from obj_generate_agent import (
+    OUTPUT_SCRIPT_PATH,
+    CodeGenAgent,
+    run_code_generation,
+)
+from objreflection import VLMCritic, run_candidate_reflection, run_reflection
+from raster_preview import PREVIEW_MESH_PATH, raster_available, render_preview, render_previews
+from blender_worker import BlenderWorker, WorkerDied
+from stages import StageError, StageRunner, working_directory
+from workspace import run_path
+
+# In-process replacement for the per-stage `python` calls in scripts/obj.sh.
+# Clients, the embedding model and the parsed libraries are created once and
+# reused across every refinement iteration.
+
+SELECT_OUTPUT_PATH = run_path("./output/obj/obj_select.json")
+# render_object.OUT_DIR; render_object imports bpy, so it is only imported by
+# the in-process fallbacks and the parent never forks with Blender loaded
+RENDER_DIR = run_path("./infinigen/outputs/obj/render")
+INFINIGEN_DIR = "./infinigen"
+MAX_ITERATIONS = 5
+# render_object quality tiers: candidates are judged on previews, and the
+# accepted one (or one the critic cannot judge) is re-rendered at final quality
+PREVIEW_QUALITY = "preview"
+FINAL_QUALITY = "final"
+# The first iterations are judged on Blender-free raster previews when the
+# worker holds the scene and pyrender is installed
+RASTER_QUALITY = "raster"
+RASTER_ITERATIONS = 2
+
+# Set to 1 to run obj_code.py and the renders in this process, as before the
+# persistent Blender worker
+WORKER_DISABLE_ENV = "CODE2WORLDS_BLENDER_WORKER_DISABLE"
+
+# Beam search: with a width K > 1 every round proposes K parameter sets, runs
+# them on up to K Blender workers in parallel, scores them in one critic request
+# and refines the best one. Width 1 is the sequential loop above.
+BEAM_WIDTH_ENV = "CODE2WORLDS_OBJ_BEAM_WIDTH"
+BEAM_WORKERS_ENV = "CODE2WORLDS_OBJ_BEAM_WORKERS"
+DEFAULT_BEAM_WIDTH = 1
+# Per-candidate files; "{}" is the candidate number
+BEAM_PARAM_PATH = run_path("./output/obj/beam/obj_param_{}.txt")
+BEAM_SCRIPT_PATH = run_path("./infinigen/obj_code_beam{}.py")
+BEAM_OUTPUT_DIR = run_path("./infinigen/outputs/obj/beam/{}")
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, "") or default)
+    except ValueError:
+        print(f"Warning: {name} is not an integer, using {default}")
+        return default
+
+
+def execute_generated_script(script_path=OUTPUT_SCRIPT_PATH, cwd=INFINIGEN_DIR):
+    """
+    Run the generated obj_code.py inside this process, from the infinigen
+    directory, exactly like `cd infinigen && python obj_code.py`.
+    """
+    script_path = os.path.abspath(script_path)
+    if not os.path.isdir(cwd):
+        raise StageError(f"infinigen folder not found: {cwd}")
+    with working_directory(cwd):
+        try:
+            runpy.run_path(script_path, run_name="__main__")
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                raise StageError(f"{os.path.basename(script_path)} exited with code {e.code}")
+    return True
+
+
+class ObjPipeline(StageRunner):
+    def __init__(self, max_iterations=MAX_ITERATIONS, use_worker=None, preview_quality=PREVIEW_QUALITY,
+                 raster_iterations=RASTER_ITERATIONS, beam_width=None, beam_workers=None):
+        super().__init__()
+        self.max_iterations = max_iterations
+        self.beam_width = max(1, beam_width or _env_int(BEAM_WIDTH_ENV, DEFAULT_BEAM_WIDTH))
+        # Blender workers rendering candidates at the same time; each one renders
+        # with all cores, so fewer workers than candidates can be faster on small boxes
+        self.beam_workers = max(1, min(self.beam_width, beam_workers or _env_int(BEAM_WORKERS_ENV, self.beam_width)))
+        # Tier of the per-iteration renders; FINAL_QUALITY turns the ladder off
+        self.preview_quality = preview_quality
+        self.raster_iterations = raster_iterations if raster_available() else 0
+        self.select_agent = ObjSelectAgent()
+        self.param_agent = ParamGenAgent()
+        self.code_agent = CodeGenAgent()
+        self.critic = VLMCritic()
+        self.kb = SemanticKnowledgeBase()
+        self.templates = {}
+        if use_worker is None:
+            use_worker = os.environ.get(WORKER_DISABLE_ENV, "").strip().lower() not in ("1", "true", "yes", "on")
+        self.worker = BlenderWorker() if use_worker else None
+        # Whether the worker holds the scene of the last executed script
+        self._scene_in_worker = False
+        # Extra workers for beam candidates, next to self.worker
+        self.beam_pool = []
+
+    def _execute(self):
+        self._scene_in_worker = False
+        if self.worker is not None:
+            try:
+                self._scene_in_worker = self.worker.run_script(OUTPUT_SCRIPT_PATH, INFINIGEN_DIR)
+                return True
+            except WorkerDied as e:
+                print(f"Warning: {e}, running obj_code.py in this process")
+        return execute_generated_script()
+
+    def _raster(self):
+        self.worker.export_mesh(PREVIEW_MESH_PATH)
+        paths = render_preview(PREVIEW_MESH_PATH)
+        return paths["front"], paths["side"]
+
+    def _quality_for(self, iteration):
+        if iteration <= self.raster_iterations and self._scene_in_worker:
+            return RASTER_QUALITY
+        return self.preview_quality
+
+    def _render(self, quality):
+        if self._scene_in_worker:
+            try:
+                return self.worker.render(RENDER_DIR, quality=quality)
+            except WorkerDied as e:
+                print(f"Warning: {e}, rendering the saved .blend in this process")
+        from render_object import render_object
+        return render_object(quality=quality)
+
+    def _render_and_reflect(self, user_prompt, quality):
+        images = None
+        if quality == RASTER_QUALITY:
+            try:
+                images = self._run_stage("Raster Preview", "Raster Preview", self._raster)
+            except StageError:
+                print(f"Warning: raster previews unavailable, using {self.preview_quality} renders")
+                self.raster_iterations = 0
+                quality = self.preview_quality
+        if images is None:
+            images = self._run_stage(f"Object Rendering ({quality})", "Object Rendering", self._render, quality)
+        front_img, side_img = (str(path) for path in images)
+        is_valid, feedback = self._run_stage("Agent 4: Reflection", "Reflection",
+                                             run_reflection, user_prompt, critic=self.critic,
+                                             front_img=front_img, side_img=side_img, quality=quality)
+        return is_valid, feedback, quality
+
+    def _generate_and_execute(self, user_prompt):
+        self._run_stage("Agent 2: Parameter Generation", "Parameter Generation",
+                        run_param_generation, user_prompt, kb=self.kb, agent=self.param_agent)
+        self._run_stage("Agent 3: Code Generation", "Code Generation",
+                        run_code_generation, agent=self.code_agent, templates=self.templates)
+        self._run_stage("generated code in infinigen directory", "obj_code.py", self._execute)
+
+    def _beam_workers(self):
+        """self.worker plus enough extra workers for beam_workers candidates at once ([] without workers)."""
+        if self.worker is None:
+            return []
+        while len(self.beam_pool) + 1 < self.beam_workers:
+            self.beam_pool.append(BlenderWorker())
+        return [self.worker] + self.beam_pool
+
+    def _beam_candidate(self, number):
+        out_dir = BEAM_OUTPUT_DIR.format(number)
+        os.makedirs(out_dir, exist_ok=True)
+        return {
+            "name": f"C{number}",
+            "param": BEAM_PARAM_PATH.format(number),
+            "script": BEAM_SCRIPT_PATH.format(number),
+            "blend": os.path.join(out_dir, "obj.blend"),
+            "preflight": os.path.join(out_dir, "preflight.json"),
+            "render_dir": os.path.join(out_dir, "render"),
+            "mesh": os.path.join(out_dir, "preview_mesh.npz"),
+            "raster_dir": os.path.join(out_dir, "raster"),
+        }
+
+    def _beam_quality_for(self, iteration):
+        if iteration <= self.raster_iterations and self.worker is not None:
+            return RASTER_QUALITY
+        return self.preview_quality
+
+    def _render_candidates(self, candidates, quality):
+        """
+        Execute and render every candidate, in parallel on the Blender workers
+        (one candidate per worker at a time) or one after another in this process.
+
+        Returns:
+            dict: candidate index -> (front, side) image paths, for the candidates that rendered.
+        """
+        workers = self._beam_workers()
+        results = {}
+        if not workers:
+            from render_object import render_object
+            for i, candidate in enumerate(candidates):
+                try:
+                    execute_generated_script(candidate["script"])
+                    results[i] = render_object(candidate["blend"], candidate["render_dir"], quality=quality)
+                except Exception as e:
+                    print(f"Warning: {candidate['name']} failed ({e})")
+            return {i: tuple(str(path) for path in paths) for i, paths in results.items()}
+
+        free = queue.Queue()
+        for worker in workers:
+            free.put(worker)
+
+        def build(candidate):
+            worker = free.get()
+            try:
+                worker.run_script(candidate["script"], INFINIGEN_DIR)
+                if quality == RASTER_QUALITY:
+                    return worker.export_mesh(candidate["mesh"])
+                return worker.render(candidate["render_dir"], quality=quality)
+            finally:
+                free.put(worker)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(workers)) as pool:
+            futures = {pool.submit(build, candidate): i for i, candidate in enumerate(candidates)}
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    print(f"Warning: {candidates[i]['name']} failed ({e})")
+
+        if quality == RASTER_QUALITY and results:
+            order = sorted(results)
+            previews = render_previews([(results[i], candidates[i]["raster_dir"]) for i in order])
+            results = {i: (paths["front"], paths["side"]) for i, paths in zip(order, previews) if paths}
+        return {i: tuple(str(path) for path in paths) for i, paths in results.items()}
+
+    def _beam_round(self, user_prompt, quality):
+        """
+        Propose, build, render and score beam_width candidates, and make the
+        best one the parameters the next round refines.
+
+        Returns:
+            tuple: (best candidate's verdict dict, best candidate, render quality used)
+        """
+        candidates = [self._beam_candidate(n) for n in range(1, self.beam_width + 1)]
+        self._run_stage(f"Agent 2: Parameter Generation ({len(candidates)} candidates)", "Parameter Generation",
+                        run_param_candidates, user_prompt, [c["param"] for c in candidates],
+                        kb=self.kb, agent=self.param_agent)
+
+        built = []
+        for candidate in candidates:
+            try:
+                self._run_stage(f"Agent 3: Code Generation ({candidate['name']})", "Code Generation",
+                                run_code_generation, agent=self.code_agent, templates=self.templates,
+                                param_path=candidate["param"], script_path=candidate["script"],
+                                blend_path=candidate["blend"], report_path=candidate["preflight"])
+                built.append(candidate)
+            except StageError:
+                print(f"Warning: dropping {candidate['name']}")
+        if not built:
+            raise StageError("Code Generation")
+
+        workers = len(self._beam_workers()) or 1
+        images = None
+        if quality == RASTER_QUALITY:
+            try:
+                images = self._run_stage(f"Candidate Raster Preview ({workers} workers)", "Raster Preview",
+                                         self._render_candidates, built, quality)
+            except StageError:
+                print(f"Warning: raster previews unavailable, using {self.preview_quality} renders")
+                self.raster_iterations = 0
+                quality = self.preview_quality
+        if images is None:
+            images = self._run_stage(f"Candidate Rendering ({quality}, {workers} workers)", "Candidate Rendering",
+                                     self._render_candidates, built, quality)
+
+        order = sorted(images)
+        best, verdicts = self._run_stage("Agent 4: Batched Reflection", "Reflection",
+                                         run_candidate_reflection, user_prompt, [images[i] for i in order],
+                                         critic=self.critic, quality=quality)
+        winner = built[order[best]]
+        shutil.copyfile(winner["param"], OUTPUT_RESULT_PATH)
+        return verdicts[best], winner, quality
+
+    def _beam_search(self, user_prompt):
+        for iteration in range(1, self.max_iterations + 1):
+            print("")
+            print(f"Round {iteration}/{self.max_iterations} (beam width {self.beam_width})")
+
+            verdict, winner, quality = self._beam_round(user_prompt, self._beam_quality_for(iteration))
+            is_valid, feedback = verdict["valid"], verdict["feedback"]
+            if is_valid or verdict["needs_higher_quality"]:
+                reason = "accepted" if is_valid else "critic asked for higher quality"
+                print("")
+                print(f"{winner['name']} {reason}, rebuilding it and re-rendering at {FINAL_QUALITY} quality")
+                # The winner's parameters are now obj_param.txt; rebuild it at the
+                # default script and .blend paths the downstream stages read
+                self._run_stage("Agent 3: Code Generation", "Code Generation",
+                                run_code_generation, agent=self.code_agent, templates=self.templates)
+                self._run_stage("generated code in infinigen directory", "obj_code.py", self._execute)
+                is_valid, feedback, _ = self._render_and_reflect(user_prompt, FINAL_QUALITY)
+
+            if is_valid:
+                print("")
+                print("Validation passed! Object generation successful!")
+                return
+
+            print("")
+            print(f"Validation failed. Feedback on {winner['name']}:")
+            print("  ", feedback)
+        print("")
+        print(f"Maximum iterations reached ({self.max_iterations}), but validation still failed.")
+
+    def _refine(self, user_prompt):
+        self._generate_and_execute(user_prompt)
+
+        for iteration in range(1, self.max_iterations + 1):
+            print("")
+            print(f"Iteration {iteration}/{self.max_iterations}")
+
+            is_valid, feedback, quality = self._render_and_reflect(user_prompt, self._quality_for(iteration))
+            if quality != FINAL_QUALITY and (is_valid or self.critic.needs_higher_quality):
+                reason = "accepted" if is_valid else "critic asked for higher quality"
+                print("")
+                print(f"{quality.capitalize()} render {reason}, re-rendering at {FINAL_QUALITY} quality")
+                is_valid, feedback, _ = self._render_and_reflect(user_prompt, FINAL_QUALITY)
+
+            if is_valid:
+                print("")
+                print("Validation passed! Object generation successful!")
+                break
+
+            print("")
+            print("Validation failed. Feedback:")
+            print("  ", feedback)
+
+            if iteration < self.max_iterations:
+                print("")
+                print(f"Regenerating based on feedback... (Attempt {iteration}/{self.max_iterations})")
+                self._generate_and_execute(user_prompt)
+            else:
+                print("")
+                print(f"Maximum iterations reached ({self.max_iterations}), but validation still failed.")
+
+    def run(self, user_prompt):
+        """
+        Returns:
+            int: Process exit code, matching scripts/obj.sh (0 on completion, 1 on a failed stage).
+        """
+        print(f"User Prompt: {user_prompt}")
+        try:
+            selection = self._run_stage("Agent 1: Object Selection", "Object Selection",
+                                        self.select_agent.run, user_prompt, output_path=SELECT_OUTPUT_PATH)
+            if not selection[0].get("key_obj"):
+                print("No key object selected (environment-only prompt), skipping object generation.")
+                return 0
+
+            if self.beam_width > 1:
+                self._beam_search(user_prompt)
+            else:
+                self._refine(user_prompt)
+        except StageError:
+            return 1
+        finally:
+            if self.worker is not None:
+                self.worker.close()
+            for worker in self.beam_pool:
+                worker.close()
+            self.print_summary()
+        return 0
+
+
+def main():
+    if len(sys.argv) < 2 or not sys.argv[1]:
+        print("Error: Please provide user_prompt parameter")
+        print("Usage: python agent/obj_stream/obj_pipeline.py \"your prompt here\"")
+        print("Example: python agent/obj_stream/obj_pipeline.py \"A heavy iron anvil crushing a soda can\"")
+        sys.exit(1)
+
+    pipeline = ObjPipeline()
+    sys.exit(pipeline.run(sys.argv[1]))
+
+
+if __name__ == "__main__":
+    main()
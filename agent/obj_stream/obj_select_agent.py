@@ -1,9 +1,14 @@
 import os
 import json
 import re
+import sys
 from typing import List, Optional, Dict, Union
 from openai import OpenAI
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import cached_completion
+from workspace import run_path
+
 os.environ["OPENAI_API_KEY"] = ""
 os.environ["OPENAI_BASE_URL"] = ""
 
@@ -79,14 +84,16 @@ Output: {
         ]
         
         
-        response = self.client.chat.completions.create(
+        content = cached_completion(
+            self.client,
             model=self.model,
             messages=messages,
             temperature=0.1, 
-            max_tokens=500
+            max_tokens=500,
+            validate=lambda content: self._parse_json_response(content.strip()) is not None
         )
         
-        content = response.choices[0].message.content.strip()
+        content = content.strip()
         # print(f"Debug - LLM Response: {content}") 
 
         obj_data = self._parse_json_response(content)
@@ -154,7 +161,7 @@ def main():
     else:
         print(f"User Prompt: {user_prompt}")
     
-    output_file = "./output/obj/obj_select.json"
+    output_file = run_path("./output/obj/obj_select.json")
     
     result = agent.run(user_prompt, output_path=output_file)
     print(f"Result: {result}")
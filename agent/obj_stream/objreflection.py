@@ -2,21 +2,41 @@ import base64
 import json
 import os
 import sys
+import cv2
 from openai import OpenAI
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from contact_sheet import build_contact_sheets, image_parts
+from llm_cache import cached_completion, is_json
+from verdict_cache import get_default_verdict_cache, image_file_signature, make_context_key
+from workspace import run_path
+
 API_KEY = ""
 BASE_URL = ""
 MODEL_NAME = "gemini-3-pro-preview"
 
 # Default paths
-FRONT_IMAGE_PATH = "./infinigen/outputs/obj/render/front.png"
-SIDE_IMAGE_PATH = "./infinigen/outputs/obj/render/side.png"
-OUTPUT_FEEDBACK_PATH = "./output/obj/reflection_feedback.json"
+FRONT_IMAGE_PATH = run_path("./infinigen/outputs/obj/render/front.png")
+SIDE_IMAGE_PATH = run_path("./infinigen/outputs/obj/render/side.png")
+OUTPUT_FEEDBACK_PATH = run_path("./output/obj/reflection_feedback.json")
+
+# Send the views as one labelled JPEG contact sheet instead of full-size PNGs
+USE_CONTACT_SHEET = True
+SHEET_TOKEN_BUDGET = 1200
+SHEET_FORMAT = "jpeg"
+SHEET_QUALITY = 90
+# Beam search: all candidates' views go on the sheets of one batched request
+BATCH_SHEET_TOKEN_BUDGET = 2400
 
 class VLMCritic:
-    def __init__(self):
+    def __init__(self, contact_sheet=USE_CONTACT_SHEET, verdict_cache=None):
         self.client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
         self.model = MODEL_NAME
+        self.contact_sheet = contact_sheet
+        # Reuses the verdict of a near-identical render (see verdict_cache)
+        self.verdict_cache = verdict_cache or get_default_verdict_cache()
+        # Set by evaluate(): the critic could not judge the images at this quality
+        self.needs_higher_quality = False
 
     def _encode_image(self, image_path):
 
@@ -25,28 +45,29 @@ class VLMCritic:
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode('utf-8')
 
-    def evaluate(self, front_image_path, side_image_path, instruction):
-        """
-        Evaluate generated 3D object from front and side views
-        
-        Args:
-            front_image_path (str): Path to front view render
-            side_image_path (str): Path to side view render
-            instruction (str): User's original instruction
-            
-        Returns:
-            tuple: (is_valid: bool, feedback: str)
-            - is_valid (V): Whether validation passed
-            - feedback (F_obj): If failed, return modification suggestions; if successful, return empty or praise.
-        """
-        
-        # Prepare images
-        base64_front = self._encode_image(front_image_path)
-        base64_side = self._encode_image(side_image_path)
-        
+    def _image_parts(self, front_image_path, side_image_path):
+        if not self.contact_sheet:
+            return [
+                {"type": "text", "text": "Front View:"},
+                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{self._encode_image(front_image_path)}"}},
+                {"type": "text", "text": "Side View:"},
+                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{self._encode_image(side_image_path)}"}}
+            ]
+        images = []
+        for image_path in (front_image_path, side_image_path):
+            image = cv2.imread(image_path, cv2.IMREAD_COLOR) if os.path.exists(image_path) else None
+            if image is None:
+                raise FileNotFoundError(f"Image not found: {image_path}")
+            images.append(image)
+        sheets = build_contact_sheets(images, ["Front", "Side"], token_budget=SHEET_TOKEN_BUDGET,
+                                      fmt=SHEET_FORMAT, quality=SHEET_QUALITY)
+        return image_parts(sheets)
+
+    def _system_prompt(self, quality=None):
         system_prompt = """
         You are the **Semantic Visual Critic** for a 3D procedural generation system.
         Your task is to verify if the generated 3D object images (front and side views) match the user's text description.
+        The views may arrive as one contact sheet with labelled "Front" and "Side" cells.
 
         ### CRITERIA:
         1. **Semantic Alignment**: Does the object match the description? (e.g., "Dead tree" must have no leaves).
@@ -56,37 +77,90 @@ class VLMCritic:
         ### OUTPUT FORMAT (JSON ONLY):
         {
             "valid": boolean,      // Set to true ONLY if the images strictly meet the instruction.
-            "feedback": "string"   // If valid=false, provide SPECIFIC parameter-level advice to fix it. 
+            "feedback": "string",  // If valid=false, provide SPECIFIC parameter-level advice to fix it. 
                                    // Example: "The tree is too green for a 'dead tree'. Set leaf_density to 0.0."
+            "needs_higher_quality": boolean  // Set to true ONLY if render noise or resolution prevents a verdict.
         }
         """
+        if quality in ("preview", "eevee_preview"):
+            system_prompt += """
+        ### PREVIEW RENDERS:
+        These are fast preview renders (few samples, 512px). Judge shape, proportions and colour;
+        ignore sampling noise and soft detail. If a verdict depends on fine detail you cannot see,
+        set "needs_higher_quality" to true.
+        """
+        elif quality == "raster":
+            system_prompt += """
+        ### RASTER PREVIEWS:
+        These are flat-shaded rasterized previews: every material is shown as its plain base colour,
+        without textures, displacement or realistic lighting. Judge shape, proportions, part layout and
+        overall colour only. If the verdict depends on surface detail or materials, set
+        "needs_higher_quality" to true.
+        """
+        return system_prompt
+
+    def build_messages(self, front_image_path, side_image_path, instruction, quality=None):
+        """Chat messages for one evaluation (see evaluate())."""
+        system_prompt = self._system_prompt(quality)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": [
+                {"type": "text", "text": f"User Instruction: {instruction}\n\nPlease evaluate both the front view and side view:"},
+                *self._image_parts(front_image_path, side_image_path)
+            ]}
+        ]
+
+    def evaluate(self, front_image_path, side_image_path, instruction, quality=None):
+        """
+        Evaluate generated 3D object from front and side views
+        
+        Args:
+            front_image_path (str): Path to front view render
+            side_image_path (str): Path to side view render
+            instruction (str): User's original instruction
+            quality (str): Render tier of the images ("preview" renders are low-sample and 512px,
+                "raster" images are flat-shaded raster_preview renders)
+            
+        Returns:
+            tuple: (is_valid: bool, feedback: str)
+            - is_valid (V): Whether validation passed
+            - feedback (F_obj): If failed, return modification suggestions; if successful, return empty or praise.
+        """
 
         print(f"[*] VLM-Critic is evaluating images:")
         print(f"    - Front view: {os.path.basename(front_image_path)}")
         print(f"    - Side view: {os.path.basename(side_image_path)}")
 
+        self.needs_higher_quality = False
+        signatures = [image_file_signature(path) for path in (front_image_path, side_image_path)]
+        context = make_context_key("object", self.model, instruction, quality=quality)
+        cached = self.verdict_cache.get(context, signatures)
+        if cached is not None:
+            self.needs_higher_quality = cached.get("needs_higher_quality", False)
+            return cached["valid"], cached["feedback"]
+
+        # Composing and encoding the images is only paid on a verdict cache miss
+        messages = self.build_messages(front_image_path, side_image_path, instruction, quality)
         try:
-            response = self.client.chat.completions.create(
+            result_text = cached_completion(
+                self.client,
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": [
-                        {"type": "text", "text": f"User Instruction: {instruction}\n\nPlease evaluate both the front view and side view:"},
-                        {"type": "text", "text": "Front View:"},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_front}"}},
-                        {"type": "text", "text": "Side View:"},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_side}"}}
-                    ]}
-                ],
+                messages=messages,
                 temperature=0.0,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                validate=is_json
             )
 
-            result_text = response.choices[0].message.content
             result_json = json.loads(result_text)
             
             is_valid = result_json.get("valid", False)
             feedback = result_json.get("feedback", "No feedback provided.")
+            self.needs_higher_quality = bool(result_json.get("needs_higher_quality", False))
+            self.verdict_cache.put(context, signatures, {
+                "valid": is_valid,
+                "feedback": feedback,
+                "needs_higher_quality": self.needs_higher_quality,
+            })
             
             return is_valid, feedback
 
@@ -94,27 +168,180 @@ class VLMCritic:
             print(f"[Error] VLM Evaluation failed: {e}")
             return False, f"Critic Error: {str(e)}"
 
-if __name__ == "__main__":
-    # Get user prompt from command line arguments
-    if len(sys.argv) > 1:
-        user_instruction = sys.argv[1]
-    else:
-        user_instruction = ""
-        print(f"Warning: No instruction provided. Using default: {user_instruction}")
+    def build_batch_messages(self, candidates, instruction, quality=None):
+        """Chat messages scoring several candidates in one request (see evaluate_candidates())."""
+        system_prompt = self._system_prompt(quality) + f"""
+        ### CANDIDATES:
+        You are shown {len(candidates)} candidate objects generated for the same instruction, labelled
+        C1..C{len(candidates)}, each with a front and a side view. Judge every candidate on its own against the
+        criteria above, then score how well it matches the instruction from 0 (unrelated or broken) to 10.
+
+        ### OUTPUT FORMAT FOR CANDIDATES (JSON ONLY, REPLACES THE FORMAT ABOVE):
+        {{
+            "candidates": [
+                {{"id": 1, "valid": boolean, "score": number, "feedback": "string", "needs_higher_quality": boolean}}
+            ]
+        }}
+        One entry per candidate. "feedback" follows the rules above for that candidate's parameters.
+        """
+        if self.contact_sheet:
+            images, labels = [], []
+            for n, (front_image_path, side_image_path) in enumerate(candidates, 1):
+                for view, image_path in (("Front", front_image_path), ("Side", side_image_path)):
+                    image = cv2.imread(image_path, cv2.IMREAD_COLOR) if os.path.exists(image_path) else None
+                    if image is None:
+                        raise FileNotFoundError(f"Image not found: {image_path}")
+                    images.append(image)
+                    labels.append(f"C{n} {view}")
+            sheets = build_contact_sheets(images, labels, token_budget=BATCH_SHEET_TOKEN_BUDGET,
+                                          fmt=SHEET_FORMAT, quality=SHEET_QUALITY)
+            parts = image_parts(sheets)
+        else:
+            parts = []
+            for n, (front_image_path, side_image_path) in enumerate(candidates, 1):
+                parts.append({"type": "text", "text": f"Candidate C{n}:"})
+                parts.extend(self._image_parts(front_image_path, side_image_path))
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": [
+                {"type": "text", "text": f"User Instruction: {instruction}\n\nPlease evaluate and score every candidate:"},
+                *parts
+            ]}
+        ]
+
+    def evaluate_candidates(self, candidates, instruction, quality=None):
+        """
+        Score several renders of the same instruction in one VLM request.
+
+        Args:
+            candidates (list): (front_image_path, side_image_path) pairs.
+            instruction (str): User's original instruction
+            quality (str): Render tier of the images (see evaluate())
+
+        Returns:
+            list: One dict per candidate, in order: {"valid", "score", "feedback",
+            "needs_higher_quality"}. Candidates the critic skipped are invalid with score 0.
+        """
+        print(f"[*] VLM-Critic is scoring {len(candidates)} candidates in one request")
+
+        signatures = [image_file_signature(path) for pair in candidates for path in pair]
+        context = make_context_key("object_batch", self.model, instruction, quality=quality,
+                                   candidates=len(candidates))
+        cached = self.verdict_cache.get(context, signatures)
+        if cached is not None:
+            return cached["candidates"]
+
+        messages = self.build_batch_messages(candidates, instruction, quality)
+        try:
+            result_text = cached_completion(
+                self.client,
+                model=self.model,
+                messages=messages,
+                temperature=0.0,
+                response_format={"type": "json_object"},
+                validate=lambda content: isinstance(json.loads(content).get("candidates"), list)
+            )
+            entries = json.loads(result_text).get("candidates", [])
+        except Exception as e:
+            print(f"[Error] VLM Evaluation failed: {e}")
+            return [{"valid": False, "score": 0.0, "feedback": f"Critic Error: {str(e)}",
+                     "needs_higher_quality": False} for _ in candidates]
+
+        by_id = {}
+        for n, entry in enumerate(entries, 1):
+            if isinstance(entry, dict):
+                try:
+                    by_id[int(entry.get("id", n))] = entry
+                except (TypeError, ValueError):
+                    by_id[n] = entry
+        verdicts = []
+        for n in range(1, len(candidates) + 1):
+            entry = by_id.get(n, {})
+            try:
+                score = float(entry.get("score", 0))
+            except (TypeError, ValueError):
+                score = 0.0
+            verdicts.append({
+                "valid": bool(entry.get("valid", False)),
+                "score": score,
+                "feedback": entry.get("feedback", "No feedback provided."),
+                "needs_higher_quality": bool(entry.get("needs_higher_quality", False)),
+            })
+        self.verdict_cache.put(context, signatures, {"candidates": verdicts})
+        return verdicts
+
+def save_feedback(result):
+    output_dir = os.path.dirname(OUTPUT_FEEDBACK_PATH)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
     
-    front_img = FRONT_IMAGE_PATH
-    side_img = SIDE_IMAGE_PATH
+    with open(OUTPUT_FEEDBACK_PATH, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
     
+    print(f"\nFeedback saved to: {OUTPUT_FEEDBACK_PATH}")
+
+def best_candidate(verdicts):
+    """Index of the best verdict: valid ones first, then by score, then the earliest."""
+    return max(range(len(verdicts)), key=lambda i: (verdicts[i]["valid"], verdicts[i]["score"], -i))
+
+def run_candidate_reflection(user_instruction, candidates, critic=None, quality=None):
+    """
+    Agent 4 for beam search: score all candidates in one request and save the
+    best one's verdict to OUTPUT_FEEDBACK_PATH, so the next round refines it.
+
+    Args:
+        candidates (list): (front_image_path, side_image_path) pairs.
+
+    Returns:
+        tuple: (index of the best candidate, list of verdicts), or None if a render is missing.
+    """
+    for front_img, side_img in candidates:
+        for image_path in (front_img, side_img):
+            if not os.path.exists(image_path):
+                print(f"Error: Image not found: {image_path}")
+                return None
+
+    critic = critic or VLMCritic()
+    verdicts = critic.evaluate_candidates(candidates, user_instruction, quality=quality)
+    best = best_candidate(verdicts)
+
+    print("\n=== Candidate Scores ===")
+    print(f"Instruction: {user_instruction}")
+    for n, verdict in enumerate(verdicts, 1):
+        marker = "*" if n - 1 == best else " "
+        print(f" {marker} C{n}: score {verdict['score']:.1f}, valid {verdict['valid']}")
+
+    front_img, side_img = candidates[best]
+    save_feedback({
+        "instruction": user_instruction,
+        "front_image": front_img,
+        "side_image": side_img,
+        "quality": quality,
+        **verdicts[best],
+        "best_candidate": best + 1,
+        "candidates": [{"front_image": f, "side_image": s, **v} for (f, s), v in zip(candidates, verdicts)],
+    })
+    return best, verdicts
+
+def run_reflection(user_instruction, critic=None, front_img=FRONT_IMAGE_PATH, side_img=SIDE_IMAGE_PATH,
+                   quality=None):
+    """
+    Agent 4: Evaluate the rendered views and save the verdict to OUTPUT_FEEDBACK_PATH.
+
+    Returns:
+        tuple: (is_valid: bool, feedback: str), or None if a render is missing.
+    """
     if not os.path.exists(front_img):
         print(f"Error: Front image not found: {front_img}")
-        sys.exit(1)
+        return None
     
     if not os.path.exists(side_img):
         print(f"Error: Side image not found: {side_img}")
-        sys.exit(1)
+        return None
     
-    critic = VLMCritic()
-    is_valid, feedback_obj = critic.evaluate(front_img, side_img, user_instruction)
+    critic = critic or VLMCritic()
+    is_valid, feedback_obj = critic.evaluate(front_img, side_img, user_instruction, quality=quality)
     
     print("\n=== Evaluation Result ===")
     print(f"Instruction: {user_instruction}")
@@ -125,15 +352,22 @@ if __name__ == "__main__":
         "instruction": user_instruction,
         "front_image": front_img,
         "side_image": side_img,
+        "quality": quality,
         "valid": is_valid,
-        "feedback": feedback_obj
+        "feedback": feedback_obj,
+        "needs_higher_quality": critic.needs_higher_quality,
     }
     
-    output_dir = os.path.dirname(OUTPUT_FEEDBACK_PATH)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-    
-    with open(OUTPUT_FEEDBACK_PATH, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    save_feedback(result)
+    return is_valid, feedback_obj
+
+if __name__ == "__main__":
+    # Get user prompt from command line arguments
+    if len(sys.argv) > 1:
+        user_instruction = sys.argv[1]
+    else:
+        user_instruction = ""
+        print(f"Warning: No instruction provided. Using default: {user_instruction}")
     
-    print(f"\nFeedback saved to: {OUTPUT_FEEDBACK_PATH}")
+    if run_reflection(user_instruction) is None:
+        sys.exit(1)
\ No newline at end of file
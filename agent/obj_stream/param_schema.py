@@ -0,0 +1,244 @@
+import ast
+import difflib
+import json
+import math
+import os
+import re
+
+# Typed parameter schema compiled offline from the factory docs in ./library,
+# and the local check run on ParamGenAgent output before code generation.
+# The docs state types, ranges and defaults in prose ("range ~0.0~0.8",
+# "log_uniform(0.15, 0.3)", "(True/False)", "default 0.025"); the compiler
+# turns what it can recognise into {name: {type, min, max, default, choices}}
+# per factory and leaves the rest untyped ("any").
+#
+# Rebuild after editing a library file:
+#   python agent/obj_stream/param_schema.py
+
+PARAM_SCHEMA_PATH = "./library/param_schema.json"
+
+# Keys closer than this to a documented name are treated as misspellings
+RENAME_CUTOFF = 0.8
+# Seed keys consumed by template_codegen, never renamed or reported
+SEED_KEYS = ("factory_seed", "seed")
+
+NUM = r"-?(?:\d*π(?:/\d+)?|\d+(?:\.\d+)?(?:[eE]-?\d+)?)"
+SAMPLER_RANGE = re.compile(rf"\b(log_uniform|uniform|randint)\(\s*({NUM})\s*,\s*({NUM})\s*\)")
+PROSE_RANGE = re.compile(rf"\b(?:[Rr]ange|integer)\b:?\s*~?\s*({NUM})\s*[~–]\s*({NUM})")
+BRACKET_RANGE = re.compile(rf"\b[Rr]ange:?\s*\[\s*({NUM})\s*,\s*({NUM})\s*\]")
+DEFAULT_VALUE = re.compile(rf"\b[Dd]efault:?\s*(True|False|{NUM})(?![\w/(])")
+QUOTED_CHOICES = re.compile(r'\(\s*("[^"]+"(?:\s*[/|]\s*"[^"]+")+)')
+# Count-like quantities whose whole-number prose ranges ("range ~3~5") are integers
+INTEGER_WORDS = re.compile(r"\b(integer|count|number of|depth|levels?|resolution|subdivisions?|polygons?)\b")
+INTEGER_TOKEN = re.compile(r"-?\d+")
+PARAM_LINE = re.compile(r"^-\s+([A-Za-z_]\w*)\s*(?:\([^)]*\))?\s*:\s*(.*)$")
+# "- Semantic: ...", "- Important: ..." lines and sub-factory lists are not parameters
+NON_PARAM_NAMES = {"Semantic", "Important", "Note", "Example"}
+
+
+def parse_number(token):
+    """'0.25', '5e4', 'π/3', '-2π' -> float."""
+    if "π" in token:
+        head, _, divisor = token.partition("/")
+        coefficient = head.replace("π", "")
+        coefficient = -1.0 if coefficient == "-" else float(coefficient or 1)
+        return coefficient * math.pi / (float(divisor) if divisor else 1.0)
+    return float(token)
+
+
+def _is_relative(text, start, end):
+    # "depth * uniform(0.2, 0.4)", "uniform(0.01, 0.03) * scale", "1/log_uniform(...)"
+    before = text[max(0, start - 3):start]
+    after = text[end:end + 3]
+    return "*" in before or "/" in before or after.lstrip().startswith("*")
+
+
+def _has_unit(text, end):
+    return bool(re.match(r"\s*(°|degrees?\b)", text[end:]))
+
+
+def infer_param(description):
+    """
+    Extract {type, min, max, default, choices} from a parameter description.
+    Fields that cannot be recognised are None.
+    """
+    spec = {"type": "any", "min": None, "max": None, "default": None, "choices": None}
+    lowered = description.lower()
+
+    bounds = []
+    is_int = "integer" in lowered
+    for match in SAMPLER_RANGE.finditer(description):
+        if _is_relative(description, match.start(), match.end()) or _has_unit(description, match.end()):
+            continue
+        bounds.append((parse_number(match.group(2)), parse_number(match.group(3))))
+        # "randint(2, 5)" and "int(log_uniform(4, 10))"
+        if match.group(1) == "randint" or description[:match.start()].endswith("int("):
+            is_int = True
+    if not bounds:
+        for pattern in (PROSE_RANGE, BRACKET_RANGE):
+            for match in pattern.finditer(description):
+                if _is_relative(description, match.start(), match.end()) or _has_unit(description, match.end()):
+                    continue
+                bounds.append((parse_number(match.group(1)), parse_number(match.group(2))))
+                if INTEGER_TOKEN.fullmatch(match.group(1)) and INTEGER_TOKEN.fullmatch(match.group(2)) \
+                        and INTEGER_WORDS.search(lowered):
+                    is_int = True
+    if bounds:
+        spec["min"] = min(min(pair) for pair in bounds)
+        spec["max"] = max(max(pair) for pair in bounds)
+
+    choices = QUOTED_CHOICES.search(description)
+    if "true/false" in lowered:
+        spec["type"] = "bool"
+        spec["min"] = spec["max"] = None
+    elif choices:
+        spec["type"] = "str"
+        spec["choices"] = re.findall(r'"([^"]+)"', choices.group(1))
+        spec["min"] = spec["max"] = None
+    elif any(word in lowered for word in ("control point", "hsv", "rgb", "tuple", "vector", "list")):
+        spec["type"] = "any"
+        spec["min"] = spec["max"] = None
+    elif bounds:
+        spec["type"] = "int" if is_int else "float"
+
+    default = DEFAULT_VALUE.search(description)
+    if default:
+        value = default.group(1)
+        if value in ("True", "False"):
+            if spec["type"] == "bool":
+                spec["default"] = value == "True"
+        elif spec["type"] in ("int", "float", "any"):
+            spec["default"] = parse_number(value)
+            if spec["type"] == "any" and spec["choices"] is None:
+                spec["type"] = "float"
+    if spec["type"] == "int":
+        spec["min"] = int(spec["min"]) if spec["min"] is not None else None
+        spec["max"] = int(spec["max"]) if spec["max"] is not None else None
+    return spec
+
+
+def compile_schema(sources=None):
+    """
+    Returns:
+        dict: factory name -> {"domain": ..., "params": {name: spec}}. The first
+        description of a parameter wins when a factory documents it twice.
+    """
+    from obj_params_agent import INDOOR_HEADER, KNOWLEDGE_SOURCES, NATURE_HEADER
+
+    schema = {}
+    for source in sources or KNOWLEDGE_SOURCES:
+        factory = None
+        with open(source["path"], "r", encoding="utf-8") as f:
+            for line in f:
+                stripped = line.strip()
+                header = NATURE_HEADER.match(stripped) or INDOOR_HEADER.match(stripped)
+                if header:
+                    factory = header.group(1)
+                    schema.setdefault(factory, {"domain": source["domain"], "params": {}})
+                    continue
+                if factory is None or line[:1] != "-":
+                    continue
+                match = PARAM_LINE.match(stripped)
+                if match and match.group(1) not in NON_PARAM_NAMES and not match.group(1).endswith("Factory"):
+                    schema[factory]["params"].setdefault(match.group(1), infer_param(match.group(2)))
+    return schema
+
+
+def save_schema(schema, path=PARAM_SCHEMA_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=1, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
+
+_SCHEMAS = {}
+
+
+def load_schema(path=PARAM_SCHEMA_PATH):
+    if path not in _SCHEMAS:
+        if not os.path.exists(path):
+            print(f"Warning: parameter schema {path} not found, skipping validation")
+            _SCHEMAS[path] = {}
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                _SCHEMAS[path] = json.load(f)
+    return _SCHEMAS[path]
+
+
+def _check_value(name, value, spec, issues):
+    kind = spec["type"]
+    if kind == "bool":
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value in (0, 1):
+            issues.append(f"{name}: {value!r} -> {bool(value)}")
+            return bool(value)
+        return value
+    if kind == "str" and spec["choices"] and isinstance(value, str) and value not in spec["choices"]:
+        close = difflib.get_close_matches(value, spec["choices"], n=1, cutoff=0.6)
+        if close:
+            issues.append(f"{name}: {value!r} -> {close[0]!r}")
+            return close[0]
+        issues.append(f"{name}: {value!r} is not one of {spec['choices']}")
+        return value
+    if kind not in ("int", "float") or isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+
+    clamped = value
+    if spec["min"] is not None and clamped < spec["min"]:
+        clamped = spec["min"]
+    if spec["max"] is not None and clamped > spec["max"]:
+        clamped = spec["max"]
+    if kind == "int" and not isinstance(clamped, int):
+        clamped = int(round(clamped))
+    if clamped != value or type(clamped) is not type(value):
+        issues.append(f"{name}: {value!r} -> {clamped!r} (range {spec['min']}..{spec['max']})")
+    return clamped
+
+
+def validate_params(factory_name, params_str, schema=None):
+    """
+    Check a generated params dict string against the factory's schema: rename
+    misspelled keys to the closest documented name, coerce bools/ints and clamp
+    numbers into the documented range. Unknown keys are kept and reported.
+
+    Returns:
+        tuple: (params string to write, list of human-readable issues). The input
+        string is returned unchanged if it is not a plain dict literal.
+    """
+    schema = load_schema() if schema is None else schema
+    factory = schema.get(factory_name)
+    if not factory:
+        return params_str, []
+
+    try:
+        params = ast.literal_eval(params_str)
+    except (ValueError, SyntaxError) as e:
+        return params_str, [f"not a literal dict, left unchanged ({type(e).__name__})"]
+    if not isinstance(params, dict):
+        return params_str, [f"expected a dict, got {type(params).__name__}"]
+
+    specs = factory["params"]
+    issues = []
+    checked = {}
+    for name, value in params.items():
+        if isinstance(name, str) and name not in specs and name not in SEED_KEYS:
+            close = difflib.get_close_matches(name, list(specs), n=1, cutoff=RENAME_CUTOFF)
+            if close and close[0] not in params:
+                issues.append(f"{name}: renamed to {close[0]}")
+                name = close[0]
+            else:
+                issues.append(f"{name}: not documented for {factory_name}")
+        if name in specs:
+            value = _check_value(name, value, specs[name], issues)
+        checked[name] = value
+    return repr(checked), issues
+
+
+def main():
+    schema = compile_schema()
+    save_schema(schema)
+    typed = sum(1 for f in schema.values() for p in f["params"].values() if p["type"] != "any")
+    total = sum(len(f["params"]) for f in schema.values())
+    print(f"Wrote {PARAM_SCHEMA_PATH}: {len(schema)} factories, {typed}/{total} typed parameters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import ast
+import builtins
+import os
+import re
+import sys
+
+# Static checks on a generated obj_code.py, run before Blender is started.
+# Everything here is pure Python (ast only): a script that fails a check is sent
+# back to code generation with the issues instead of costing a bpy/infinigen
+# import and a factory build.
+#
+# Every issue is a dict {"check", "line", "message"}; `check` is one of
+# syntax, import, sys_path, factory, seed, undefined, save_path.
+
+# Modules a script may import even if the template never does
+ALLOWED_MODULES = {"bpy", "bmesh", "mathutils", "numpy"}
+SEED_KWARGS = ("factory_seed", "seed")
+IMPORT_LINE = re.compile(r"^\s*(?:from\s+[\w.]+\s+import\s+[^#\n]+|import\s+[^#\n]+)", re.MULTILINE)
+FACTORY_CALL = re.compile(r"\b([A-Z]\w*Factory\w*)\s*\(")
+
+
+def template_imports(template_text):
+    """
+    Returns:
+        dict: module -> set of names imported from it anywhere in the template
+        ("*" for a plain `import module`).
+    """
+    imports = {}
+    for match in IMPORT_LINE.finditer(template_text):
+        try:
+            node = ast.parse(match.group(0).strip()).body[0]
+        except (SyntaxError, IndexError):
+            continue
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.setdefault(alias.name, set()).add("*")
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.setdefault(node.module, set()).update(alias.name for alias in node.names)
+    return imports
+
+
+def factory_classes(example_text):
+    """Factory classes constructed in an example, e.g. {"LeafFactoryV2"} for LeafFactory."""
+    return set(FACTORY_CALL.findall(example_text))
+
+
+def _issue(check, node, message):
+    return {"check": check, "line": getattr(node, "lineno", None), "message": message}
+
+
+def _is_known_module(module, imports):
+    root = module.split(".")[0]
+    return module in imports or root in ALLOWED_MODULES or root in sys.stdlib_module_names
+
+
+def _check_imports(tree, imports):
+    issues = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if not _is_known_module(alias.name, imports):
+                    issues.append(_issue("import", node, f"module {alias.name} is not imported by the template"))
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            if not _is_known_module(node.module, imports):
+                issues.append(_issue("import", node, f"module {node.module} is not imported by the template"))
+                continue
+            known = imports.get(node.module)
+            if known is None or "*" in known:
+                continue
+            for alias in node.names:
+                if alias.name not in known:
+                    issues.append(_issue("import", node,
+                                         f"{alias.name} is not imported from {node.module} in the template"))
+    return issues
+
+
+def _bound_names(tree):
+    names = set(dir(builtins)) | {"__file__", "__name__"}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+    return names
+
+
+def _check_undefined(tree):
+    bound = _bound_names(tree)
+    issues = []
+    seen = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in bound \
+                and node.id not in seen:
+            seen.add(node.id)
+            issues.append(_issue("undefined", node, f"name {node.id} is used but never defined or imported"))
+    return issues
+
+
+def _string_value(node, assigns):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name) and isinstance(assigns.get(node.id), ast.Constant):
+        value = assigns[node.id].value
+        return value if isinstance(value, str) else None
+    return None
+
+
+def preflight_script(source, factory_name, imports, classes=None, blend_path=None, needs_sys_path=False):
+    """
+    Args:
+        source (str): Generated script.
+        factory_name (str): `# Factory:` of obj_param.txt.
+        imports (dict): template_imports() of the template the script follows.
+        classes (set): Factory classes the template's example constructs; defaults to {factory_name}.
+        blend_path (str): Path the script has to save to.
+        needs_sys_path (bool): Whether the template extends sys.path before importing infinigen.
+
+    Returns:
+        list: Issues; empty when the script passed every check.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return [{"check": "syntax", "line": e.lineno, "message": f"syntax error: {e.msg}"}]
+
+    issues = _check_imports(tree, imports)
+
+    calls = [node for node in ast.walk(tree) if isinstance(node, ast.Call)]
+    if needs_sys_path and not any(
+            isinstance(c.func, ast.Attribute) and c.func.attr in ("append", "insert")
+            and isinstance(c.func.value, ast.Attribute) and c.func.value.attr == "path" for c in calls):
+        issues.append(_issue("sys_path", None, "sys.path.append(...) from the template is missing"))
+
+    classes = set(classes or ()) or {factory_name}
+    constructors = [c for c in calls if isinstance(c.func, ast.Name) and c.func.id in classes]
+    if not constructors:
+        issues.append(_issue("factory", None,
+                             f"{factory_name} is never instantiated (expected one of {sorted(classes)})"))
+    for call in constructors:
+        if not call.args and not any(kw.arg in SEED_KWARGS for kw in call.keywords):
+            issues.append(_issue("seed", call, f"{call.func.id}(...) is called without factory_seed"))
+
+    issues.extend(_check_undefined(tree))
+
+    if blend_path is not None:
+        assigns = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                assigns[node.targets[0].id] = node.value
+        saves = [c for c in calls if isinstance(c.func, ast.Attribute) and c.func.attr == "save_as_mainfile"]
+        if not saves:
+            issues.append(_issue("save_path", None, "bpy.ops.wm.save_as_mainfile(...) is never called"))
+        for call in saves:
+            target = next((kw.value for kw in call.keywords if kw.arg == "filepath"), None)
+            path = _string_value(target, assigns) if target is not None else None
+            if path is None or os.path.normpath(path) != os.path.normpath(blend_path):
+                issues.append(_issue("save_path", call, f"save_as_mainfile must write {blend_path!r}"))
+    return issues
+
+
+def format_issues(issues):
+    return "\n".join(
+        f"- [{issue['check']}] " + (f"line {issue['line']}: " if issue["line"] else "") + issue["message"]
+        for issue in issues
+    )
@@ -0,0 +1,168 @@
+import concurrent.futures
+import importlib.util
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from workspace import run_path
+
+# Blender-free preview renders for the early critic iterations. The bpy session
+# that built the asset writes its triangulated meshes and per-face base colours
+# once (render_object.export_mesh -> preview_mesh.npz); this module rasterizes
+# that file with pyrender on the OSMesa software path, which needs no display
+# or GPU and takes a fraction of a second per view. Import it from any process:
+# pyrender and trimesh are only imported when rendering.
+#
+# The images are flat base-colour shading, good enough to check shape,
+# proportions and colour; anything the critic accepts is re-rendered in Blender.
+
+PREVIEW_MESH_PATH = run_path("./infinigen/outputs/obj/preview_mesh.npz")
+PREVIEW_DIR = run_path("./infinigen/outputs/obj/raster")
+
+RESOLUTION = 512
+MARGIN = 1.15
+BACKGROUND = (0.5, 0.5, 0.5, 1.0)
+LIGHT_INTENSITY = 3.0
+TURNTABLE_STEPS = 8
+
+# Same camera directions as render_object.VIEWS (object centre -> camera)
+VIEWS = {
+    "front": (0.0, -1.0, 0.0),
+    "side": (1.0, 0.0, 0.0),
+    "top": (0.0, 0.0, 1.0),
+    "three_quarter": (1.0, -1.0, 0.8),
+}
+DEFAULT_VIEWS = ("front", "side")
+
+# pyrender picks its OpenGL platform at import time
+GL_PLATFORM = "osmesa"
+
+
+def raster_available():
+    """Whether pyrender and trimesh are importable (OSMesa itself is only checked when rendering)."""
+    return all(importlib.util.find_spec(name) is not None for name in ("pyrender", "trimesh"))
+
+
+def turntable_views(steps=TURNTABLE_STEPS, elevation=0.35):
+    """{"turntable_00": direction, ...}: `steps` azimuths around the object, starting at the front."""
+    views = {}
+    for i in range(steps):
+        angle = 2.0 * math.pi * i / steps
+        views[f"turntable_{i:02d}"] = (math.sin(angle), -math.cos(angle), elevation)
+    return views
+
+
+def _look_at(eye, target):
+    """4x4 camera pose (OpenGL convention: looks down -Z, +Y up) at `eye` facing `target`."""
+    forward = target - eye
+    forward /= np.linalg.norm(forward)
+    up = np.array([0.0, 0.0, 1.0])
+    if abs(forward @ up) > 0.999:
+        # Straight down: keep +Y up in the image, like Blender's track-to
+        up = np.array([0.0, 1.0, 0.0])
+    right = np.cross(forward, up)
+    right /= np.linalg.norm(right)
+    true_up = np.cross(right, forward)
+    pose = np.eye(4)
+    pose[:3, 0], pose[:3, 1], pose[:3, 2], pose[:3, 3] = right, true_up, -forward, eye
+    return pose
+
+
+def _resolve_views(views):
+    table = {**VIEWS, **turntable_views()}
+    resolved = {}
+    for view in views:
+        if view == "turntable":
+            resolved.update(turntable_views())
+        elif view in table:
+            resolved[view] = table[view]
+        else:
+            raise ValueError(f"Unknown view {view!r}, expected one of {list(VIEWS)} or 'turntable'")
+    return resolved
+
+
+def render_preview(mesh_path=PREVIEW_MESH_PATH, views=DEFAULT_VIEWS, out_dir=PREVIEW_DIR, resolution=RESOLUTION):
+    """
+    Rasterize an exported preview mesh from several directions.
+
+    Args:
+        mesh_path (str): .npz written by render_object.export_mesh.
+        views (list): VIEWS names, turntable_NN names, or "turntable" for all of them.
+        out_dir (str): Folder the <view>.png files are written to.
+        resolution (int): Square image size in pixels.
+
+    Returns:
+        dict: view name -> image path.
+    """
+    os.environ.setdefault("PYOPENGL_PLATFORM", GL_PLATFORM)
+    import pyrender
+    import trimesh
+    from PIL import Image
+
+    data = np.load(mesh_path)
+    vertices = data["vertices"]
+    mesh = trimesh.Trimesh(vertices=vertices, faces=data["faces"], face_colors=data["face_colors"], process=False)
+    scene = pyrender.Scene(bg_color=BACKGROUND, ambient_light=(0.35, 0.35, 0.35))
+    scene.add(pyrender.Mesh.from_trimesh(mesh, smooth=False))
+
+    low, high = vertices.min(axis=0), vertices.max(axis=0)
+    center = (low + high) * 0.5
+    radius = max(float(np.linalg.norm(high - low)) * 0.5, 1e-3)
+    corners = np.array([[x, y, z] for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])])
+
+    camera = pyrender.OrthographicCamera(xmag=1.0, ymag=1.0, znear=radius * 0.01, zfar=radius * 6.0)
+    camera_node = scene.add(camera)
+    light_node = scene.add(pyrender.DirectionalLight(intensity=LIGHT_INTENSITY))
+
+    os.makedirs(out_dir, exist_ok=True)
+    renderer = pyrender.OffscreenRenderer(resolution, resolution)
+    paths = {}
+    try:
+        for view, direction in _resolve_views(views).items():
+            direction = np.asarray(direction, dtype=float)
+            pose = _look_at(center + direction / np.linalg.norm(direction) * radius * 3.0, center)
+            # Half-extent of the bounding box across the image plane
+            projected = (corners - center) @ pose[:3, :2]
+            camera.xmag = camera.ymag = max(float(np.abs(projected).max()), 1e-3) * MARGIN
+            scene.set_pose(camera_node, pose)
+            scene.set_pose(light_node, pose)
+            color, _ = renderer.render(scene)
+            path = os.path.join(out_dir, f"{view}.png")
+            Image.fromarray(color).save(path)
+            paths[view] = path
+    finally:
+        renderer.delete()
+    return paths
+
+
+def render_previews(jobs, max_workers=None, views=DEFAULT_VIEWS, resolution=RESOLUTION):
+    """
+    Render many candidates in parallel processes (one OSMesa context each).
+
+    Args:
+        jobs (list): (mesh_path, out_dir) pairs.
+
+    Returns:
+        list: render_preview() results in job order; None for a candidate that failed.
+    """
+    results = [None] * len(jobs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(render_preview, mesh_path, views, out_dir, resolution): i
+                   for i, (mesh_path, out_dir) in enumerate(jobs)}
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                print(f"[Raster Preview] {jobs[i][0]} failed: {e}")
+    return results
+
+
+if __name__ == "__main__":
+    # python agent/obj_stream/raster_preview.py [mesh.npz] [out_dir]
+    paths = render_preview(*sys.argv[1:3], views=list(DEFAULT_VIEWS) + ["turntable"])
+    for name, path in paths.items():
+        print(f"{name}: {path}")
@@ -1,19 +1,39 @@
+import os
+import sys
 import bpy
 from mathutils import Vector
 from pathlib import Path
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from workspace import run_path
 
-BLEND_PATH = "./infinigen/outputs/obj/obj.blend"
-OUT_DIR    = "./infinigen/outputs/obj/render"
 
-RES_X, RES_Y = 1024, 1024
+BLEND_PATH = run_path("./infinigen/outputs/obj/obj.blend")
+OUT_DIR    = run_path("./infinigen/outputs/obj/render")
+PREVIEW_MESH_PATH = run_path("./infinigen/outputs/obj/preview_mesh.npz")
+
 MARGIN = 1.15
-USE_CYCLES = True
 CAM_NAME = "AutoCam_Ortho"
 OBJECT_NAME = ""  
 
-
-bpy.ops.wm.open_mainfile(filepath=BLEND_PATH)
+# Direction from the object's centre to the camera
+VIEWS = {
+    "front": (0.0, -1.0, 0.0),
+    "side": (1.0, 0.0, 0.0),
+    "top": (0.0, 0.0, 1.0),
+    "three_quarter": (1.0, -1.0, 0.8),
+}
+# The reflection agent reads front.png and side.png
+DEFAULT_VIEWS = ("front", "side")
+# Render settings per tier: the object loop renders intermediate candidates as
+# previews and only the accepted one (or one the critic cannot judge) as final.
+QUALITY_TIERS = {
+    "preview": {"engine": "CYCLES", "resolution": 512, "samples": 16, "denoise": True},
+    "final": {"engine": "CYCLES", "resolution": 1024, "samples": 128, "denoise": True},
+    # Rasterized preview for hosts without a usable Cycles device; samples are TAA samples
+    "eevee_preview": {"engine": "EEVEE", "resolution": 512, "samples": 16, "denoise": False},
+}
+DEFAULT_QUALITY = "final"
 
 
 def get_target_object(name: str = ""):
@@ -34,6 +54,9 @@ def world_bbox(obj):
     size = (max_v - min_v)
     return center, size
 
+def world_corners(obj):
+    return [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
+
 def ensure_camera(name: str):
     cam_obj = bpy.data.objects.get(name)
     if cam_obj and cam_obj.type == 'CAMERA':
@@ -47,17 +70,36 @@ def look_at(cam_obj, target: Vector):
     direction = (target - cam_obj.location).normalized()
     cam_obj.rotation_euler = direction.to_track_quat('-Z', 'Y').to_euler()
 
-def setup_render(scene):
-    scene.render.resolution_x = RES_X
-    scene.render.resolution_y = RES_Y
+def resolve_quality(quality=None):
+    """Tier name, or a dict overriding the final tier, -> full render settings."""
+    if quality is None or isinstance(quality, str):
+        name = quality or DEFAULT_QUALITY
+        if name not in QUALITY_TIERS:
+            raise ValueError(f"Unknown quality tier {name!r}, expected one of {list(QUALITY_TIERS)}")
+        return dict(QUALITY_TIERS[name])
+    return {**QUALITY_TIERS[DEFAULT_QUALITY], **quality}
+
+def eevee_engine():
+    """EEVEE's engine identifier in the running build: BLENDER_EEVEE_NEXT on 4.2-4.x,
+    BLENDER_EEVEE before and after."""
+    engines = {item.identifier for item in bpy.types.RenderSettings.bl_rna.properties["engine"].enum_items}
+    return 'BLENDER_EEVEE_NEXT' if 'BLENDER_EEVEE_NEXT' in engines else 'BLENDER_EEVEE'
+
+def setup_render(scene, quality=None):
+    quality = resolve_quality(quality)
+    scene.render.resolution_x = quality["resolution"]
+    scene.render.resolution_y = quality["resolution"]
     scene.render.resolution_percentage = 100
+    # Keep the BVH and compiled shaders between the views of one session
+    scene.render.use_persistent_data = True
 
-    if USE_CYCLES:
+    if quality["engine"] == 'CYCLES':
         scene.render.engine = 'CYCLES'
-        scene.cycles.samples = 128
-        scene.cycles.use_denoising = True
+        scene.cycles.samples = quality["samples"]
+        scene.cycles.use_denoising = quality["denoise"]
     else:
-        scene.render.engine = 'BLENDER_EEVEE_NEXT' if hasattr(bpy.types, "SceneEEVEE") else 'BLENDER_EEVEE'
+        scene.render.engine = eevee_engine()
+        scene.eevee.taa_render_samples = quality["samples"]
 
     scene.view_settings.exposure = 0.0
     scene.view_settings.gamma = 1.0
@@ -66,35 +108,157 @@ def render_still(filepath_abs: Path):
     bpy.context.scene.render.filepath = str(filepath_abs)
     bpy.ops.render.render(write_still=True)
 
+def load_pixels(filepath: Path):
+    """Rendered image as an (H, W, 4) float32 array, top row first."""
+    import numpy as np
+
+    image = bpy.data.images.load(str(filepath), check_existing=False)
+    try:
+        width, height = image.size
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+    finally:
+        bpy.data.images.remove(image)
+    return pixels.reshape(height, width, 4)[::-1]
+
+
+class CameraRig:
+    """One orthographic camera, moved around the target's bounding box for every view."""
+
+    def __init__(self, scene, obj, name: str = CAM_NAME):
+        self.camera = ensure_camera(name)
+        self.camera.data.type = 'ORTHO'
+        scene.camera = self.camera
+        self.corners = world_corners(obj)
+        self.center, size = world_bbox(obj)
+        self.distance = max(size.x, size.y, size.z) * 2.0
+
+    def aim(self, view: str):
+        direction = Vector(VIEWS[view]).normalized()
+        cam = self.camera
+        cam.location = self.center + direction * self.distance
+        look_at(cam, self.center)
+        # Frame the bounding box as seen along the view direction
+        rotation = cam.rotation_euler.to_matrix()
+        right, up = rotation @ Vector((1.0, 0.0, 0.0)), rotation @ Vector((0.0, 1.0, 0.0))
+        extent = 0.0
+        for axis in (right, up):
+            projected = [corner.dot(axis) for corner in self.corners]
+            extent = max(extent, max(projected) - min(projected))
+        cam.data.ortho_scale = max(extent, 1e-3) * MARGIN
+        cam.data.clip_end = max(cam.data.clip_end, self.distance * 4.0)
+
+
+def render_views(obj, views=DEFAULT_VIEWS, quality=None, out_dir: str = OUT_DIR, as_arrays: bool = False):
+    """
+    Render several views of `obj` in one session: the render settings, camera
+    rig and persistent render data are set up once and shared by every view.
+
+    Args:
+        obj: Target mesh object.
+        views (list): Names from VIEWS, e.g. ["front", "side", "top", "three_quarter"].
+        quality (str | dict): A QUALITY_TIERS name, or overrides of the final tier
+            (engine, resolution, samples, denoise).
+        out_dir (str): Folder the <view>.png files are written to.
+        as_arrays (bool): Return pixel arrays instead of paths.
+
+    Returns:
+        dict: view name -> Path of the image (or (H, W, 4) float array).
+    """
+    unknown = [view for view in views if view not in VIEWS]
+    if unknown:
+        raise ValueError(f"Unknown views {unknown}, expected some of {list(VIEWS)}")
+
+    scene = bpy.context.scene
+    setup_render(scene, quality)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
 
-scene = bpy.context.scene  
-setup_render(scene)
+    rig = CameraRig(scene, obj)
+    results = {}
+    for view in views:
+        rig.aim(view)
+        path = out_dir / f"{view}.png"
+        render_still(path)
+        results[view] = load_pixels(path) if as_arrays else path
+    return results
 
-obj = get_target_object(OBJECT_NAME)
 
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+def _base_color(material):
+    if material is None:
+        return (0.8, 0.8, 0.8, 1.0)
+    if material.use_nodes and material.node_tree:
+        for node in material.node_tree.nodes:
+            if node.type == 'BSDF_PRINCIPLED':
+                socket = node.inputs.get("Base Color")
+                if socket is not None and not socket.is_linked:
+                    return tuple(socket.default_value)
+    return tuple(material.diffuse_color)
 
-center, size = world_bbox(obj)
+def export_mesh(path: str = PREVIEW_MESH_PATH):
+    """
+    Write the evaluated, triangulated meshes of the current scene to an .npz for
+    raster_preview: world-space `vertices`, `faces` and per-face RGBA
+    `face_colors` taken from each material's base colour (no textures).
+    """
+    import numpy as np
 
-cam = ensure_camera(CAM_NAME)
-scene.camera = cam
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    vertices, faces, colors = [], [], []
+    offset = 0
+    for obj in bpy.context.scene.objects:
+        if obj.type != 'MESH' or obj.hide_render:
+            continue
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        try:
+            mesh.calc_loop_triangles()
+            n_verts, n_tris = len(mesh.vertices), len(mesh.loop_triangles)
+            if not n_tris:
+                continue
+            co = np.empty(n_verts * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", co)
+            co = co.reshape(-1, 3)
+            matrix = np.array(evaluated.matrix_world, dtype=np.float32)
+            co = co @ matrix[:3, :3].T + matrix[:3, 3]
+            tris = np.empty(n_tris * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("vertices", tris)
+            material_index = np.empty(n_tris, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("material_index", material_index)
+            palette = np.array([_base_color(slot.material) for slot in evaluated.material_slots]
+                               or [_base_color(None)], dtype=np.float32)
+            vertices.append(co)
+            faces.append(tris.reshape(-1, 3) + offset)
+            colors.append(palette[np.clip(material_index, 0, len(palette) - 1)])
+            offset += n_verts
+        finally:
+            evaluated.to_mesh_clear()
+    if not faces:
+        raise RuntimeError("No mesh object to export in the scene")
 
-cam.data.type = 'ORTHO'
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    face_colors = np.clip(np.concatenate(colors), 0.0, 1.0)
+    # Material colours are linear; the rasterizer writes them straight to sRGB PNGs
+    face_colors[:, :3] **= 1.0 / 2.2
+    face_colors = (face_colors * 255).astype(np.uint8)
+    np.savez(path, vertices=np.concatenate(vertices), faces=np.concatenate(faces), face_colors=face_colors)
+    return path
 
-max_dim = max(size.x, size.y, size.z)
-dist = max_dim * 2.0
 
-cam.location = center + Vector((0.0, -dist, 0.0))
-look_at(cam, center)
-cam.data.ortho_scale = max(size.x, size.z) * MARGIN
-front_path = OUT_DIR / "front.png"
-render_still(front_path)
+def render_object(blend_path: str = BLEND_PATH, out_dir: str = OUT_DIR, quality=None):
+    bpy.ops.wm.open_mainfile(filepath=blend_path)
+    return render_scene(out_dir, quality=quality)
 
-cam.location = center + Vector((dist, 0.0, 0.0))
-look_at(cam, center)
 
-cam.data.ortho_scale = max(size.y, size.z) * MARGIN
+def render_scene(out_dir: str = OUT_DIR, views=DEFAULT_VIEWS, quality=None):
+    """Render the scene currently loaded in bpy; returns the image paths in `views` order."""
+    obj = get_target_object(OBJECT_NAME)
+    if obj is None:
+        raise RuntimeError("No mesh object to render in the scene")
+    results = render_views(obj, views, quality, out_dir)
+    return tuple(results[view] for view in views)
 
-side_path = OUT_DIR / "side.png"
-render_still(side_path)
 
+if __name__ == "__main__":
+    # Optional quality tier: python render_object.py preview
+    render_object(quality=sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,228 @@
+import ast
+
+# Deterministic replacement for CodeGenAgent: the matched example of a
+# *_generate.txt template (see template_index) is parsed with `ast` and its
+# parameter assignments are rewritten in place from the params dict, so the
+# imports, sys.path lines, scene clearing and factory-specific glue of the
+# example are kept verbatim.
+#
+# Patched sites, for every key of the params dict:
+#   g["key"] = ...                      (g = factory.genome, or factory.genome["key"])
+#   factory.key = ... / factory.x.key = ...
+#   Factory(key=...) / factory.create_asset(key=...)
+#   key = ... / <prefix>_key = ...      (module variables, e.g. face_size, tree_n_leaf)
+# Keys that appear nowhere are assigned as `factory.key = value` before
+# create_asset(). Only the first example of a section (up to its first
+# save_as_mainfile) is kept. fill_template returns None when the example does
+# not have that shape, and the caller falls back to the LLM.
+
+SEED_KWARGS = ("factory_seed", "seed")
+
+
+class TemplatePatchError(Exception):
+    pass
+
+
+def _call_name(node):
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _root_name(node):
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _contains_call(node, name):
+    return any(isinstance(n, ast.Call) and _call_name(n) == name for n in ast.walk(node))
+
+
+class _Source:
+    """Byte-offset view of a module: ast column offsets are UTF-8 byte offsets."""
+
+    def __init__(self, text):
+        self.data = text.encode("utf-8")
+        self.line_starts = [0]
+        for i, byte in enumerate(self.data):
+            if byte == 0x0A:
+                self.line_starts.append(i + 1)
+
+    def span(self, node):
+        return (self.line_starts[node.lineno - 1] + node.col_offset,
+                self.line_starts[node.end_lineno - 1] + node.end_col_offset)
+
+    def line_start(self, node):
+        return self.line_starts[node.lineno - 1]
+
+    def segment(self, node):
+        start, end = self.span(node)
+        return self.data[start:end].decode("utf-8")
+
+
+def _first_example(text):
+    """Cut a section down to its first example: up to the first save_as_mainfile and its print()."""
+    tree = ast.parse(text)
+    source = _Source(text)
+    end = None
+    for i, stmt in enumerate(tree.body):
+        if _contains_call(stmt, "save_as_mainfile"):
+            end = stmt
+            following = tree.body[i + 1] if i + 1 < len(tree.body) else None
+            if isinstance(following, ast.Expr) and isinstance(following.value, ast.Call) \
+                    and _call_name(following.value) == "print":
+                end = following
+            break
+    if end is None:
+        raise TemplatePatchError("example does not save a .blend file")
+    return source.data[:source.span(end)[1]].decode("utf-8") + "\n"
+
+
+def _find_factory(tree, factory_name):
+    """(variable name, constructor Call) of the factory instance the example builds."""
+    core = factory_name.replace("Factory", "").lower()
+    candidates = []
+    for stmt in tree.body:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name) \
+                and isinstance(stmt.value, ast.Call):
+            name = _call_name(stmt.value) or ""
+            if name.endswith("Factory") or name.endswith("FactoryV2") or core in name.lower():
+                candidates.append((stmt.targets[0].id, stmt.value, name))
+    for var, call, name in candidates:
+        if name == factory_name:
+            return var, call
+    for var, call, name in candidates:
+        if core in name.lower():
+            return var, call
+    if candidates:
+        return candidates[0][:2]
+    raise TemplatePatchError(f"no {factory_name} instance in the example")
+
+
+def fill_template(factory_name, params, example_source, blend_path, seed=None):
+    """
+    Args:
+        factory_name (str): Factory matched by the parameter agent.
+        params (dict): Literal parameter values (already validated).
+        example_source (str): Template section, optionally preceded by the template header.
+        blend_path (str): Where the script must save the .blend file.
+        seed (int): Overrides the example's factory seed (params["factory_seed"] wins).
+
+    Returns:
+        str: The patched script, or None if the example cannot be patched.
+    """
+    try:
+        return _fill(factory_name, dict(params), example_source, blend_path, seed)
+    except (SyntaxError, TemplatePatchError) as e:
+        print(f" [TemplateCodeGen] {factory_name}: {e}")
+        return None
+
+
+def _fill(factory_name, params, example_source, blend_path, seed):
+    text = _first_example(example_source)
+    tree = ast.parse(text)
+    source = _Source(text)
+    factory_var, constructor = _find_factory(tree, factory_name)
+
+    seed = params.pop("factory_seed", params.pop("seed", seed))
+    patches = {}
+
+    def patch(node, value_text):
+        patches[source.span(node)] = value_text
+
+    # Module-level assignments by name, for seeds, paths and module variables
+    module_assigns = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            module_assigns.setdefault(node.targets[0].id, []).append(node)
+
+    # Genome aliases: g = factory.genome
+    genome_aliases = {f"{factory_var}.genome"}
+    for name, nodes in module_assigns.items():
+        for node in nodes:
+            if isinstance(node.value, ast.Attribute) and node.value.attr == "genome" \
+                    and _root_name(node.value) == factory_var:
+                genome_aliases.add(name)
+
+    # factory_seed: the constructor must receive one
+    seed_kwarg = next((kw for kw in constructor.keywords if kw.arg in SEED_KWARGS), None)
+    if seed_kwarg is None:
+        seed = 0 if seed is None else seed
+        end = source.span(constructor)[1] - 1  # before ")"
+        separator = ", " if constructor.args or constructor.keywords else ""
+        patches[(end, end)] = f"{separator}factory_seed={int(seed)!r}"
+    elif seed is not None:
+        if isinstance(seed_kwarg.value, ast.Name) and seed_kwarg.value.id in module_assigns:
+            for node in module_assigns[seed_kwarg.value.id]:
+                patch(node.value, repr(int(seed)))
+        else:
+            patch(seed_kwarg.value, repr(int(seed)))
+
+    # Output path
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and _call_name(node) == "save_as_mainfile":
+            filepath = next((kw.value for kw in node.keywords if kw.arg == "filepath"), None)
+            if filepath is None:
+                raise TemplatePatchError("save_as_mainfile without filepath")
+            if isinstance(filepath, ast.Name) and filepath.id in module_assigns:
+                for assign in module_assigns[filepath.id]:
+                    patch(assign.value, repr(blend_path))
+            else:
+                patch(filepath, repr(blend_path))
+
+    create_stmt = None
+    for stmt in tree.body:
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Call) and _call_name(node) == "create_asset" \
+                    and isinstance(node.func, ast.Attribute) and _root_name(node.func.value) == factory_var:
+                create_stmt = create_stmt or stmt
+    if create_stmt is None:
+        raise TemplatePatchError(f"{factory_var}.create_asset() not called")
+
+    unmatched = []
+    for key, value in params.items():
+        value_text = repr(value)
+        found = False
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1:
+                target = node.targets[0]
+                if isinstance(target, ast.Subscript) and source.segment(target.value) in genome_aliases \
+                        and isinstance(target.slice, ast.Constant) and target.slice.value == key:
+                    patch(node.value, value_text)
+                    found = True
+                elif isinstance(target, ast.Attribute) and target.attr == key and _root_name(target) == factory_var:
+                    patch(node.value, value_text)
+                    found = True
+            elif isinstance(node, ast.Call) and (node is constructor or _call_name(node) == "create_asset"):
+                for kw in node.keywords:
+                    if kw.arg == key:
+                        patch(kw.value, value_text)
+                        found = True
+        if not found:
+            names = [key] if key in module_assigns else [name for name in module_assigns if name.endswith("_" + key)]
+            if len(names) == 1:
+                for node in module_assigns[names[0]]:
+                    patch(node.value, value_text)
+                found = True
+        if not found:
+            unmatched.append(f"{factory_var}.{key} = {value_text}\n")
+
+    if unmatched:
+        at = source.line_start(create_stmt)
+        patches[(at, at)] = "".join(unmatched)
+
+    spans = sorted(patches)
+    for (start, end), (next_start, _) in zip(spans, spans[1:]):
+        if next_start < end:
+            raise TemplatePatchError("overlapping parameter sites")
+
+    data = source.data
+    for (start, end) in reversed(spans):
+        data = data[:start] + patches[(start, end)].encode("utf-8") + data[end:]
+    script = data.decode("utf-8")
+    ast.parse(script)
+    return script
@@ -0,0 +1,338 @@
+import ast
+import hashlib
+import json
+import mmap
+import os
+import re
+
+from preflight import factory_classes, template_imports
+
+# Byte-offset index of the *_generate.txt code templates. For every factory of
+# the matching knowledge library it records where its "# =====" section, the
+# section's shared setup (imports, scene clearing) and each "# =========="
+# example block start and end, plus the literal values each example assigns.
+# The table lives next to the template as <template>_index.json; lookups read
+# only the needed byte ranges from an mmap of the template.
+#
+# Rebuild after editing a template:
+#   python agent/obj_stream/template_index.py
+
+# Top-level section headers are "# ===================== ... =====================";
+# examples inside a section use shorter "# ========== ..." rules.
+SECTION_HEADER = b"# ====================="
+EXAMPLE_HEADER = b"# =========="
+
+FACTORY_TOKEN = re.compile(r"\b[A-Z]\w*Factory\b")
+
+HEADER_SCAN_LINES = 50
+DEFAULT_HEADER = "import sys\nimport bpy\nimport numpy as np\n# sys.path.append(...) # Check path"
+
+
+def index_path_for(template_path):
+    stem, _ = os.path.splitext(template_path)
+    return f"{stem}_index.json"
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _line_spans(data):
+    """(start, end) byte offsets of every line, end excluding the newline."""
+    spans = []
+    start = 0
+    while start < len(data):
+        end = data.find(b"\n", start)
+        if end == -1:
+            end = len(data)
+        spans.append((start, end))
+        start = end + 1
+    return spans
+
+
+def _template_header(data):
+    """import / sys.path lines at the top of the template, prepended to every example."""
+    header_lines = []
+    for start, end in _line_spans(data)[:HEADER_SCAN_LINES]:
+        line = data[start:end].decode("utf-8")
+        if line.startswith("import ") or line.startswith("from ") or "sys.path" in line:
+            header_lines.append(line)
+        if line.strip().startswith("# ==") and header_lines:
+            break
+    header = "\n".join(header_lines)
+    return header if "import bpy" in header else DEFAULT_HEADER
+
+
+def example_values(source):
+    """Literal values assigned in an example, keyed like the params dict."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {}
+    values = {}
+    for node in ast.walk(tree):
+        targets = []
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Attribute):
+                targets.append((target.attr, node.value))
+            elif isinstance(target, ast.Subscript) and isinstance(target.slice, ast.Constant) \
+                    and isinstance(target.slice.value, str):
+                targets.append((target.slice.value, node.value))
+            elif isinstance(target, ast.Name):
+                targets.append((target.id, node.value))
+        elif isinstance(node, ast.Call):
+            targets.extend((kw.arg, kw.value) for kw in node.keywords if kw.arg)
+        for key, value in targets:
+            try:
+                literal = ast.literal_eval(value)
+            except (ValueError, SyntaxError, TypeError):
+                continue
+            try:
+                json.dumps(literal)
+            except (TypeError, ValueError):
+                continue
+            values.setdefault(key, literal)
+    return values
+
+
+def _import_spans(data, start, end):
+    spans = []
+    for line_start, line_end in _line_spans(data[start:end]):
+        line = data[start + line_start:start + line_end]
+        if line.startswith((b"import ", b"from ")):
+            spans.append((start + line_start, start + line_end + 1))
+    return spans
+
+
+def _sections(data):
+    """[(title, start, end, [(title, start, end), ...])] for every top-level section."""
+    lines = _line_spans(data)
+    headers = [i for i, (s, e) in enumerate(lines) if data[s:e].startswith(SECTION_HEADER)]
+    sections = []
+    for n, first in enumerate(headers):
+        last = headers[n + 1] if n + 1 < len(headers) else len(lines)
+        start = lines[first][0]
+        end = lines[last][0] if last < len(lines) else len(data)
+        sub = [i for i in range(first + 1, last)
+               if data[lines[i][0]:lines[i][1]].startswith(EXAMPLE_HEADER)]
+        examples = []
+        for m, i in enumerate(sub):
+            example_end = lines[sub[m + 1]][0] if m + 1 < len(sub) else end
+            examples.append((data[lines[i][0]:lines[i][1]].decode("utf-8"), lines[i][0], example_end))
+        sections.append((data[start:lines[first][1]].decode("utf-8"), start, end, examples))
+    return sections
+
+
+def build_template_index(template_path, factory_names):
+    """
+    Returns:
+        dict: The offset table of `template_path` for `factory_names`. A factory
+        maps to the section whose header names it (or its core name, "Leaf" for
+        LeafFactory); inside a section shared by several factories only the
+        examples naming it are kept.
+    """
+    with open(template_path, "rb") as f:
+        data = f.read()
+    sections = _sections(data)
+
+    factories = {}
+    for factory_name in factory_names:
+        core = factory_name.replace("Factory", "").lower()
+        match = None
+        for needle in (factory_name.lower(), core):
+            match = next((s for s in sections if needle in s[0].lower()), None)
+            if match:
+                break
+        if match is None:
+            continue
+        title, start, end, examples = match
+        preamble_end = examples[0][1] if examples else end
+        preamble = [start, preamble_end]
+        if examples and b"save_as_mainfile" in data[start:preamble_end]:
+            # The section opens with a complete example of its own (Trees before
+            # Bush): later examples only share its imports.
+            setup = [list(span) for span in _import_spans(data, start, preamble_end)]
+            candidates = [(title, start, preamble_end, [])] + [e + (setup,) for e in examples]
+        elif examples:
+            candidates = [e + ([preamble],) for e in examples]
+        else:
+            candidates = [(title, start, end, [])]
+
+        # Sections shared by several factories (Boulder + BlenderRock, Trees +
+        # Bush) name the factory in their example headers
+        def others(candidate):
+            return [t for t in FACTORY_TOKEN.findall(candidate[0]) if t != factory_name]
+        if any(others(c) for c in candidates if c[0] != title):
+            named = [c for c in candidates if factory_name.lower() in c[0].lower()]
+            candidates = named or [c for c in candidates if not others(c) or c[0] == title]
+        entries = []
+        for example_title, example_start, example_end, setup_spans in candidates:
+            source = "".join(data[s:e].decode("utf-8") for s, e in setup_spans)
+            source += data[example_start:example_end].decode("utf-8")
+            entries.append({
+                "title": example_title,
+                "span": [example_start, example_end],
+                "setup": setup_spans,
+                "values": example_values(source),
+            })
+        factories[factory_name] = {
+            "title": title,
+            "span": [start, end],
+            "examples": entries,
+        }
+
+    return {
+        "template": os.path.basename(template_path),
+        "size": len(data),
+        "sha256": _sha256(data),
+        "header": _template_header(data),
+        "factories": factories,
+    }
+
+
+def _normalise(value):
+    """Tuples as lists, recursively: params come from ast.literal_eval, the index from JSON."""
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalise(v) for k, v in value.items()}
+    return value
+
+
+def _value_distance(wanted, have):
+    wanted, have = _normalise(wanted), _normalise(have)
+    if isinstance(wanted, bool) or isinstance(have, bool) \
+            or not isinstance(wanted, (int, float)) or not isinstance(have, (int, float)):
+        return 0.0 if wanted == have else 1.0
+    return abs(wanted - have) / (abs(wanted) + abs(have) + 1e-9)
+
+
+def example_distance(params, values):
+    """0 when the example assigns every param to the same value, 1 per param it misses."""
+    if not params:
+        return 0.0
+    total = 0.0
+    for key, wanted in params.items():
+        total += _value_distance(wanted, values[key]) if key in values else 1.0
+    return total / len(params)
+
+
+class TemplateIndex:
+    def __init__(self, template_path, factory_names=None):
+        """
+        Args:
+            template_path (str): A *_generate.txt template.
+            factory_names (list): Factories to index when the table is missing or
+                stale; defaults to the factories of the knowledge library using
+                this template.
+        """
+        self.template_path = template_path
+        self.index_path = index_path_for(template_path)
+        self._file = open(template_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.table = self._load(factory_names)
+        self._imports = None
+
+    def _load(self, factory_names):
+        table = None
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    table = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                table = None
+        if table is not None and table.get("size") == len(self._data) and table.get("sha256") == _sha256(self._data):
+            return table
+        print(f"[Template Index] {self.index_path} missing or stale, rebuilding")
+        table = build_template_index(self.template_path, factory_names or library_factories(self.template_path))
+        try:
+            save_template_index(table, self.index_path)
+        except OSError as e:
+            print(f"Warning: could not write {self.index_path} ({e})")
+        return table
+
+    def _slice(self, span):
+        return self._data[span[0]:span[1]].decode("utf-8")
+
+    def has(self, factory_name):
+        return factory_name in self.table["factories"]
+
+    def text(self):
+        return self._data[:].decode("utf-8")
+
+    def section(self, factory_name):
+        entry = self.table["factories"].get(factory_name)
+        return self._slice(entry["span"]) if entry else None
+
+    def example(self, factory_name, params=None):
+        """
+        The template header, the section setup and the single example closest to
+        `params` (the first one when no params are given).
+
+        Returns:
+            str: Runnable example source, or None if the factory is not indexed.
+        """
+        entry = self.table["factories"].get(factory_name)
+        if entry is None:
+            return None
+        examples = entry["examples"]
+        best = min(examples, key=lambda e: example_distance(params, e["values"])) if params else examples[0]
+        setup = "".join(self._slice(span) for span in best["setup"])
+        return f"{self.table['header']}\n\n{setup}{self._slice(best['span'])}"
+
+    def imports(self):
+        """module -> names imported anywhere in the template (see preflight.template_imports)."""
+        if self._imports is None:
+            self._imports = template_imports(self.text())
+        return self._imports
+
+    def factory_classes(self, factory_name):
+        """Factory classes the examples of `factory_name` construct."""
+        entry = self.table["factories"].get(factory_name)
+        if entry is None:
+            return set()
+        return set().union(*(factory_classes(self._slice(e["span"])) for e in entry["examples"]))
+
+    def needs_sys_path(self):
+        return "sys.path" in self.table["header"]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+def save_template_index(table, path):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def library_factories(template_path):
+    """Factory names of the knowledge libraries whose generate template is `template_path`."""
+    from param_schema import load_schema
+    from obj_params_agent import KNOWLEDGE_SOURCES
+
+    domains = {s["domain"] for s in KNOWLEDGE_SOURCES
+               if os.path.normpath(s["template"]) == os.path.normpath(template_path)}
+    return sorted(name for name, entry in load_schema().items() if entry["domain"] in domains)
+
+
+def main():
+    from obj_params_agent import KNOWLEDGE_SOURCES
+
+    for source in KNOWLEDGE_SOURCES:
+        template_path = source["template"]
+        table = build_template_index(template_path, library_factories(template_path))
+        path = index_path_for(template_path)
+        save_template_index(table, path)
+        examples = sum(len(f["examples"]) for f in table["factories"].values())
+        print(f"Wrote {path}: {len(table['factories'])} factories, {examples} examples")
+
+
+if __name__ == "__main__":
+    main()
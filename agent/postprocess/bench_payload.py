@@ -0,0 +1,129 @@
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(AGENT_DIR)
+sys.path.append(os.path.join(AGENT_DIR, "obj_stream"))
+from contact_sheet import estimate_image_tokens
+from dynreflection import DEFAULT_VIDEO_PATH, VLMMotionCritic
+from objreflection import FRONT_IMAGE_PATH, SIDE_IMAGE_PATH, VLMCritic
+from workspace import run_path
+
+# Compares the per-image critic payload with the contact-sheet payload on the
+# same inputs: request size and estimated image tokens always, and with
+# repeats > 0 also VLM latency and how often the contact-sheet verdict agrees
+# with the per-image one. Calls go straight to the client, bypassing the LLM
+# cache, so latencies are real.
+#
+#   python agent/postprocess/bench_payload.py "instruction" [video.mp4] [repeats]
+
+BENCH_OUTPUT_PATH = run_path("./output/bench/payload.json")
+MODES = ("per_image", "contact_sheet")
+
+
+def payload_stats(messages):
+    """Request size in bytes, number of image parts and estimated image tokens of `messages`."""
+    images = 0
+    tokens = 0
+    for message in messages:
+        if not isinstance(message["content"], list):
+            continue
+        for part in message["content"]:
+            if part.get("type") != "image_url":
+                continue
+            data = base64.b64decode(part["image_url"]["url"].split(",", 1)[1])
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            images += 1
+            tokens += estimate_image_tokens(image.shape[1], image.shape[0])
+    return {"request_bytes": len(json.dumps(messages)), "images": images, "image_tokens": tokens}
+
+
+def time_verdicts(critic, messages, repeats, **request):
+    """Call the model `repeats` times; returns latencies in seconds and the parsed `valid` verdicts."""
+    latencies, verdicts = [], []
+    for _ in range(repeats):
+        start = time.time()
+        response = critic.client.chat.completions.create(model=critic.model, messages=messages, temperature=0.0,
+                                                         response_format={"type": "json_object"}, **request)
+        latencies.append(time.time() - start)
+        try:
+            verdicts.append(bool(json.loads(response.choices[0].message.content).get("valid", False)))
+        except (json.JSONDecodeError, AttributeError):
+            verdicts.append(None)
+    return latencies, verdicts
+
+
+def compare(build, critic_factory, repeats, **request):
+    """
+    Args:
+        build (callable): critic -> messages.
+        critic_factory (callable): contact_sheet flag -> critic.
+    """
+    results = {}
+    for mode in MODES:
+        critic = critic_factory(mode == "contact_sheet")
+        messages = build(critic)
+        results[mode] = payload_stats(messages)
+        if repeats > 0:
+            latencies, verdicts = time_verdicts(critic, messages, repeats, **request)
+            results[mode].update(latency_s=round(statistics.median(latencies), 2), verdicts=verdicts)
+    if repeats > 0:
+        reference = results["per_image"]["verdicts"]
+        majority = max(set(reference), key=reference.count)
+        sheet = results["contact_sheet"]["verdicts"]
+        results["agreement"] = round(sum(v == majority for v in sheet) / len(sheet), 2)
+    return results
+
+
+def print_results(title, results):
+    print(f"\n{title}")
+    for mode in MODES:
+        r = results[mode]
+        line = f"  {mode:<14} {r['request_bytes'] / 1024:8.1f} KiB  {r['images']:3d} images  {r['image_tokens']:6d} image tokens"
+        if "latency_s" in r:
+            line += f"  {r['latency_s']:6.2f}s median"
+        print(line)
+    if "agreement" in results:
+        print(f"  verdict agreement with per-image majority: {results['agreement']:.0%}")
+
+
+def main():
+    instruction = sys.argv[1] if len(sys.argv) > 1 else ""
+    video_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_VIDEO_PATH
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    report = {"instruction": instruction, "repeats": repeats}
+    if os.path.exists(video_path):
+        sampler_critic = VLMMotionCritic()
+        frames = sampler_critic._process_video(video_path)
+        motion_report = sampler_critic.motion_report
+        report["motion"] = compare(lambda critic: critic.build_messages(frames, instruction, motion_report),
+                                   lambda sheet: VLMMotionCritic(contact_sheet=sheet), repeats, max_tokens=300)
+        report["motion"]["frames"] = len(frames)
+        print_results(f"Motion critic ({len(frames)} frames from {video_path})", report["motion"])
+    else:
+        print(f"Skipping motion critic: {video_path} not found")
+
+    if os.path.exists(FRONT_IMAGE_PATH) and os.path.exists(SIDE_IMAGE_PATH):
+        report["object"] = compare(
+            lambda critic: critic.build_messages(FRONT_IMAGE_PATH, SIDE_IMAGE_PATH, instruction),
+            lambda sheet: VLMCritic(contact_sheet=sheet), repeats)
+        print_results("Object critic (front + side)", report["object"])
+    else:
+        print(f"Skipping object critic: {FRONT_IMAGE_PATH} / {SIDE_IMAGE_PATH} not found")
+
+    os.makedirs(os.path.dirname(BENCH_OUTPUT_PATH), exist_ok=True)
+    with open(BENCH_OUTPUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nResults saved to: {BENCH_OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
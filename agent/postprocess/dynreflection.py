@@ -2,87 +2,411 @@ import cv2
 import base64
 import json
 import os
+import re
 import sys
 import numpy as np
 from openai import OpenAI
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from contact_sheet import build_contact_sheets, encode_image, image_parts
+from llm_cache import cached_completion, is_json
+from verdict_cache import get_default_verdict_cache, image_signature, make_context_key
+from workspace import run_path
+
 API_KEY = ""
 BASE_URL = ""
 MODEL_NAME = "gpt-4o" 
 
 
-DEFAULT_VIDEO_PATH = "./infinigen/outputs/scene/simulation_output.mp4"
-OUTPUT_FEEDBACK_PATH = "./output/postprocess/dynreflection_feedback.json"
+DEFAULT_VIDEO_PATH = run_path("./infinigen/outputs/scene/simulation_output.mp4")
+OUTPUT_FEEDBACK_PATH = run_path("./output/postprocess/dynreflection_feedback.json")
 
-class VLMMotionCritic:
-    def __init__(self):
-        self.client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
-        self.model = MODEL_NAME
+USE_CONTACT_SHEET = True
+SHEET_TOKEN_BUDGET = 2000
+SHEET_FORMAT = "jpeg"
+SHEET_QUALITY = 85
+# JPEG quality of the one-image-per-frame payload (OpenCV's default)
+FRAME_QUALITY = 95
 
-    def _process_video(self, video_path, target_sample_count=24, skip_ratio=0.05):
+# Frames are kept where the video moves: every decoded frame is compared with
+# the previous one on a small grayscale copy, its motion is the share of pixels
+# that changed by more than PIXEL_THRESHOLD, and frames under STATIC_THRESHOLD
+# add nothing to the running motion total. The frame
+# budget is spread evenly over that total, so static stretches get at most one
+# frame and fast motion gets many.
+SAMPLE_BUDGET = 24
+SKIP_RATIO = 0.05
+MAX_DIM = 512
+ANALYSIS_DIM = 128
+# Grayscale change (0-255) that counts a pixel as changed, above render noise
+PIXEL_THRESHOLD = 12
+# Share of changed pixels below which a frame counts as static
+STATIC_THRESHOLD = 0.001
+# Optical-flow magnitude histogram bins, in frame widths moved per frame
+FLOW_BINS = (0.0, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, np.inf)
+# Pixels moving faster than this count as moving (below it is mostly render noise)
+MOVING_FLOW = 0.005
+
+
+class MotionAdaptiveSampler:
+    def __init__(self, budget=SAMPLE_BUDGET, skip_ratio=SKIP_RATIO, max_dim=MAX_DIM,
+                 analysis_dim=ANALYSIS_DIM, static_threshold=STATIC_THRESHOLD):
         """
-        Sampling strategy for 24fps short videos
-        
         Args:
-            target_sample_count (int): Target number of sampled frames.
-                                     Recommended: 24 (VLM sees 1 second of condensed essence).
-                                     For 5-second video, samples 1 frame every 5 frames.
-            skip_ratio (float): Ratio of beginning to skip.
-                                Set to 0.05 (skip first 5% of time) to avoid frame 0 initialization errors.
-                                Samples continuously until video end.
+            budget (int): Maximum number of frames returned.
+            skip_ratio (float): Ratio of the beginning to skip (frame 0 initialisation artefacts).
+            max_dim (int): Longest side of the returned frames.
+            analysis_dim (int): Longest side of the grayscale copy used to measure motion.
+            static_threshold (float): Share of changed pixels treated as no motion.
+        """
+        self.budget = max(2, budget)
+        self.skip_ratio = skip_ratio
+        self.max_dim = max_dim
+        self.analysis_dim = analysis_dim
+        self.static_threshold = static_threshold
+        # Per-frame measurements of the last sample() call, for MotionPreCritic
+        self.frame_stats = []
+        self.fps = None
+
+    def _resize(self, frame, max_dim):
+        h, w = frame.shape[:2]
+        scale = max_dim / max(h, w)
+        return cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+    def _measure(self, index, gray, previous, fps):
+        """Luminance and Farneback optical-flow statistics of one analysis frame."""
+        stats = {
+            "frame": index,
+            "time": index / fps,
+            "luma_mean": float(gray.mean()),
+            "luma_std": float(gray.std()),
+            "dark_fraction": float(np.mean(gray < 16)),
+            "flow_mean": 0.0,
+            "flow_p95": 0.0,
+            "moving_fraction": 0.0,
+            "flow_hist": [0] * (len(FLOW_BINS) - 1),
+        }
+        if previous is not None and previous.shape == gray.shape:
+            flow = cv2.calcOpticalFlowFarneback(previous, gray, None, 0.5, 3, 9, 3, 5, 1.1, 0)
+            # Frame widths per frame, independent of the analysis resolution
+            magnitude = np.hypot(flow[..., 0], flow[..., 1]) / gray.shape[1]
+            stats["flow_mean"] = float(magnitude.mean())
+            stats["flow_p95"] = float(np.percentile(magnitude, 95))
+            stats["moving_fraction"] = float(np.mean(magnitude > MOVING_FLOW))
+            stats["flow_hist"] = np.histogram(magnitude, bins=FLOW_BINS)[0].tolist()
+        return stats
+
+    def _thin(self, kept, step):
+        thinned = [kept[0]]
+        for entry in kept[1:]:
+            if entry["motion"] - thinned[-1]["motion"] >= step:
+                thinned.append(entry)
+        return thinned
+
+    def sample(self, video_path):
+        """
+        Decode `video_path` once, front to back, without seeking.
+
+        Returns:
+            list: [{"frame": index, "time": seconds, "motion": cumulative motion,
+            "image": BGR array}] in video order, at most `budget` entries.
         """
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video not found: {video_path}")
 
         cap = cv2.VideoCapture(video_path)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        if total_frames == 0:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 24.0
+        start_frame = int(max(total_frames, 0) * self.skip_ratio)
+        self.fps = fps
+        self.frame_stats = []
+
+        # Candidates kept while decoding; thinned with a doubled step whenever
+        # they exceed twice the budget, so memory stays bounded on long videos
+        kept = []
+        step = self.static_threshold
+        previous = None
+        last = None
+        motion = 0.0
+        index = -1
+        try:
+            while True:
+                if not cap.grab():
+                    break
+                index += 1
+                if index < start_frame:
+                    continue
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                gray = cv2.cvtColor(self._resize(frame, self.analysis_dim), cv2.COLOR_BGR2GRAY)
+                self.frame_stats.append(self._measure(index, gray, previous, fps))
+                if previous is not None and gray.shape == previous.shape:
+                    changed = float(np.mean(cv2.absdiff(gray, previous) > PIXEL_THRESHOLD))
+                    if changed >= self.static_threshold:
+                        motion += changed
+                previous = gray
+                last = (index, motion, frame)
+                if not kept or motion - kept[-1]["motion"] >= step:
+                    kept.append({"frame": index, "time": index / fps, "motion": motion,
+                                 "image": self._resize(frame, self.max_dim)})
+                    if len(kept) > 2 * self.budget:
+                        step *= 2.0
+                        kept = self._thin(kept, step)
+        finally:
+            cap.release()
+
+        if not kept:
             raise ValueError("Video file is empty.")
+        if last[0] != kept[-1]["frame"]:
+            kept.append({"frame": last[0], "time": last[0] / fps, "motion": last[1],
+                         "image": self._resize(last[2], self.max_dim)})
 
-        start_frame = int(total_frames * skip_ratio)
+        if motion <= 0.0:
+            # Nothing moves: the first and last frame say everything
+            chosen = [kept[0], kept[-1]] if len(kept) > 1 else kept
+        else:
+            chosen = [kept[0]]
+            for target in np.linspace(0.0, motion, self.budget)[1:-1]:
+                best = min(kept, key=lambda entry: abs(entry["motion"] - target))
+                if best["frame"] != chosen[-1]["frame"]:
+                    chosen.append(best)
+            # The final state matters most for a physics check; the nearest
+            # match for the full motion would be where motion stops, not the end
+            if kept[-1]["frame"] != chosen[-1]["frame"]:
+                chosen.append(kept[-1])
+        print(f"[*] Decoded {index + 1} frames ({fps:.1f} fps) in one pass; kept {len(chosen)} "
+              f"motion-weighted frames (budget {self.budget}).")
+        return chosen
 
-        indices = np.linspace(start_frame, total_frames - 1, target_sample_count, dtype=int)
-        
-        frames_base64 = []
-        print(f"[*] Total video frames: {total_frames} (24fps). Sampling strategy: full coverage, extracting {target_sample_count} frames.")
-
-        for i in indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-            ret, frame = cap.read()
-            if ret:
-                h, w, _ = frame.shape
-                max_dim = 512
-                scale = max_dim / max(h, w)
-                new_w, new_h = int(w * scale), int(h * scale)
-                
-                resized_frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
-                
-                _, buffer = cv2.imencode('.jpg', resized_frame)
-                b64_str = base64.b64encode(buffer).decode('utf-8')
-                frames_base64.append(b64_str)
-        
-        cap.release()
-        return frames_base64
 
-    def evaluate_video(self, video_path, instruction):
+# MotionPreCritic thresholds. Luminance is 0-255 on the analysis frames, flow
+# is in frame widths per frame.
+BLACK_LUMA = 12.0
+WHITE_LUMA = 245.0
+# Share of frames that must be black/white for a warning
+EXPOSURE_FRACTION = 0.5
+# Share of black/white frames above which the exposure, not the simulation, is
+# reported as the cause when nothing moves
+EXPOSURE_CAUSE_FRACTION = 0.9
+# Fewer moving pixels than this share of the frame, in every frame, is "nothing moves"
+NO_MOTION_FRACTION = 0.002
+# Frames with fewer moving pixels than this share of the busy frames count as at rest
+ACTIVE_FRACTION = 0.1
+# Motion that ends before this share of the video is "motion stops early"
+EARLY_STOP_FRACTION = 0.2
+# 95th percentile flow above this (a fifth of the frame in one frame) is an explosion
+EXPLOSION_FLOW = 0.2
+ENERGY_SEGMENTS = 10
+# Darkness, glare and short events can be what the instruction asks for, so
+# those checks only warn the VLM. no_motion and explosion reject locally unless
+# the instruction asks for stillness or something explosive. A clip that is
+# almost entirely black or white with nothing moving rejects on the exposure.
+SOFT_CHECKS = ("black_frames", "white_frames", "motion_stops")
+STILL_WORDS = re.compile(r"\b(still|static|motionless|frozen|stationary|at rest|idle|calm)")
+EXPLOSIVE_WORDS = re.compile(r"\b(explo|blast|burst|shatter|smash|detonat|erupt|collaps)")
+# Summary fields that go into the verdict cache key next to the frame times
+# (already rounded by analyse())
+MOTION_KEY_FIELDS = ("duration_s", "fps", "flow_mean", "flow_peak", "flow_p95_max",
+                     "motion_start_s", "motion_end_s", "energy_curve")
+
+
+class MotionPreCritic:
+    """
+    Local checks on MotionAdaptiveSampler.frame_stats that catch clear failures
+    (an undecodable video, no motion, exploding rigid bodies) without a VLM
+    call, warnings the VLM weighs against the instruction (black or blown-out
+    frames, motion that dies out almost at once), and a numeric summary for the
+    VLM prompt.
+    """
+
+    def analyse(self, frame_stats, fps):
         """
-        Evaluate video dynamics against user instruction
-        
+        Returns:
+            dict: {"reject": bool, "issues": [{"check", "message", "suggestion", "hard"}],
+            "summary": {...}}. Only "hard" issues reject.
+        """
+        if not frame_stats:
+            return {"reject": True, "summary": {},
+                    "issues": [{"check": "empty", "message": "No frames could be decoded.",
+                                "suggestion": "Check that the render wrote a valid video file.", "hard": True}]}
+
+        luma = np.array([f["luma_mean"] for f in frame_stats])
+        flow = np.array([f["flow_mean"] for f in frame_stats])
+        flow_p95 = np.array([f["flow_p95"] for f in frame_stats])
+        times = np.array([f["time"] for f in frame_stats])
+        hist = np.sum([f["flow_hist"] for f in frame_stats], axis=0)
+        duration = max(times[-1] - times[0], 1e-6)
+
+        moving = np.array([f["moving_fraction"] for f in frame_stats])
+        peak = float(flow.max())
+        peak_moving = float(moving.max())
+        # Relative to the 95th percentile so a single spike does not mark the rest as idle
+        typical_moving = float(np.percentile(moving, 95))
+        active = np.nonzero(moving >= max(typical_moving * ACTIVE_FRACTION, NO_MOTION_FRACTION))[0]
+        energy = [float(segment.sum()) for segment in np.array_split(flow, min(ENERGY_SEGMENTS, len(flow)))]
+        total_energy = sum(energy) or 1.0
+        summary = {
+            "frames": len(frame_stats),
+            "duration_s": round(float(duration), 2),
+            "fps": round(float(fps), 2),
+            "luma_mean": round(float(luma.mean()), 1),
+            "luma_min": round(float(luma.min()), 1),
+            "luma_max": round(float(luma.max()), 1),
+            "black_frames": round(float(np.mean(luma < BLACK_LUMA)), 3),
+            "flow_mean": round(float(flow.mean()), 5),
+            "flow_peak": round(peak, 5),
+            "flow_peak_time_s": round(float(times[int(flow.argmax())]), 2),
+            "flow_p95_max": round(float(flow_p95.max()), 5),
+            "moving_fraction_max": round(peak_moving, 4),
+            "flow_histogram": {f"{FLOW_BINS[i]:g}-{FLOW_BINS[i + 1]:g}": round(float(c / max(hist.sum(), 1)), 3)
+                               for i, c in enumerate(hist)},
+            "motion_start_s": round(float(times[active[0]]), 2) if len(active) else None,
+            "motion_end_s": round(float(times[active[-1]]), 2) if len(active) else None,
+            "energy_curve": [round(e / total_energy, 3) for e in energy],
+        }
+
+        issues = []
+        black = float(np.mean(luma < BLACK_LUMA))
+        white = float(np.mean(luma > WHITE_LUMA))
+        if black >= EXPOSURE_FRACTION:
+            issues.append({
+                "check": "black_frames",
+                "message": f"{summary['black_frames']:.0%} of frames are black (mean luminance {summary['luma_mean']}).",
+                "suggestion": "The scene is unlit (the 'Black Sky' case): raise lighting.sun_intensity or the "
+                              "sky/world strength, and check the camera is not inside an object.",
+            })
+        elif white >= EXPOSURE_FRACTION:
+            issues.append({
+                "check": "white_frames",
+                "message": f"Most frames are blown out (mean luminance {summary['luma_mean']}).",
+                "suggestion": "Lower the light/emission strength or the exposure; check fire/smoke density.",
+            })
+        if peak_moving < NO_MOTION_FRACTION and max(black, white) >= EXPOSURE_CAUSE_FRACTION:
+            # Nothing is visible, so nothing can be seen moving: the exposure is
+            # the failure to fix, and no_motion would send the agent to the bake
+            issues[0]["hard"] = True
+        elif peak_moving < NO_MOTION_FRACTION:
+            issues.append({
+                "check": "no_motion",
+                "message": f"No motion detected (at most {peak_moving:.2%} of pixels move in any frame).",
+                "suggestion": "The simulation did not run or was not baked: check the frame range, that the "
+                              "rigid body/particle/fluid cache is baked, and that objects are active, not passive.",
+            })
+        elif times[active[-1]] - times[0] < duration * EARLY_STOP_FRACTION:
+            issues.append({
+                "check": "motion_stops",
+                "message": f"Motion stops at t={summary['motion_end_s']}s, in the first "
+                           f"{EARLY_STOP_FRACTION:.0%} of a {summary['duration_s']}s video.",
+                "suggestion": "Extend the simulation (cache frame_end, emitter lifetime, force duration) or "
+                              "reduce damping/friction so motion lasts for the clip.",
+            })
+        if flow_p95.max() > EXPLOSION_FLOW:
+            issues.append({
+                "check": "explosion",
+                "message": f"Explosive motion at t={times[int(flow_p95.argmax())]:.2f}s: parts move "
+                           f"{flow_p95.max():.0%} of the frame width in one frame.",
+                "suggestion": "Rigid bodies are probably intersecting at the start: separate them, use "
+                              "CONVEX_HULL/MESH collision shapes consistently, lower masses or velocities, "
+                              "and raise the rigid body world substeps.",
+            })
+        for issue in issues:
+            issue.setdefault("hard", issue["check"] not in SOFT_CHECKS)
+        return {"reject": any(issue["hard"] for issue in issues), "issues": issues, "summary": summary}
+
+    def apply_instruction(self, report, instruction):
+        """
+        Downgrade hard issues the instruction asks for ("a still pond" has no
+        motion, "the vase shatters" looks explosive) to warnings for the VLM.
+
+        Returns:
+            dict: `report`, updated in place.
+        """
+        text = (instruction or "").lower()
+        for issue in report["issues"]:
+            if (issue["check"] == "no_motion" and STILL_WORDS.search(text)) or \
+                    (issue["check"] == "explosion" and EXPLOSIVE_WORDS.search(text)):
+                issue["hard"] = False
+        report["reject"] = any(issue["hard"] for issue in report["issues"])
+        return report
+
+
+def format_motion_summary(report):
+    summary = report["summary"]
+    curve = " ".join(f"{e:.2f}" for e in summary["energy_curve"])
+    return (
+        f"Local motion analysis ({summary['frames']} frames, {summary['duration_s']}s at {summary['fps']} fps):\n"
+        f"- Luminance mean {summary['luma_mean']} (min {summary['luma_min']}, max {summary['luma_max']}), "
+        f"black frames {summary['black_frames']:.0%}\n"
+        f"- Optical flow (frame widths/frame): mean {summary['flow_mean']}, peak {summary['flow_peak']} "
+        f"at t={summary['flow_peak_time_s']}s, 95th percentile max {summary['flow_p95_max']}, "
+        f"up to {summary['moving_fraction_max']:.1%} of pixels moving\n"
+        f"- Motion active from t={summary['motion_start_s']}s to t={summary['motion_end_s']}s\n"
+        f"- Motion energy per {100 // len(summary['energy_curve'])}% of the clip: {curve}"
+    ) + format_warnings(report)
+
+
+def format_warnings(report):
+    warnings = [issue for issue in report.get("issues", []) if not issue["hard"]]
+    if not warnings:
+        return ""
+    lines = ["", "Local warnings (judge them against the instruction, they may be intended):"]
+    lines += [f"- {issue['check']}: {issue['message']} If unintended: {issue['suggestion']}" for issue in warnings]
+    return "\n".join(lines)
+
+
+class VLMMotionCritic:
+    def __init__(self, contact_sheet=USE_CONTACT_SHEET, verdict_cache=None):
+        self.client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+        self.model = MODEL_NAME
+        # Send the frames as a few labelled grid images instead of one image part each
+        self.contact_sheet = contact_sheet
+        # Reuses the verdict of a near-identical video (see verdict_cache)
+        self.verdict_cache = verdict_cache or get_default_verdict_cache()
+        self.pre_critic = MotionPreCritic()
+        # MotionPreCritic report of the last evaluated video
+        self.motion_report = None
+
+    def _process_video(self, video_path, target_sample_count=SAMPLE_BUDGET, skip_ratio=SKIP_RATIO):
+        """
+        Sample the frames shown to the VLM with MotionAdaptiveSampler.
+
         Args:
-            video_path (str): Path to rendered video (.mp4)
-            instruction (str): User's instruction about dynamics (e.g., "Leaves drifting gently")
-        
+            target_sample_count (int): Frame budget; static videos use fewer frames.
+            skip_ratio (float): Ratio of beginning to skip.
+                                Set to 0.05 (skip first 5% of time) to avoid frame 0 initialization errors.
+
         Returns:
-            tuple: (is_valid: bool, feedback: str)
+            list: [{"frame", "time", "motion", "image"}] with `image` as a BGR array.
         """
-        
-        try:
-            video_frames = self._process_video(video_path)
-        except Exception as e:
-            return False, f"Video Processing Error: {str(e)}"
+        sampler = MotionAdaptiveSampler(budget=target_sample_count, skip_ratio=skip_ratio)
+        frames = sampler.sample(video_path)
+        self.motion_report = self.pre_critic.analyse(sampler.frame_stats, sampler.fps)
+        return frames
+
+    def _frame_parts(self, frames):
+        # Frames are motion-weighted, not evenly spaced: label each with its time
+        labels = [f"t={frame['time']:.2f}s" for frame in frames]
+        if self.contact_sheet:
+            sheets = build_contact_sheets([frame["image"] for frame in frames], labels,
+                                          token_budget=SHEET_TOKEN_BUDGET, fmt=SHEET_FORMAT, quality=SHEET_QUALITY)
+            return image_parts(sheets)
+        parts = []
+        for frame, label in zip(frames, labels):
+            _, data = encode_image(frame["image"], "jpeg", FRAME_QUALITY)
+            parts.append({"type": "text", "text": f"Frame {frame['frame']} ({label}):"})
+            parts.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{base64.b64encode(data).decode('utf-8')}"}
+            })
+        return parts
 
-        # 2. Construct Prompt (emphasize Temporal Dynamics)
+    def build_messages(self, frames, instruction, report):
+        """
+        Chat messages for one evaluation: system prompt, instruction, the
+        MotionPreCritic summary and the sampled frames (per frame or as contact sheets).
+        """
+        # Construct Prompt (emphasize Temporal Dynamics)
         system_prompt = """
         You are the **Motion Critic** (VLM-Motion) for a 4D Scene Generation system.
         Your task is to analyze a sequence of video frames to determine if the **Temporal Dynamics** match the user's instruction.
@@ -94,6 +418,12 @@ class VLMMotionCritic:
            - e.g., "Cup spills water" -> Verify liquid flows downward and spreads.
         3. **Consistency**: Does the lighting change correctly if requested (e.g., "sunset")?
 
+        Frames are sampled densely where motion happens and sparsely (or not at all) over static
+        stretches. Use the timestamp labelled on each frame, not the frame order, to judge speed.
+        Frames may be packed into contact sheets, read left to right, top to bottom.
+        A local motion analysis (luminance, optical flow, motion energy over time) precedes the frames;
+        use it to confirm magnitudes and timing you see in the images.
+
         ### OUTPUT FORMAT (JSON ONLY):
         {
             "valid": boolean,      // True only if motion intensity and logic perfectly align.
@@ -102,32 +432,77 @@ class VLMMotionCritic:
         }
         """
 
-        content_payload = [{"type": "text", "text": f"User Instruction: {instruction}"}]
+        content_payload = [
+            {"type": "text", "text": f"User Instruction: {instruction}"},
+            {"type": "text", "text": format_motion_summary(report)},
+        ]
 
-        for b64_frame in video_frames:
-            content_payload.append({
-                "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{b64_frame}"}
-            })
+        content_payload.extend(self._frame_parts(frames))
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": content_payload},
+        ]
+
+    def evaluate_video(self, video_path, instruction):
+        """
+        Evaluate video dynamics against user instruction
+        
+        Args:
+            video_path (str): Path to rendered video (.mp4)
+            instruction (str): User's instruction about dynamics (e.g., "Leaves drifting gently")
+        
+        Returns:
+            tuple: (is_valid: bool, feedback: str)
+        """
+        
+        self.motion_report = None
+        try:
+            video_frames = self._process_video(video_path)
+        except Exception as e:
+            return False, f"Video Processing Error: {str(e)}"
+
+        report = self.pre_critic.apply_instruction(self.motion_report, instruction)
+        if report["reject"]:
+            # Hard issues first, then the warnings: a soft finding can still be the cause
+            issues = sorted(report["issues"], key=lambda issue: not issue["hard"])
+            print(f"[*] Pre-critic rejected the video without a VLM call: "
+                  f"{', '.join(issue['check'] for issue in issues if issue['hard'])}")
+            return False, " ".join(f"{issue['message']} {issue['suggestion']}" for issue in issues)
+
+        # Frames that look alike can still differ in speed and timing, which is
+        # what this critic judges: the timestamps and the flow numbers sent in the
+        # prompt are part of the exact key
+        signatures = [image_signature(frame["image"]) for frame in video_frames]
+        summary = report["summary"]
+        context = make_context_key(
+            "motion", self.model, instruction,
+            times=[round(frame["time"], 2) for frame in video_frames],
+            motion={key: summary[key] for key in MOTION_KEY_FIELDS},
+        )
+        cached = self.verdict_cache.get(context, signatures)
+        if cached is not None:
+            return cached["valid"], cached["feedback"]
+
+        messages = self.build_messages(video_frames, instruction, report)
 
         print(f"VLM-Motion is analyzing dynamics: {os.path.basename(video_path)}...")
 
         try:
-            response = self.client.chat.completions.create(
+            result_text = cached_completion(
+                self.client,
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": content_payload}
-                ],
+                messages=messages,
                 temperature=0.0,
                 max_tokens=300,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                validate=is_json
             )
 
             # 4. Parse result
-            result_json = json.loads(response.choices[0].message.content)
+            result_json = json.loads(result_text)
             is_valid = result_json.get("valid", False)
             feedback = result_json.get("feedback", "No feedback.")
+            self.verdict_cache.put(context, signatures, {"valid": is_valid, "feedback": feedback})
             
             return is_valid, feedback
 
@@ -163,7 +538,8 @@ if __name__ == "__main__":
             "instruction": user_instruction,
             "video_path": video_file,
             "valid": is_valid,
-            "feedback": feedback
+            "feedback": feedback,
+            "pre_critic": critic.motion_report,
         }
         
         output_dir = os.path.dirname(OUTPUT_FEEDBACK_PATH)
@@ -1,8 +1,13 @@
 import os
+import sys
 import json
 from openai import OpenAI
 import re
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import cached_completion
+from workspace import localize_paths, run_path
+
 
 API_KEY = "" 
 BASE_URL = "" 
@@ -10,8 +15,16 @@ MODEL_NAME = "gemini-3-pro-preview"
 
 USER_PROMPT = "" 
 
-OUTPUT_SCRIPT_NAME = "./output/postprocess/postprocess.py"   
-FEEDBACK_FILE = "./output/postprocess/dynreflection_feedback.json"        
+OUTPUT_SCRIPT_NAME = run_path("./output/postprocess/postprocess.py")   
+FEEDBACK_FILE = run_path("./output/postprocess/dynreflection_feedback.json")        
+
+# Paths quoted in SYSTEM_INSTRUCTION, rewritten per run by `localize_paths`
+PROMPT_PATHS = [
+    "./infinigen/outputs/fine/scene.blend",
+    "./infinigen/outputs/obj/obj.blend",
+    "./output/postprocess/postprocess.blend",
+    "./output/postprocess/cache",
+]
 
 SYSTEM_INSTRUCTION = r"""
 # Role
@@ -398,16 +411,18 @@ def generate_script(user_prompt):
     # 3. Send request
     print("Requesting LLM to generate code, please wait...")
     try:
-        response = client.chat.completions.create(
+        code_content = cached_completion(
+            client,
             model=MODEL_NAME,
             messages=[
-                {"role": "system", "content": SYSTEM_INSTRUCTION},
+                {"role": "system", "content": localize_paths(SYSTEM_INSTRUCTION, PROMPT_PATHS)},
                 {"role": "user", "content": final_user_content}
             ],
             temperature=0.2,  # Lower temperature for code rigor, but allows flexibility for logic rewrite
+            validate=lambda content: "```python" in content or "import bpy" in content,
         )
         
-        code_content = response.choices[0].message.content.strip()
+        code_content = code_content.strip()
         
         match = re.search(r'```python\s*(.*?)\s*```', code_content, re.DOTALL)
         if match:
@@ -426,15 +441,26 @@ def generate_script(user_prompt):
         print(f"API call error: {e}")
         return ""
 
-if __name__ == "__main__":
-    # Generate code
-    generated_code = generate_script(USER_PROMPT)
+def run_generation(user_prompt):
+    """
+    Generate the post-process script for `user_prompt` and save it to OUTPUT_SCRIPT_NAME.
 
-    if generated_code:
-        # Save to file
-        with open(OUTPUT_SCRIPT_NAME, "w", encoding="utf-8") as f:
-            f.write(generated_code)
-        print(f"Successfully generated script and saved to: {OUTPUT_SCRIPT_NAME}")
-    else:
+    Returns:
+        bool: True if a script was written.
+    """
+    generated_code = generate_script(user_prompt)
+
+    if not generated_code:
         print("Code generation failed, please check configuration and network connection.")
+        return False
+
+    # Save to file
+    os.makedirs(os.path.dirname(OUTPUT_SCRIPT_NAME), exist_ok=True)
+    with open(OUTPUT_SCRIPT_NAME, "w", encoding="utf-8") as f:
+        f.write(generated_code)
+    print(f"Successfully generated script and saved to: {OUTPUT_SCRIPT_NAME}")
+    return True
 
+if __name__ == "__main__":
+    # Generate code
+    run_generation(USER_PROMPT)
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import re
+import shutil
+
+# Cache of Infinigen `--task coarse` output folders. The key covers everything
+# the coarse task reads: the seed, the generated scene config minus the
+# `populate_scene.*` bindings (only used by `populate`), and the other gin
+# configs passed with -g plus base_nature.gin. Folders are copied in and out
+# with hard links, so a hit costs a directory walk instead of a terrain build.
+
+COARSE_CACHE_DIR = "./output/cache/coarse"
+CONFIG_FOLDER = "infinigen_examples/configs_nature"
+BASE_CONFIGS = ["base_nature.gin"]
+MAX_ENTRIES = 8
+
+BYPASS_ENV = "CODE2WORLDS_COARSE_CACHE_BYPASS"
+
+# Bindings that do not affect the coarse task
+FINE_ONLY_PREFIXES = ("populate_scene.",)
+
+BINDING_LINE = re.compile(r"^([A-Za-z_][\w./]*)\s*=")
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def coarse_bindings(gin_text):
+    """
+    Normalised binding statements of a gin file, without comments, blank lines
+    and fine-only bindings. Multi-line values are joined into one statement.
+    """
+    statements = []
+    current = None
+    depth = 0
+    for raw in gin_text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            continue
+        if current is not None:
+            current += " " + line
+            depth += line.count("[") + line.count("(") - line.count("]") - line.count(")")
+            if depth <= 0:
+                statements.append(current)
+                current = None
+            continue
+        depth = line.count("[") + line.count("(") - line.count("]") - line.count(")")
+        if depth > 0:
+            current = line
+        else:
+            statements.append(line)
+
+    kept = []
+    for statement in statements:
+        match = BINDING_LINE.match(statement)
+        if match and match.group(1).startswith(FINE_ONLY_PREFIXES):
+            continue
+        kept.append(re.sub(r"\s*([\[\](),=])\s*", r"\1", re.sub(r"\s+", " ", statement)))
+    return sorted(set(kept))
+
+
+def find_config(name, infinigen_dir):
+    """Locate a -g config by file name under the nature config folder, like Infinigen does."""
+    root = os.path.join(infinigen_dir, CONFIG_FOLDER)
+    for dirpath, _, filenames in os.walk(root):
+        if name in filenames:
+            return os.path.join(dirpath, name)
+    return None
+
+
+class CoarseCache:
+    def __init__(self, cache_dir=COARSE_CACHE_DIR, max_entries=MAX_ENTRIES, bypass=None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.bypass = _env_flag(BYPASS_ENV) if bypass is None else bypass
+
+    def make_key(self, gin_path, seed, extra_configs, infinigen_dir):
+        digest = hashlib.sha256()
+        digest.update(f"seed={seed}\n".encode("utf-8"))
+        with open(gin_path, "r", encoding="utf-8") as f:
+            for statement in coarse_bindings(f.read()):
+                digest.update(statement.encode("utf-8") + b"\n")
+        for name in BASE_CONFIGS + list(extra_configs):
+            digest.update(f"config={name}\n".encode("utf-8"))
+            path = find_config(name, infinigen_dir)
+            if path is not None:
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def restore(self, key, output_folder):
+        """
+        Link a cached coarse folder into `output_folder`.
+
+        Returns:
+            bool: True on a cache hit.
+        """
+        entry = self._entry(key)
+        if self.bypass or not os.path.isdir(entry):
+            return False
+        if os.path.exists(output_folder):
+            shutil.rmtree(output_folder)
+        os.makedirs(os.path.dirname(os.path.abspath(output_folder)), exist_ok=True)
+        _link_tree(entry, output_folder)
+        os.utime(entry)
+        print(f"[Coarse Cache] hit {key[:12]} -> {output_folder}")
+        return True
+
+    def store(self, key, output_folder):
+        if self.bypass or not os.path.isdir(output_folder):
+            return
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{entry}.tmp{os.getpid()}"
+        _link_tree(output_folder, tmp)
+        try:
+            os.replace(tmp, entry)
+            # copytree copies the source folder's mtime, which eviction relies on
+            os.utime(entry)
+        except OSError:
+            # Another run stored the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+        print(f"[Coarse Cache] stored {key[:12]}")
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isdir(path) and ".tmp" not in name:
+                entries.append((os.path.getmtime(path), path))
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _link_tree(src, dst):
+    def link_or_copy(s, d):
+        try:
+            os.link(s, d)
+        except OSError:
+            # Different filesystem
+            shutil.copy2(s, d)
+    shutil.copytree(src, dst, copy_function=link_or_copy, symlinks=True)
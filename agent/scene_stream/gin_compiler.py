@@ -0,0 +1,317 @@
+import json
+
+# Deterministic compiler from the Resolver/Planner outputs (scene_params.json and
+# manifest_scene.json) to Infinigen gin bindings. The tables below are the mapping
+# rules the Scene Realizer prompt used to spell out for the LLM; anything they do
+# not cover is reported back as unmapped so the realizer can fall back to the LLM
+# for just those keys.
+
+# scene_params.json key -> gin binding
+PARAM_BINDINGS = {
+    "terrain.overall_scale": "Ground.scale",
+    "scene.ground_chance": "scene.ground_chance",
+    "scene.water_chance": "scene.waterbody_chance",
+    "vegetation.bush_density": "compose_nature.bush_density",
+    "vegetation.tree_density": "compose_nature.tree_density",
+    "vegetation.max_tree_species": "compose_nature.max_tree_species",
+    "atmosphere.fog_density": "shader_atmosphere.density",
+    "atmosphere.dust_density": "nishita_lighting.dust_density",
+    "weather.snow_chance": "compose_nature.snow_particles_chance",
+    "weather.rain_chance": "compose_nature.rain_particles_chance",
+    "lighting.sun_elevation": "nishita_lighting.sun_elevation",
+}
+
+INT_BINDINGS = {"compose_nature.max_tree_species"}
+
+# Keys with no gin equivalent; they are recorded as comments, never sent to the LLM.
+KNOWN_UNMAPPED_PARAMS = {
+    "lighting.sun_intensity": "no matching binding in gin.txt",
+}
+
+# terrain.ground_cover -> Terrain collections
+GROUND_COVER_BINDINGS = {
+    "snow": {"Terrain.ground_collection": "mountain", "Terrain.mountain_collection": "mountain"},
+    "grass": {"Terrain.ground_collection": "forest_soil"},
+    "forest": {"Terrain.ground_collection": "forest_soil"},
+    "sand": {"Terrain.ground_collection": [("infinigen.assets.materials.terrain.sand.Sand", 1)]},
+}
+
+# terrain.landforms -> terrain processes. Landforms that are not listed here have
+# no dedicated bindings and are left to the scene type defaults.
+LANDFORM_BINDINGS = {
+    "snowy_mountain": {"LandTiles.land_processes": "snowfall", "scene.ground_ice_chance": 0.5},
+    "arctic": {"LandTiles.land_processes": "ice_erosion", "scene.ground_ice_chance": 1.0},
+    "desert": {"Ground.with_sand_dunes": 1},
+}
+
+LIQUID_WATER_BODIES = {"river", "lake"}
+
+# Manifest vocabulary -> compose_nature / populate_scene stage names
+VEGETATION_STAGES = {
+    "trees": "trees",
+    "bushes": "bushes",
+    "grass": "grass",
+    "ferns": "ferns",
+    "flowers": "flowers",
+    "monocots": "monocots",
+    "mushroom": "mushroom",
+    "pinecone": "pinecone",
+    "pine_needle": "pine_needle",
+    "decorative_plants": "decorative_plants",
+    "ground_leaves": "ground_leaves",
+    "ground_twigs": "ground_twigs",
+    "chopped_trees": "chopped_trees",
+    "cactus": "cactus",
+    "kelp": "kelp",
+    "corals": "corals",
+    "seaweed": "seaweed",
+    "urchin": "urchin",
+    "jellyfish": "jellyfish",
+    "seashells": "seashells",
+}
+
+GROUND_CREATURE_FACTORIES = {
+    "herbivore": "HerbivoreFactory",
+    "carnivore": "CarnivoreFactory",
+    "snake": "SnakeFactory",
+    "bird": "BirdFactory",
+    "beetle": "BeetleFactory",
+    "crab": "CrabFactory",
+    "crustacean": "CrustaceanFactory",
+    "fish": "FishFactory",
+}
+
+FLYING_CREATURE_FACTORIES = {
+    "flyingbird": "FlyingBirdFactory",
+    "dragonfly": "DragonflyFactory",
+}
+
+SWARM_STAGES = {
+    "bug_swarm": "bug_swarm",
+    "fish_school": "fish_school",
+}
+
+SURFACE_COVERAGE_STAGES = {
+    "snow_layer": "snow_layer",
+    "lichen": "lichen",
+    "ivy": "ivy",
+    "moss": "moss",
+    "slime_mold": "slime_mold",
+    "mushroom": "mushroom",
+}
+
+EFFECT_BINDINGS = {
+    "fancy_clouds": ("compose_nature.fancy_clouds_chance", 1.0),
+    "rocks": ("compose_nature.rocks_chance", 1.0),
+    "boulders": ("compose_nature.boulders_chance", 1.0),
+    "glowing_rocks": ("compose_nature.glowing_rocks_chance", 1.0),
+    "wind": ("compose_nature.wind_chance", 1.0),
+    "turbulence": ("compose_nature.turbulence_chance", 1.0),
+    "simulated_river": ("compose_nature.simulated_river_enabled", True),
+    "tilted_river": ("compose_nature.tilted_river_enabled", True),
+}
+
+# dynamics.particles -> (particle stage, scene_params key that already controls it)
+PARTICLE_STAGES = {
+    "falling_leaves": ("leaf_particles", None),
+    "rain": ("rain_particles", "weather.rain_chance"),
+    "snow": ("snow_particles", "weather.snow_chance"),
+    "dust": ("dust_particles", None),
+    "marine_snow": ("marine_snow_particles", None),
+}
+
+
+def flatten_params(param_dict, prefix=""):
+    """Flatten nested Resolver output into the dotted keys used by PARAM_BINDINGS."""
+    flat = {}
+    for key, value in param_dict.items():
+        full_key = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_params(value, prefix=f"{full_key}."))
+        else:
+            flat[full_key] = value
+    return flat
+
+
+def format_gin_value(value):
+    if isinstance(value, bool):
+        return "True" if value else "False"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return json.dumps(value)
+    if isinstance(value, tuple):
+        return "(" + ", ".join(format_gin_value(v) for v in value) + ")"
+    if isinstance(value, list):
+        return "[" + ", ".join(format_gin_value(v) for v in value) + "]"
+    raise TypeError(f"Unsupported gin value: {value!r}")
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+class GinCompiler:
+    def __init__(self):
+        self.sections = []
+        self.bindings = {}
+        self.unmapped = {}
+
+    def _section(self, title):
+        self.sections.append((title, []))
+
+    def _bind(self, binding, value):
+        if binding in self.bindings:
+            return
+        self.bindings[binding] = value
+        self.sections[-1][1].append(f"{binding} = {format_gin_value(value)}")
+
+    def _comment(self, text):
+        self.sections[-1][1].append(f"# {text}")
+
+    def _unmapped(self, key, value):
+        if isinstance(value, list):
+            self.unmapped.setdefault(key, []).extend(value)
+        else:
+            self.unmapped[key] = value
+
+    def compile(self, param_dict, manifest_data=None):
+        """
+        Compile resolved parameters and the execution manifest into gin lines.
+
+        Args:
+            param_dict (dict): scene_params.json from the Resolver.
+            manifest_data (dict): manifest_scene.json from the Planner (optional).
+
+        Returns:
+            tuple: (gin_text, unmapped) where `unmapped` maps dotted keys to the
+                   values no rule could translate.
+        """
+        self.sections, self.bindings, self.unmapped = [], {}, {}
+        params = flatten_params(param_dict or {})
+        manifest = manifest_data or {}
+
+        self._compile_params(params)
+        if manifest:
+            self._compile_terrain(manifest.get("terrain", {}))
+            self._compile_ecosystem(manifest.get("ecosystem", {}))
+            self._compile_surface_coverage(manifest.get("surface_coverage", []))
+            self._compile_dynamics(manifest.get("dynamics", {}), params)
+            self._compile_atmosphere(manifest.get("atmosphere", {}))
+
+        blocks = []
+        for title, lines in self.sections:
+            if lines:
+                blocks.append("\n".join([f"# {title}"] + lines))
+        return "\n\n".join(blocks) + "\n", self.unmapped
+
+    def _compile_params(self, params):
+        self._section("Resolved Parameters")
+        for key, value in params.items():
+            if key in PARAM_BINDINGS:
+                binding = PARAM_BINDINGS[key]
+                if binding in INT_BINDINGS and isinstance(value, (int, float)):
+                    value = int(round(value))
+                self._bind(binding, value)
+            elif key in KNOWN_UNMAPPED_PARAMS:
+                self._comment(f"Unmapped JSON key: {key} ({KNOWN_UNMAPPED_PARAMS[key]})")
+            else:
+                self._unmapped(key, value)
+
+    def _compile_terrain(self, terrain):
+        self._section("Terrain (Manifest)")
+
+        ground_cover = terrain.get("ground_cover")
+        if ground_cover:
+            rule = GROUND_COVER_BINDINGS.get(str(ground_cover).lower())
+            if rule is None:
+                self._unmapped("terrain.ground_cover", ground_cover)
+            else:
+                for binding, value in rule.items():
+                    self._bind(binding, value)
+
+        water_bodies = [str(w).lower() for w in _as_list(terrain.get("water_bodies"))]
+        if LIQUID_WATER_BODIES.intersection(water_bodies):
+            self._bind("Terrain.liquid_collection", "liquid")
+
+        # arctic is listed before snowy_mountain so its stronger processes win
+        landforms = [str(l).lower() for l in _as_list(terrain.get("landforms"))]
+        for landform in sorted(landforms, key=lambda l: l != "arctic"):
+            for binding, value in LANDFORM_BINDINGS.get(landform, {}).items():
+                self._bind(binding, value)
+
+    def _compile_ecosystem(self, ecosystem):
+        self._section("Ecosystem (Manifest)")
+
+        for field in ("primary_vegetation", "ground_debris"):
+            for item in _as_list(ecosystem.get(field)):
+                stage = VEGETATION_STAGES.get(str(item).lower())
+                if stage is None:
+                    self._unmapped(f"ecosystem.{field}", [item])
+                else:
+                    self._bind(f"compose_nature.{stage}_chance", 1.0)
+
+        creatures = ecosystem.get("creatures") or {}
+        for group, factories in (("ground", GROUND_CREATURE_FACTORIES), ("flying", FLYING_CREATURE_FACTORIES)):
+            registry = []
+            for item in _as_list(creatures.get(group)):
+                factory = factories.get(str(item).lower())
+                if factory is None:
+                    self._unmapped(f"ecosystem.creatures.{group}", [item])
+                elif factory not in registry:
+                    registry.append(factory)
+            if registry:
+                self._bind(f"compose_nature.{group}_creatures_chance", 1.0)
+                self.bindings[f"compose_nature.{group}_creature_registry"] = registry
+                entries = "".join(f"    (@{factory}, 1),\n" for factory in registry)
+                self.sections[-1][1].append(f"compose_nature.{group}_creature_registry = [\n{entries}]")
+
+        for item in _as_list(creatures.get("swarms")):
+            stage = SWARM_STAGES.get(str(item).lower())
+            if stage is None:
+                self._unmapped("ecosystem.creatures.swarms", [item])
+            else:
+                self._bind(f"compose_nature.{stage}_chance", 1.0)
+
+    def _compile_surface_coverage(self, surface_coverage):
+        self._section("Surface Coverage (Manifest)")
+        for item in _as_list(surface_coverage):
+            stage = SURFACE_COVERAGE_STAGES.get(str(item).lower())
+            if stage is None:
+                self._unmapped("surface_coverage", [item])
+            else:
+                self._bind(f"populate_scene.{stage}_chance", 1.0)
+
+    def _compile_dynamics(self, dynamics, params):
+        self._section("Dynamics (Manifest)")
+        for item in _as_list(dynamics.get("other_effects")):
+            rule = EFFECT_BINDINGS.get(str(item).lower())
+            if rule is None:
+                self._unmapped("dynamics.other_effects", [item])
+            else:
+                self._bind(*rule)
+
+        for item in _as_list(dynamics.get("particles")):
+            rule = PARTICLE_STAGES.get(str(item).lower())
+            if rule is None:
+                self._unmapped("dynamics.particles", [item])
+                continue
+            stage, controlling_param = rule
+            # weather.* from the Resolver already decided rain/snow
+            if controlling_param and controlling_param in params:
+                continue
+            self._bind(f"compose_nature.{stage}_chance", 1.0)
+
+    def _compile_atmosphere(self, atmosphere):
+        self._section("Atmosphere (Manifest)")
+        season = atmosphere.get("season")
+        if season:
+            self._comment(f"atmosphere.season: {season} (applied through trees.random_season)")
+
+
+def compile_gin(param_dict, manifest_data=None):
+    return GinCompiler().compile(param_dict, manifest_data)
@@ -1,15 +1,20 @@
 import json
 import os
+import sys
 from pathlib import Path
 from openai import OpenAI
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import cached_completion, is_json
+from workspace import run_path
+
 
 API_KEY = "" 
 BASE_URL = "" 
 MODEL_NAME = "gemini-3-pro-preview"  
 
 # 输出文件路径
-OUTPUT_MANIFEST = "./output/scene/manifest_scene.json"
+OUTPUT_MANIFEST = run_path("./output/scene/manifest_scene.json")
 
 class EnvironmentPlanner:
     def __init__(self, api_key, base_url, model_name):
@@ -129,16 +134,18 @@ The JSON structure must be:
 """
         
         try:
-            response = self.client.chat.completions.create(
+            content = cached_completion(
+                self.client,
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": f"User Instruction: {user_instruction}"}
                 ],
                 temperature=0.7,  
+                validate=is_json,
             )
             
-            content = response.choices[0].message.content.strip()
+            content = content.strip()
             
             if content.startswith("```json"):
                 content = content[7:]
@@ -151,10 +158,39 @@ The JSON structure must be:
             print(f"API Error in Planner: {e}")
             return None
 
+def run_planning(user_prompt, planner=None):
+    """
+    Infer the execution manifest for `user_prompt` and write it to OUTPUT_MANIFEST.
+
+    Returns:
+        dict: The manifest, or None if the planner produced no valid JSON.
+    """
+    planner = planner or EnvironmentPlanner(API_KEY, BASE_URL, MODEL_NAME)
+    json_result = planner.infer_manifest(user_prompt)
+
+    if not json_result:
+        print("Failed to generate manifest.")
+        return None
+
+    try:
+        parsed_data = json.loads(json_result)
+    except json.JSONDecodeError:
+        print("Raw output:", json_result)
+        return None
+
+    output_path = Path(OUTPUT_MANIFEST)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(OUTPUT_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(parsed_data, f, indent=4, ensure_ascii=False)
+    
+    print("-" * 40)
+    print(json.dumps(parsed_data, indent=4, ensure_ascii=False))
+    print("-" * 40)
+    return parsed_data
+
 def main():
     import sys
-    
-    planner = EnvironmentPlanner(API_KEY, BASE_URL, MODEL_NAME)
 
     if len(sys.argv) > 1:
         user_prompt = sys.argv[1]
@@ -166,26 +202,8 @@ def main():
     else:
         print(f"User Prompt: {user_prompt}")
     
-    json_result = planner.infer_manifest(user_prompt)
-
-    if json_result:
-        try:
-            parsed_data = json.loads(json_result)
-
-            output_path = Path(OUTPUT_MANIFEST)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(OUTPUT_MANIFEST, 'w', encoding='utf-8') as f:
-                json.dump(parsed_data, f, indent=4, ensure_ascii=False)
-            
-            print("-" * 40)
-            print(json.dumps(parsed_data, indent=4, ensure_ascii=False))
-            print("-" * 40)
-            
-        except json.JSONDecodeError:
-            print("Raw output:", json_result)
-    else:
-        print("Failed to generate manifest.")
+    if not run_planning(user_prompt):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
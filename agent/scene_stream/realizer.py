@@ -1,17 +1,24 @@
 import json
 import os
+import sys
 from openai import OpenAI
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import cached_completion
+from workspace import run_path
+from gin_compiler import compile_gin
+from reference_index import GinReferenceIndex, StageReferenceIndex, relevant_terms
+
 
 API_KEY = "" 
 BASE_URL = "" 
 MODEL_NAME = "gemini-3-pro-preview"  
 
-INPUT_MANIFEST = "./output/scene/manifest_scene.json"      
-INPUT_PARAMS = "./output/scene/scene_params.json"      
+INPUT_MANIFEST = run_path("./output/scene/manifest_scene.json")      
+INPUT_PARAMS = run_path("./output/scene/scene_params.json")      
 REF_GIN_PATH = "./library/gin.txt"                
 REF_CODE_PATH = "./library/nature_example.py"     
-OUTPUT_GIN = "./infinigen/infinigen_examples/configs_nature/scene_types/generated_scene.gin"       
+OUTPUT_GIN = run_path("./infinigen/infinigen_examples/configs_nature/scene_types/generated_scene.gin")       
 
 class SceneRealizer:
     def __init__(self, api_key, base_url, model_name):
@@ -25,7 +32,7 @@ class SceneRealizer:
         with open(path, 'r', encoding='utf-8') as f:
             return f.read()
 
-    def synthesize_code(self, param_dict, ref_gin_content, ref_code_content, manifest_data=None, user_prompt=None):
+    def synthesize_code(self, param_dict, ref_gin_content, ref_code_content, manifest_data=None, user_prompt=None, compiled_gin=None):
         """
         Agent 3: 3D Scene Realization
         Function: Acts as a domain-specific compiler to translate verified parameters into executable Gin codes.
@@ -36,6 +43,8 @@ class SceneRealizer:
             ref_code_content: Reference source code (generate_nature.py) content
             manifest_data: Execution Manifest from Agent 1 (Planner) - contains qualitative descriptions
             user_prompt: Original user instruction (optional, for context)
+            compiled_gin: Lines already produced by the rule-based compiler; when given,
+                          `param_dict` only holds the keys the compiler could not map
         """
         
         params_str = json.dumps(param_dict, indent=2)
@@ -70,6 +79,16 @@ You MUST use the Manifest to generate additional gin configuration lines that ar
 - `dynamics.other_effects` -> `compose_nature.fancy_clouds_chance`, `compose_nature.rocks_chance`, etc.
 - `atmosphere.season` -> affects tree season settings (if applicable)
 
+"""
+
+        compiled_section = ""
+        if compiled_gin:
+            compiled_section = f"""
+### ALREADY COMPILED (DO NOT REPEAT):
+The following gin lines were produced by the rule-based compiler. Do NOT output any of these bindings again.
+Only output lines for the Resolved Parameters listed below, which the compiler could not map.
+{compiled_gin}
+
 """
 
         system_prompt = f"""
@@ -82,7 +101,7 @@ Map the input `Resolved Parameters` to strict Infinigen internal schema identifi
 **CRITICAL**: Use the Manifest to supplement missing configuration items that are not in Resolved Parameters.
 
 ### INPUT DATA:
-{user_prompt_section}{manifest_section}1. **Resolved Parameters (Quantitative Values)**:
+{user_prompt_section}{compiled_section}{manifest_section}1. **Resolved Parameters (Quantitative Values)**:
 {params_str}
 
 2. **Reference Gin Syntax (Valid Schema)**:
@@ -283,7 +302,8 @@ Start directly with gin configuration lines.
 """
 
         try:
-            response = self.client.chat.completions.create(
+            content = cached_completion(
+                self.client,
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -292,7 +312,7 @@ Start directly with gin configuration lines.
                 temperature=0.1,  
             )
             
-            content = response.choices[0].message.content.strip()
+            content = content.strip()
             
             clean_content = content.replace("```gin", "").replace("```", "").strip()
             return clean_content
@@ -301,20 +321,37 @@ Start directly with gin configuration lines.
             print(f"API Error in Realizer: {e}")
             return None
 
-def main():
-    import sys
-    
+def drop_compiled_bindings(fallback_gin, compiled_gin):
+    """Remove bindings from the LLM fallback that the rule-based compiler already set."""
+    compiled = {line.split("=", 1)[0].strip() for line in compiled_gin.splitlines()
+                if "=" in line and not line.lstrip().startswith("#")}
+    kept = []
+    skipping = False
+    for line in fallback_gin.splitlines():
+        if skipping:
+            # Continuation lines of a multi-line value (e.g. a creature registry)
+            skipping = not line.strip().startswith("]")
+            continue
+        if "=" in line and not line.lstrip().startswith("#") and line.split("=", 1)[0].strip() in compiled:
+            skipping = line.rstrip().endswith("[")
+            continue
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+def run_realization(user_prompt, realizer=None):
+    """
+    Compile OUTPUT_GIN from the resolved parameters and the manifest.
+
+    Args:
+        user_prompt (str): Original user instruction, used by the LLM fallback.
+        realizer (SceneRealizer): Client for the fallback; created on demand.
+
+    Returns:
+        str: The gin file content, or None if the inputs are missing.
+    """
     if not os.path.exists(INPUT_PARAMS):
         print(f"Error: {INPUT_PARAMS} not found. Please run Agent 2 (Resolver) first.")
-        return
-
-    realizer = SceneRealizer(API_KEY, BASE_URL, MODEL_NAME)
-    
-    ref_gin = realizer.read_file(REF_GIN_PATH)
-    ref_code = realizer.read_file(REF_CODE_PATH)
-    
-    if not ref_gin or not ref_code:
-        print("Warning: Missing reference files (gin.txt or nature_example.py), the generated result may be inaccurate.")
+        return None
 
     with open(INPUT_PARAMS, 'r', encoding='utf-8') as f:
         param_dict = json.load(f)
@@ -327,6 +364,35 @@ def main():
     else:
         print(f"Manifest file not found: {INPUT_MANIFEST}, will only use Resolved Parameters")
 
+    gin_code, unmapped = compile_gin(param_dict, manifest_data)
+    print(f"Compiled {len(gin_code.splitlines())} gin lines from rules, {len(unmapped)} unmapped key(s)")
+
+    if unmapped:
+        print(f"Falling back to LLM for unmapped keys: {', '.join(unmapped)}")
+        realizer = realizer or SceneRealizer(API_KEY, BASE_URL, MODEL_NAME)
+        ref_gin = realizer.read_file(REF_GIN_PATH)
+        ref_code = realizer.read_file(REF_CODE_PATH)
+        if not ref_gin or not ref_code:
+            print("Warning: Missing reference files (gin.txt or nature_example.py), the generated result may be inaccurate.")
+
+        # Only the scene files for the requested landforms and the bindings/stages
+        # related to the unmapped keys are sent, not the whole reference library.
+        landforms = (manifest_data or {}).get("terrain", {}).get("landforms", [])
+        terms = relevant_terms(unmapped)
+        ref_gin_context = GinReferenceIndex(ref_gin).context(landforms, terms)
+        ref_code_context = StageReferenceIndex(ref_code).context(terms)
+        print(f"Reference context: {len(ref_gin_context) + len(ref_code_context)} chars (full library: {len(ref_gin) + len(ref_code)} chars)")
+        fallback = realizer.synthesize_code(unmapped, ref_gin_context, ref_code_context, None, user_prompt, compiled_gin=gin_code)
+        if fallback:
+            gin_code += "\n# LLM fallback for unmapped keys\n" + drop_compiled_bindings(fallback, gin_code) + "\n"
+
+    with open(OUTPUT_GIN, 'w', encoding='utf-8') as f:
+        f.write(gin_code)
+    return gin_code
+
+def main():
+    import sys
+
     if len(sys.argv) > 1:
         user_prompt = sys.argv[1]
     else:
@@ -335,11 +401,8 @@ def main():
     if user_prompt:
         print(f"User Prompt: {user_prompt}")
     
-    gin_code = realizer.synthesize_code(param_dict, ref_gin, ref_code, manifest_data, user_prompt)
-
-    if gin_code:
-        with open(OUTPUT_GIN, 'w', encoding='utf-8') as f:
-            f.write(gin_code)
+    if not run_realization(user_prompt):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,180 @@
+import ast
+import re
+import textwrap
+
+# Lookup tables over the realizer's reference files so the LLM fallback only sees
+# the parts that matter for the keys it is asked to resolve:
+#   - library/gin.txt, split into its `File: <scene>.gin` sections and indexed by
+#     binding name (e.g. `compose_nature.tree_density`)
+#   - library/nature_example.py, indexed by `p.run_stage("<name>", ...)` with the
+#     helper functions defined right before each call
+
+SECTION_HEADER = re.compile(r"^File:\s*(\S+)\s*$")
+BINDING_LINE = re.compile(r"^\s*([A-Za-z_][\w./]*)\s*=")
+
+# Manifest / parameter keys whose gin bindings do not share a word with the key
+KEY_HINTS = {
+    "terrain.ground_cover": ["ground_collection", "mountain_collection"],
+    "terrain.water_bodies": ["liquid_collection", "waterbody"],
+    "terrain.landforms": ["land_processes", "ground_ice_chance"],
+    "terrain.overall_scale": ["Ground.scale"],
+    "atmosphere.fog_density": ["shader_atmosphere"],
+    "atmosphere.dust_density": ["dust_density"],
+    "atmosphere.season": ["season"],
+    "lighting": ["nishita_lighting", "sun"],
+    "weather": ["particles"],
+    "ecosystem.creatures": ["creature_registry", "creatures_chance"],
+    "surface_coverage": ["populate_scene"],
+}
+
+# Short tokens that would match almost every binding
+STOP_TERMS = {"chance", "density", "scene", "compose", "nature", "none", "true", "false"}
+
+
+def relevant_terms(unmapped):
+    """
+    Search terms for a dict of dotted keys -> values, e.g.
+    {"ecosystem.primary_vegetation": ["moss"]} -> {"moss"}.
+    """
+    terms = set()
+    for key, value in unmapped.items():
+        hinted = False
+        for hint_key, hints in KEY_HINTS.items():
+            if key == hint_key or key.startswith(hint_key + "."):
+                terms.update(hints)
+                hinted = True
+        if not hinted:
+            terms.add(key.rsplit(".", 1)[-1])
+        values = value if isinstance(value, list) else [value]
+        for v in values:
+            if isinstance(v, str):
+                terms.add(v)
+    return {t.lower() for t in terms if len(t) > 2 and t.lower() not in STOP_TERMS}
+
+
+class GinReferenceIndex:
+    def __init__(self, text):
+        self.sections = {}
+        self.bindings = {}
+        self._parse(text)
+
+    def _parse(self, text):
+        name = None
+        lines = []
+        for line in text.splitlines():
+            match = SECTION_HEADER.match(line)
+            if match:
+                if name is not None:
+                    self._add_section(name, lines)
+                name = match.group(1)
+                lines = []
+            elif not line.startswith("====="):
+                lines.append(line)
+        if name is not None:
+            self._add_section(name, lines)
+
+    def _add_section(self, file_name, lines):
+        stem = file_name[:-4] if file_name.endswith(".gin") else file_name
+        self.sections[stem] = "\n".join(lines).strip()
+
+        i = 0
+        while i < len(lines):
+            match = BINDING_LINE.match(lines[i])
+            if not match:
+                i += 1
+                continue
+            # Multi-line values (lists of tuples) run until the brackets close
+            block = [lines[i]]
+            depth = lines[i].count("[") - lines[i].count("]")
+            i += 1
+            while depth > 0 and i < len(lines):
+                block.append(lines[i])
+                depth += lines[i].count("[") - lines[i].count("]")
+                i += 1
+            self.bindings.setdefault(match.group(1), []).append((stem, "\n".join(block)))
+
+    def scene_sections(self, landforms):
+        return {lf: self.sections[lf] for lf in landforms if lf in self.sections}
+
+    def matching_bindings(self, terms):
+        matches = {}
+        for binding, examples in self.bindings.items():
+            name = binding.lower()
+            if any(term in name for term in terms):
+                matches[binding] = examples
+        return matches
+
+    def context(self, landforms, terms, max_examples=3):
+        """
+        Args:
+            landforms (list): Manifest `terrain.landforms`; matching scene files are included in full.
+            terms (set): Search terms from `relevant_terms`.
+            max_examples (int): Example assignments shown per matched binding.
+
+        Returns:
+            str: Pruned reference gin text.
+        """
+        parts = []
+        for stem, body in self.scene_sections(landforms).items():
+            parts.append(f"File: {stem}.gin\n{body}")
+
+        matched = self.matching_bindings(terms)
+        if matched:
+            lines = []
+            for binding in sorted(matched):
+                for stem, block in matched[binding][:max_examples]:
+                    lines.append(f"{block}    # from {stem}.gin")
+            parts.append("Relevant bindings:\n" + "\n".join(lines))
+
+        parts.append("All valid binding names:\n" + "\n".join(sorted(self.bindings)))
+        return "\n\n".join(parts)
+
+
+class StageReferenceIndex:
+    def __init__(self, source):
+        self.stages = {}
+        self._parse(source)
+
+    def _parse(self, source):
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            return
+        for node in ast.walk(tree):
+            body = getattr(node, "body", None)
+            if not isinstance(body, list):
+                continue
+            helpers = []
+            for stmt in body:
+                if isinstance(stmt, ast.FunctionDef):
+                    helpers.append(stmt)
+                    continue
+                name = self._stage_name(stmt)
+                if name is None:
+                    continue
+                segments = [ast.get_source_segment(source, h, padded=True) for h in helpers]
+                segments.append(ast.get_source_segment(source, stmt, padded=True))
+                self.stages.setdefault(name, textwrap.dedent("\n".join(s for s in segments if s)))
+                helpers = []
+
+    @staticmethod
+    def _stage_name(stmt):
+        for node in ast.walk(stmt):
+            if (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr == "run_stage"
+                and node.args
+                and isinstance(node.args[0], ast.Constant)
+                and isinstance(node.args[0].value, str)
+            ):
+                return node.args[0].value
+        return None
+
+    def context(self, terms):
+        parts = []
+        for name, code in self.stages.items():
+            if any(term in name.lower() for term in terms):
+                parts.append(f"# Stage: {name}\n{code}")
+        parts.append("# All stage names (gin `compose_nature.<stage>_chance`):\n# " + ", ".join(self.stages))
+        return "\n\n".join(parts)
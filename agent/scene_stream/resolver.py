@@ -1,14 +1,19 @@
 import json
 import os
+import sys
 from openai import OpenAI
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import cached_completion, is_json
+from workspace import run_path
+
 API_KEY = "" 
 BASE_URL = "" 
 MODEL_NAME = "gemini-3-pro-preview"  
 
 # 路径配置
-INPUT_MANIFEST = "./output/scene/manifest_scene.json"   
-OUTPUT_PARAMS = "./output/scene/scene_params.json" 
+INPUT_MANIFEST = run_path("./output/scene/manifest_scene.json")   
+OUTPUT_PARAMS = run_path("./output/scene/scene_params.json") 
 
 class ParameterResolver:
     def __init__(self, api_key, base_url, model_name):
@@ -106,16 +111,18 @@ Return a flat JSON dictionary with these keys (do not invent new keys).
 
         
         try:
-            response = self.client.chat.completions.create(
+            content = cached_completion(
+                self.client,
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": "Resolve the parameters now based on the manifest."}
                 ],
                 temperature=0.2, 
+                validate=is_json,
             )
             
-            content = response.choices[0].message.content.strip()
+            content = content.strip()
             
             if content.startswith("```json"):
                 content = content[7:]
@@ -128,18 +135,34 @@ Return a flat JSON dictionary with these keys (do not invent new keys).
             print(f"API Error in Resolver: {e}")
             return None
 
-def main():
-    import sys
-    
+def run_resolution(user_prompt, resolver=None):
+    """
+    Resolve the manifest at INPUT_MANIFEST into scene parameters at OUTPUT_PARAMS.
+
+    Returns:
+        dict: The resolved parameters, or None on failure.
+    """
     if not os.path.exists(INPUT_MANIFEST):
         print(f"Error: {INPUT_MANIFEST} not found. Please run Agent 1 (Planner) first.")
-        return
+        return None
 
     with open(INPUT_MANIFEST, 'r', encoding='utf-8') as f:
         manifest_data = json.load(f)
         print(f"Successfully read Manifest: {INPUT_MANIFEST}")
 
-    resolver = ParameterResolver(API_KEY, BASE_URL, MODEL_NAME)
+    resolver = resolver or ParameterResolver(API_KEY, BASE_URL, MODEL_NAME)
+    params = resolver.resolve_parameters(manifest_data, user_prompt)
+
+    if params:
+        os.makedirs(os.path.dirname(OUTPUT_PARAMS), exist_ok=True)
+        with open(OUTPUT_PARAMS, 'w', encoding='utf-8') as f:
+            json.dump(params, f, indent=4)
+        
+        print(f"\nParameter resolution successful! Saved to: {OUTPUT_PARAMS}")
+    return params
+
+def main():
+    import sys
 
     if len(sys.argv) > 1:
         user_prompt = sys.argv[1]
@@ -149,13 +172,8 @@ def main():
     if user_prompt:
         print(f"User Prompt: {user_prompt}")
     
-    params = resolver.resolve_parameters(manifest_data, user_prompt)
-
-    if params:
-        with open(OUTPUT_PARAMS, 'w', encoding='utf-8') as f:
-            json.dump(params, f, indent=4)
-        
-        print(f"\nParameter resolution successful! Saved to: {OUTPUT_PARAMS}")
+    if not run_resolution(user_prompt):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
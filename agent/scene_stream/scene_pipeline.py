@@ -0,0 +1,119 @@
+import os
+import shutil
+import subprocess
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import planner
+import realizer
+import resolver
+from coarse_cache import CoarseCache
+from planner import run_planning
+from realizer import OUTPUT_GIN, run_realization
+from resolver import run_resolution
+from stages import StageError, StageRunner
+from workspace import run_path
+
+# In-process replacement for the per-agent `python` calls in scripts/scene_stream.sh.
+# The three agents share one interpreter; only the Infinigen coarse/fine generation
+# runs as a subprocess, from the infinigen directory.
+
+INFINIGEN_DIR = "./infinigen"
+SEED = 1
+EXTRA_CONFIGS = ["simple.gin"]
+COARSE_FOLDER = run_path("./infinigen/outputs/scene/coarse")
+FINE_FOLDER = run_path("./infinigen/outputs/scene/fine")
+
+
+def run_infinigen(task_args, seed=SEED, gin_configs=None, cwd=INFINIGEN_DIR):
+    """
+    Run `python -m infinigen_examples.generate_nature` from the infinigen directory.
+
+    Args:
+        task_args (list): Task and folder arguments, e.g. ["--task", "coarse", "--output_folder", ...].
+        seed (int): Scene seed.
+        gin_configs (list): Config names passed to `-g`; defaults to the generated scene plus EXTRA_CONFIGS.
+    """
+    if not os.path.isdir(cwd):
+        raise StageError(f"infinigen folder not found: {cwd}")
+    gin_configs = gin_configs or [os.path.basename(OUTPUT_GIN)] + EXTRA_CONFIGS
+    cmd = [sys.executable, "-m", "infinigen_examples.generate_nature", "--seed", str(seed)]
+    cmd += task_args + ["-g"] + gin_configs
+    completed = subprocess.run(cmd, cwd=cwd)
+    if completed.returncode != 0:
+        raise StageError(f"generate_nature exited with code {completed.returncode}")
+    return True
+
+
+def run_coarse(seed=SEED, output_folder=COARSE_FOLDER):
+    return run_infinigen(["--task", "coarse", "--output_folder", os.path.abspath(output_folder)], seed=seed)
+
+
+def run_fine(seed=SEED, input_folder=COARSE_FOLDER, output_folder=FINE_FOLDER):
+    return run_infinigen(["--task", "populate", "fine_terrain",
+                          "--input_folder", os.path.abspath(input_folder),
+                          "--output_folder", os.path.abspath(output_folder)], seed=seed)
+
+
+def run_coarse_cached(cache, seed=SEED, output_folder=COARSE_FOLDER):
+    """
+    Restore the coarse folder from `cache` when the coarse-relevant gin bindings
+    and seed match an earlier run, otherwise generate it and store it.
+    """
+    key = cache.make_key(OUTPUT_GIN, seed, EXTRA_CONFIGS, INFINIGEN_DIR)
+    if cache.restore(key, output_folder):
+        return True
+    # The folder may hold hard links into the cache from an earlier hit, so never
+    # let Infinigen write over it in place.
+    if os.path.exists(output_folder):
+        shutil.rmtree(output_folder)
+    run_coarse(seed=seed, output_folder=output_folder)
+    cache.store(key, output_folder)
+    return True
+
+
+class ScenePipeline(StageRunner):
+    def __init__(self, seed=SEED):
+        super().__init__()
+        self.seed = seed
+        self.coarse_cache = CoarseCache()
+        self.planner = planner.EnvironmentPlanner(planner.API_KEY, planner.BASE_URL, planner.MODEL_NAME)
+        self.resolver = resolver.ParameterResolver(resolver.API_KEY, resolver.BASE_URL, resolver.MODEL_NAME)
+        self.realizer = realizer.SceneRealizer(realizer.API_KEY, realizer.BASE_URL, realizer.MODEL_NAME)
+
+    def run(self, user_prompt):
+        """
+        Returns:
+            int: Process exit code, matching scripts/scene_stream.sh (0 on completion, 1 on a failed stage).
+        """
+        print(f"User Prompt: {user_prompt}")
+        try:
+            self._run_stage("Agent 1: Environment Planner", "Planner",
+                            run_planning, user_prompt, planner=self.planner)
+            self._run_stage("Agent 2: Parameter Resolver", "Resolver",
+                            run_resolution, user_prompt, resolver=self.resolver)
+            self._run_stage("Agent 3: Scene Realizer", "Realizer",
+                            run_realization, user_prompt, realizer=self.realizer)
+            self._run_stage("Infinigen Coarse Generation", "Coarse Generation",
+                            run_coarse_cached, self.coarse_cache, seed=self.seed)
+            self._run_stage("Infinigen Fine Generation...", "Fine Generation", run_fine, seed=self.seed)
+        except StageError:
+            return 1
+        finally:
+            self.print_summary()
+        return 0
+
+
+def main():
+    if len(sys.argv) < 2 or not sys.argv[1]:
+        print("Error: Please provide user_prompt parameter")
+        print("Usage: python agent/scene_stream/scene_pipeline.py \"your prompt here\"")
+        print("Example: python agent/scene_stream/scene_pipeline.py \"Create a spooky forest scene with fog\"")
+        sys.exit(1)
+
+    pipeline = ScenePipeline()
+    sys.exit(pipeline.run(sys.argv[1]))
+
+
+if __name__ == "__main__":
+    main()
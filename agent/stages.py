@@ -0,0 +1,50 @@
+import contextlib
+import os
+import time
+
+# Shared stage bookkeeping for the in-process pipelines (obj_pipeline,
+# scene_pipeline, world_pipeline): every stage is timed, logged into
+# `stage_log` and turned into a StageError when it fails or returns nothing.
+
+
+class StageError(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+class StageRunner:
+    def __init__(self):
+        self.stage_log = []
+
+    def _run_stage(self, title, name, fn, *args, **kwargs):
+        print("")
+        print(f"Executing {title}")
+        start = time.time()
+        try:
+            result = fn(*args, **kwargs)
+            if not result:
+                raise StageError(f"{name} returned no result")
+        except Exception as e:
+            self.stage_log.append({"stage": name, "status": "failed", "seconds": time.time() - start})
+            print(f"Error: {name} execution failed ({e})")
+            raise StageError(name) from e
+        self.stage_log.append({"stage": name, "status": "ok", "seconds": time.time() - start})
+        print(f"{name} completed")
+        return result
+
+    def print_summary(self):
+        if not self.stage_log:
+            return
+        print("")
+        print("Stage timings:")
+        for entry in self.stage_log:
+            print(f"  {entry['stage']:<22} {entry['status']:<7} {entry['seconds']:.2f}s")
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import cv2
+
+# Near-duplicate cache for critic verdicts. llm_cache only helps when the
+# request is byte-identical; a refinement iteration that nudges one parameter
+# re-renders images that differ in noise and compression but not in anything
+# the critic would judge. Verdicts are stored with a perceptual difference hash
+# (dHash) and a coarse colour signature of every submitted image or frame, and
+# returned when all hashes are within MAX_DISTANCE bits and all colours within
+# COLOR_TOLERANCE of a stored entry for the same critic, model, instruction and
+# image count. The dHash is grayscale only, so without the colour signature a
+# red part and a green one would look the same.
+
+DEFAULT_CACHE_DIR = "./output/cache"
+DEFAULT_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "verdict_cache.sqlite")
+
+# Environment overrides
+CACHE_PATH_ENV = "CODE2WORLDS_VERDICT_CACHE"
+BYPASS_ENV = "CODE2WORLDS_VERDICT_CACHE_BYPASS"
+
+# dHash of a HASH_SIZE x HASH_SIZE gradient grid: 256 bits
+HASH_SIZE = 16
+# Hamming distance (bits, per image) still treated as the same image
+MAX_DISTANCE = 6
+# Brightness step (0-255) between neighbouring cells needed for a 1 bit, so
+# flat areas hash to 0 instead of to render noise
+GRADIENT_TOLERANCE = 2.0
+# Colour signature: mean Lab colour of each cell of a COLOR_GRID x COLOR_GRID grid
+COLOR_GRID = 8
+# Largest per-cell Lab difference (L 0-100, a/b about -128..127) still treated as the same colour
+COLOR_TOLERANCE = 4.0
+
+MAX_AGE_SECONDS = 14 * 24 * 3600
+MAX_ENTRIES = 5000
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """
+    Difference hash of a BGR (or grayscale) image: one bit per horizontally
+    adjacent pair of cells in a (hash_size + 1) x hash_size grayscale thumbnail,
+    set when the right cell is brighter by more than GRADIENT_TOLERANCE.
+
+    Returns:
+        int: hash_size * hash_size bit hash.
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image.astype("float32"), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] - small[:, :-1] > GRADIENT_TOLERANCE).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def color_signature(image, grid=COLOR_GRID):
+    """
+    Returns:
+        list: Mean Lab colour of every grid cell of a BGR (or grayscale) image, flattened.
+    """
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    small = cv2.resize(image[..., :3].astype("float32") / 255.0, (grid, grid), interpolation=cv2.INTER_AREA)
+    return [round(float(v), 1) for v in cv2.cvtColor(small, cv2.COLOR_BGR2Lab).flatten()]
+
+
+def image_signature(image):
+    """dHash and colour signature of a BGR image, the per-image part of a cache key."""
+    return {"dhash": dhash(image), "color": color_signature(image)}
+
+
+def image_file_signature(path):
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise FileNotFoundError(f"Image not found: {path}")
+    return image_signature(image)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def color_distance(a, b):
+    if len(a) != len(b):
+        return float("inf")
+    return max((abs(x - y) for x, y in zip(a, b)), default=0.0)
+
+
+def make_context_key(critic, model, instruction, **extra):
+    """Exact part of the key: everything except the images."""
+    canonical = json.dumps({"critic": critic, "model": model, "instruction": instruction, **extra},
+                           sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    def __init__(self, path=None, max_distance=MAX_DISTANCE, color_tolerance=COLOR_TOLERANCE,
+                 max_age_seconds=MAX_AGE_SECONDS, max_entries=MAX_ENTRIES, bypass=None):
+        self.path = path or os.environ.get(CACHE_PATH_ENV) or DEFAULT_CACHE_PATH
+        self.max_distance = max_distance
+        self.color_tolerance = color_tolerance
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.bypass = _env_flag(BYPASS_ENV) if bypass is None else bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS verdicts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    context TEXT NOT NULL,
+                    hashes TEXT NOT NULL,
+                    verdict TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_context ON verdicts(context)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_last_used ON verdicts(last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _distance(self, stored, signatures):
+        """(max Hamming distance, max colour distance) of two signature lists, or None if they differ."""
+        if len(stored) != len(signatures):
+            return None
+        bits, color = 0, 0.0
+        for a, b in zip(stored, signatures):
+            if not isinstance(a, dict):
+                # Entry written before colour signatures
+                return None
+            bits = max(bits, hamming(int(a["dhash"], 16), b["dhash"]))
+            color = max(color, color_distance(a["color"], b["color"]))
+            if bits > self.max_distance or color > self.color_tolerance:
+                return None
+        return bits, color
+
+    def get(self, context, signatures):
+        """
+        Args:
+            context (str): make_context_key() of the request.
+            signatures (list): image_signature() of every image, in the order they are sent.
+
+        Returns:
+            dict: The stored verdict of the closest near-duplicate, or None.
+        """
+        if self.bypass:
+            return None
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            rows = conn.execute(
+                "SELECT id, hashes, verdict, created FROM verdicts WHERE context = ?", (context,)
+            ).fetchall()
+            best = None
+            for row_id, stored, verdict, created in rows:
+                if self.max_age_seconds and now - created > self.max_age_seconds:
+                    continue
+                distance = self._distance(json.loads(stored), signatures)
+                if distance is not None and (best is None or distance < best[0]):
+                    best = (distance, row_id, verdict)
+            if best is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE verdicts SET last_used = ? WHERE id = ?", (now, best[1]))
+            conn.commit()
+            self.hits += 1
+        print(f"[VerdictCache] near-duplicate hit (max {best[0][0]} bits, {best[0][1]:.1f} Lab apart)")
+        return json.loads(best[2])
+
+    def put(self, context, signatures, verdict):
+        if self.bypass:
+            return
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT INTO verdicts (context, hashes, verdict, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (context, json.dumps([{"dhash": format(s["dhash"], "x"), "color": s["color"]} for s in signatures]),
+                 json.dumps(verdict, ensure_ascii=False), now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now):
+        if self.max_age_seconds:
+            conn.execute("DELETE FROM verdicts WHERE created < ?", (now - self.max_age_seconds,))
+        if self.max_entries:
+            # Keep the most recently used entries
+            conn.execute(
+                "DELETE FROM verdicts WHERE id NOT IN "
+                "(SELECT id FROM verdicts ORDER BY last_used DESC LIMIT ?)", (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM verdicts")
+            conn.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bypass": self.bypass, "path": self.path}
+
+
+_default_cache = None
+
+
+def get_default_verdict_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = VerdictCache()
+    return _default_cache
+
+
+if __name__ == "__main__":
+    # Self-check: a re-render with only noise hits the cache, a colour change misses
+    import tempfile
+
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+
+    def render(color):
+        image = np.full((512, 512, 3), 128, np.uint8)
+        cv2.circle(image, (256, 256), 60, color, -1)
+        return np.clip(image + rng.normal(0, 6, image.shape), 0, 255).astype(np.uint8)
+
+    green, red = render((0, 160, 0)), render((0, 0, 160))
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = VerdictCache(path=os.path.join(tmp, "verdicts.sqlite"), bypass=False)
+        cache.put("ctx", [image_signature(green)], {"valid": False, "feedback": "wrong colour"})
+        assert cache.get("ctx", [image_signature(render((0, 160, 0)))]) is not None, "noisy re-render missed"
+        print(f"green vs red: {hamming(dhash(green), dhash(red))} dHash bits apart")
+        assert cache.get("ctx", [image_signature(red)]) is None, "colour change hit the cache"
+    print("verdict_cache self-check passed")
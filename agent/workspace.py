@@ -0,0 +1,50 @@
+import os
+
+# Per-run workspaces. Every agent wraps its module-level path constants with
+# `run_path`, so a process started with CODE2WORLDS_RUN_DIR set reads and writes
+# its own copy of ./output/ and ./infinigen/outputs/ instead of the shared ones.
+# Files that must stay inside the infinigen tree (the generated obj_code.py, the
+# generated_scene.gin config) keep their folder and get the run id as a suffix.
+# Without the variable every path is returned unchanged.
+
+RUN_DIR_ENV = "CODE2WORLDS_RUN_DIR"
+
+
+def get_run_dir():
+    return os.environ.get(RUN_DIR_ENV) or None
+
+
+def get_run_id():
+    run_dir = get_run_dir()
+    return os.path.basename(os.path.normpath(run_dir)) if run_dir else None
+
+
+def run_path(path):
+    """
+    Resolve a repository-relative path against the current run directory.
+
+    Args:
+        path (str): A path such as "./output/obj/obj_param.txt" or "./infinigen/obj_code.py".
+
+    Returns:
+        str: The run-specific path, or `path` itself when no run directory is set.
+    """
+    run_dir = get_run_dir()
+    if not run_dir or os.path.isabs(path):
+        return path
+
+    rel = os.path.normpath(path)
+    parts = rel.split(os.sep)
+    if parts[0] == "output" or parts[:2] == ["infinigen", "outputs"]:
+        return os.path.join(run_dir, rel)
+    if parts[0] == "infinigen":
+        stem, ext = os.path.splitext(rel)
+        return f"{stem}_{get_run_id()}{ext}"
+    return path
+
+
+def localize_paths(text, paths):
+    """Rewrite default paths quoted in a prompt or template to their run-specific form."""
+    for path in paths:
+        text = text.replace(path, run_path(path))
+    return text
@@ -0,0 +1,153 @@
+import concurrent.futures
+import os
+import sys
+import time
+import traceback
+
+from stages import StageRunner
+from workspace import run_path
+
+# Runs the dual-stream pipeline for one prompt as a small DAG: the object stream
+# and the scene stream have no data dependency, so they run side by side in
+# separate processes (the object stream chdirs into infinigen and drives Blender,
+# the scene stream spends most of its time on LLM calls and Infinigen
+# subprocesses). The post-process agent starts once both have finished.
+# Each node's output goes to its own log file under ./output/logs/.
+
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = run_path("./output/logs")
+
+
+def run_obj_stream(user_prompt):
+    from obj_pipeline import ObjPipeline
+    pipeline = ObjPipeline()
+    return pipeline.run(user_prompt), pipeline.stage_log
+
+
+def run_scene_stream(user_prompt):
+    from scene_pipeline import ScenePipeline
+    pipeline = ScenePipeline()
+    return pipeline.run(user_prompt), pipeline.stage_log
+
+
+def run_postprocess(user_prompt):
+    from postprocess_agent import run_generation
+    runner = StageRunner()
+    try:
+        runner._run_stage("Post-Process Agent", "Post-Process", run_generation, user_prompt)
+    except Exception:
+        return 1, runner.stage_log
+    return 0, runner.stage_log
+
+
+# name -> (source folder, entry point, dependencies)
+NODES = {
+    "obj_stream": ("obj_stream", run_obj_stream, []),
+    "scene_stream": ("scene_stream", run_scene_stream, []),
+    "postprocess": ("postprocess", run_postprocess, ["obj_stream", "scene_stream"]),
+}
+
+
+def run_node(name, user_prompt, log_path):
+    """
+    Entry point of a node's worker process. stdout/stderr are redirected at the
+    file-descriptor level so Infinigen and Blender subprocess output lands in
+    the node's log as well.
+    """
+    folder, fn, _ = NODES[name]
+    sys.path.insert(0, os.path.join(AGENT_DIR, folder))
+
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    log = open(log_path, "w", encoding="utf-8", buffering=1)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+    sys.stdout.reconfigure(line_buffering=True)
+    sys.stderr.reconfigure(line_buffering=True)
+
+    start = time.time()
+    try:
+        exit_code, stages = fn(user_prompt)
+    except Exception:
+        traceback.print_exc()
+        exit_code, stages = 1, []
+    return {"node": name, "exit_code": exit_code, "seconds": time.time() - start, "stages": stages}
+
+
+class WorldPipeline:
+    def __init__(self, nodes=NODES, log_dir=LOG_DIR):
+        self.nodes = nodes
+        self.log_dir = log_dir
+        self.results = {}
+
+    def _ready(self, started):
+        for name, (_, _, deps) in self.nodes.items():
+            if name in started:
+                continue
+            if all(dep in self.results for dep in deps):
+                yield name, deps
+
+    def run(self, user_prompt):
+        """
+        Returns:
+            int: 0 if every node completed, 1 otherwise.
+        """
+        print(f"User Prompt: {user_prompt}")
+        started = set()
+        pending = {}
+        start = time.time()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(self.nodes), max_tasks_per_child=1) as pool:
+            while True:
+                for name, deps in list(self._ready(started)):
+                    started.add(name)
+                    failed = [dep for dep in deps if self.results[dep]["exit_code"] != 0]
+                    if failed:
+                        print(f"[World] Skipping {name}: {', '.join(failed)} failed")
+                        self.results[name] = {"node": name, "exit_code": 1, "seconds": 0.0, "stages": [], "skipped": True}
+                        continue
+                    log_path = os.path.join(self.log_dir, f"{name}.log")
+                    pending[pool.submit(run_node, name, user_prompt, log_path)] = name
+                    print(f"[World] Started {name} (log: {log_path})")
+
+                if not pending:
+                    break
+
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"node": name, "exit_code": 1, "seconds": 0.0, "stages": [], "error": str(e)}
+                    self.results[name] = result
+                    status = "completed" if result["exit_code"] == 0 else "failed"
+                    print(f"[World] {name} {status} in {result['seconds']:.1f}s")
+
+        self.print_summary(time.time() - start)
+        return 0 if all(r["exit_code"] == 0 for r in self.results.values()) else 1
+
+    def print_summary(self, total_seconds):
+        print("")
+        print("Stream timings:")
+        for name, result in self.results.items():
+            status = "skipped" if result.get("skipped") else ("ok" if result["exit_code"] == 0 else "failed")
+            print(f"  {name:<22} {status:<7} {result['seconds']:.2f}s")
+            for entry in result["stages"]:
+                print(f"    {entry['stage']:<20} {entry['status']:<7} {entry['seconds']:.2f}s")
+        print(f"  {'total':<22} {'':<7} {total_seconds:.2f}s")
+
+
+def main():
+    if len(sys.argv) < 2 or not sys.argv[1]:
+        print("Error: Please provide user_prompt parameter")
+        print("Usage: python agent/world_pipeline.py \"your prompt here\"")
+        print("Example: python agent/world_pipeline.py \"A heavy iron anvil crushing a soda can in a spooky forest\"")
+        sys.exit(1)
+
+    pipeline = WorldPipeline()
+    sys.exit(pipeline.run(sys.argv[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import argparse
 import itertools
+import json
 import logging
+import os
+import resource
+import time
 from pathlib import Path
 
 import bpy
@@ -77,9 +81,97 @@ logger = logging.getLogger(__name__)
 from infinigen.core.util import rrt
 
 
+def _scene_counts():
+    n_polygons = sum(len(mesh.polygons) for mesh in bpy.data.meshes)
+    return len(bpy.data.objects), n_polygons
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ProfiledStageExecutor(RandomStageExecutor):
+    """
+    RandomStageExecutor that also records, per stage, wall time, CPU time, the
+    growth of the process peak RSS and the change in object/polygon counts.
+    The measurements are merged into the rows written by `save_results`, and a
+    Chrome trace (chrome://tracing, Perfetto) is written next to the CSV.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stage_profiles = []
+        self._t0 = time.perf_counter()
+
+    def run_stage(self, name, fn, *args, **kwargs):
+        n_objects, n_polygons = _scene_counts()
+        rss_before = _peak_rss_mb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            return super().run_stage(name, fn, *args, **kwargs)
+        finally:
+            wall_end = time.perf_counter()
+            cpu = time.process_time() - cpu_start
+            n_objects_after, n_polygons_after = _scene_counts()
+            self.stage_profiles.append(
+                {
+                    "name": name,
+                    "start_s": wall_start - self._t0,
+                    "wall_s": wall_end - wall_start,
+                    "cpu_s": cpu,
+                    "peak_rss_delta_mb": _peak_rss_mb() - rss_before,
+                    "objects_delta": n_objects_after - n_objects,
+                    "polygons_delta": n_polygons_after - n_polygons,
+                    "objects_total": n_objects_after,
+                    "polygons_total": n_polygons_after,
+                }
+            )
+
+    def _merge_profiles(self):
+        profiles = {}
+        for prof in self.stage_profiles:
+            profiles.setdefault(prof["name"], []).append(prof)
+        for row in self.results:
+            if not isinstance(row, dict) or not profiles.get(row.get("name")):
+                continue
+            prof = profiles[row["name"]].pop(0)
+            row.update({k: v for k, v in prof.items() if k not in ("name", "start_s")})
+
+    def save_trace(self, path):
+        events = [
+            {
+                "name": prof["name"],
+                "cat": "stage",
+                "ph": "X",
+                "ts": prof["start_s"] * 1e6,
+                "dur": prof["wall_s"] * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {k: v for k, v in prof.items() if k not in ("name", "start_s")},
+            }
+            for prof in self.stage_profiles
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, indent=1)
+
+    def save_results(self, path):
+        self._merge_profiles()
+        super().save_results(path)
+        path = Path(path)
+        self.save_trace(path.with_name(path.stem + "_trace.json"))
+        slowest = sorted(self.stage_profiles, key=lambda prof: -prof["wall_s"])[:5]
+        for prof in slowest:
+            logger.info(
+                f"Stage {prof['name']}: {prof['wall_s']:.1f}s wall, {prof['cpu_s']:.1f}s cpu, "
+                f"+{prof['peak_rss_delta_mb']:.0f}MB peak RSS, +{prof['polygons_delta']} polygons"
+            )
+
+
 @gin.configurable
 def compose_nature(output_folder, scene_seed, **params):
-    p = pipeline.RandomStageExecutor(scene_seed, output_folder, params)
+    p = ProfiledStageExecutor(scene_seed, output_folder, params)
 
     def add_coarse_terrain():
         terrain = Terrain(
@@ -827,7 +919,7 @@ def compose_nature(output_folder, scene_seed, **params):
 def populate_scene(
     output_folder: Path, scene_seed: int, camera_rigs: list[bpy.types.Object], **params
 ):
-    p = RandomStageExecutor(scene_seed, output_folder, params)
+    p = ProfiledStageExecutor(scene_seed, output_folder, params)
 
     primary_cams = [rig.children[0] for rig in camera_rigs]
 